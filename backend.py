@@ -1,87 +1,546 @@
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse, JSONResponse
+from contextlib import asynccontextmanager, aclosing
 from pathlib import Path
 from dotenv import load_dotenv
 import traceback
+import importlib
+import asyncio
+import json
 import os
 
 from models import NewsRequest
-from utils import generate_broadcast_news, text_to_audio_elevenlabs_sdk
+from utils import (
+    generate_broadcast_news_async,
+    generate_fused_broadcast_news_async,
+    stream_broadcast_news_async,
+    text_to_audio_elevenlabs_async,
+    stream_audio_elevenlabs,
+    stitch_audio_files,
+    NO_BROADCAST_CONTENT,
+    fetch_cache,
+    llm_cache,
+    audio_cache_stats,
+)
+from http_clients import open_clients, close_clients, preconnect
+from metrics import track, set_source_type, render_prometheus
+from jobs import JobManager, JobQueueFull, JobResult
 # 1. CHANGED: Import NewsEngine (the new name), not NewsScraper
-from news_scraper import NewsEngine 
-from reddit_scraper import scrape_reddit_topics
+from news_scraper import NewsEngine, news_flights, news_topic_cache, is_usable_summary
+from reddit_scraper import (
+    scrape_reddit_topics,
+    reddit_pool,
+    reddit_flights,
+    reddit_topic_cache,
+    refresh_topic as refresh_reddit_topic,
+)
+from warming import TopicPopularity, CacheWarmer
+from singleflight import normalize_topic
+from cache import TTLCache
+from mp3_frames import join_mp3
+from speech_pipeline import chunk_script, pipelined
+from rate_limits import rate_limit_stats
+from llm_router import openrouter_router
+from deadlines import DeadlineExceeded, current_deadline, deadline, gather_topics, keep_back, within_deadline
+from headline_parser import extract_headlines_from_html
+from headline_dedup import dedupe_headline_text
+from warmup import Warmup
 
-app = FastAPI()
 load_dotenv()
 
-@app.post("/generate-news-audio")
-async def generate_news_audio(request: NewsRequest):
+# Seconds a request may take end to end, requests can ask for less with deadline_seconds
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "150"))
+JOB_DEADLINE = float(os.getenv("JOB_DEADLINE", "600"))
+# Time kept back from scraping for the broadcast script and TTS, scraping
+# always gets at least SOURCES_MIN_SHARE of what is left
+SCRIPT_AUDIO_RESERVE = float(os.getenv("SCRIPT_AUDIO_RESERVE", "45"))
+SOURCES_MIN_SHARE = 0.5
+# Time kept back from segmented mode's segments for stitching them
+STITCH_RESERVE = 5
+
+def deadline_seconds(request: NewsRequest, limit: float) -> float:
+    if request.deadline_seconds:
+        return min(request.deadline_seconds, limit)
+    return limit
+
+def sources_phase():
+    """Narrow the deadline for scraping so the script and audio still fit"""
+    return keep_back(SCRIPT_AUDIO_RESERVE, SOURCES_MIN_SHARE)
+
+async def run_job(request: NewsRequest) -> JobResult:
+    try:
+        with deadline(deadline_seconds(request, JOB_DEADLINE)) as job_deadline:
+            audio_path = await within_deadline(generate_audio_file(request))
+        if job_deadline.skipped:
+            print(f"Job finished with skipped topics: {job_deadline.skipped}")
+        # Reported by GET /jobs/{id} and the X-Skipped-Topics header of the audio
+        return JobResult(audio_path, job_deadline.skipped)
+    except Exception as e:
+        log_error(e)
+        raise
+
+# Background workers for POST /jobs
+job_manager = JobManager(
+    run=run_job,
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    queue_size=int(os.getenv("JOB_QUEUE_SIZE", "100")),
+    result_ttl=float(os.getenv("JOB_RESULT_TTL", "3600")),
+    state_dir=os.getenv("JOB_STATE_DIR") or None,
+)
+
+async def warm_news_topic(topic: str):
+    summary = await NewsEngine().summarize_topic(topic, refresh=True)
+    if not is_usable_summary(summary):
+        raise RuntimeError(summary)
+
+async def warm_reddit_topic(topic: str):
+    await refresh_reddit_topic(reddit_pool, topic)
+
+# Requested topics, with exponentially decaying scores
+topic_popularity = TopicPopularity(half_life=float(os.getenv("WARM_HALF_LIFE", "3600")))
+
+# Keeps the most requested topics' summaries fresh in the topic caches
+cache_warmer = CacheWarmer(
+    topic_popularity,
+    refreshers={
+        "news": (news_topic_cache, warm_news_topic),
+        "reddit": (reddit_topic_cache, warm_reddit_topic),
+    },
+    top_n=int(os.getenv("WARM_TOP_N", "5")),
+    interval=float(os.getenv("WARM_INTERVAL", "60")),
+    refresh_ahead=float(os.getenv("WARM_REFRESH_AHEAD", "120")),
+    concurrency=int(os.getenv("WARM_CONCURRENCY", "2")),
+    rate_per_minute=float(os.getenv("WARM_RATE_PER_MINUTE", "10")),
+    min_score=float(os.getenv("WARM_MIN_SCORE", "1.5")),
+)
+
+WARMUP_PAGE = (
+    "<html><body><div>Warmup headline<br>Outlet<br>More</div>"
+    "<div>Warmup headline again<br>Outlet<br>More</div></body></html>"
+)
+
+async def warm_parsers():
+    """Run the headline parser and dedup once so the first request doesn't load them"""
+    await asyncio.to_thread(lambda: dedupe_headline_text(extract_headlines_from_html(WARMUP_PAGE)))
+
+async def warm_tts_sdk():
+    # The ElevenLabs SDK is imported on first use and takes a while
+    await asyncio.to_thread(importlib.import_module, "elevenlabs")
+
+# Run in the background after startup, /readyz answers 503 until they finish
+# unless WARMUP=0. The MCP pool is started either way.
+warmup = Warmup(
+    steps={
+        "parsers": warm_parsers,
+        "http_pools": preconnect,
+        "tts_sdk": warm_tts_sdk,
+        # Warm MCP sessions for the Reddit scraper
+        "mcp_sessions": reddit_pool.start,
+    },
+    timeout=float(os.getenv("WARMUP_TIMEOUT", "150")),
+    gate=os.getenv("WARMUP", "1") == "1",
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Long-lived upstream connection pools, shared by every request
+    await open_clients()
+    await job_manager.start()
+    await cache_warmer.start()
+    await warmup.start()
+    try:
+        yield
+    finally:
+        # Out of rotation first, then drain
+        await warmup.close()
+        await cache_warmer.close()
+        await job_manager.close()
+        await reddit_pool.close()
+        await close_clients()
+
+app = FastAPI(lifespan=lifespan)
+
+@track("news_source")
+async def scrape_news_source(topics):
+    print("Initializing NewsEngine...")
+    # 2. CHANGED: Create an instance of NewsEngine
+    news_scraper = NewsEngine()
+    print(f"NewsEngine type: {type(news_scraper)}")
+
+    print("Calling scrape_news...")
+    news_results = await news_scraper.scrape_news(topics)
+    print(f"News results: {news_results}")
+    return news_results
+
+@track("news_headlines_source")
+async def scrape_news_headlines_source(topics):
+    print("Scraping news headlines...")
+    return await NewsEngine().scrape_headlines(topics)
+
+@track("reddit_source")
+async def scrape_reddit_source(topics):
+    print("Scraping Reddit...")
+    reddit_results = await scrape_reddit_topics(topics)
+    print(f"Reddit results: {reddit_results}")
+    return reddit_results
+
+async def gather_or_cancel(coros) -> list:
+    """
+    Run coroutines concurrently and return their results in order.
+
+    If one fails the others are cancelled and awaited before the error is
+    re-raised, so no scraping task outlives the request.
+    """
+    tasks = [asyncio.create_task(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+async def gather_sources(topics, source_type, headlines_only: bool = False):
+    """Run the requested source branches concurrently"""
+    branches = {}
+    if source_type in ["news", "both"]:
+        # The fused mode summarizes the raw headlines itself
+        branches["news"] = scrape_news_headlines_source(topics) if headlines_only else scrape_news_source(topics)
+    if source_type in ["reddit", "both"]:
+        branches["reddit"] = scrape_reddit_source(topics)
+
+    results = await gather_or_cancel(branches.values())
+    return dict(zip(branches, results))
+
+def record_popularity(topics, source_type):
+    for source in ("news", "reddit"):
+        if source_type in [source, "both"]:
+            for topic in topics:
+                topic_popularity.record(source, topic)
+
+AUDIO_HEADERS = {"Content-Disposition": "attachment; filename=news-summary.mp3"}
+
+async def prepend_chunk(first_chunk, stream):
+    yield first_chunk
+    async for chunk in stream:
+        yield chunk
+
+def audio_headers(skipped: dict) -> dict:
+    """Response headers, listing the topics left out because they missed the deadline"""
+    if not skipped:
+        return AUDIO_HEADERS
+    return {**AUDIO_HEADERS, "X-Skipped-Topics": json.dumps(skipped)}
+
+async def streaming_audio_response(audio_stream, request_deadline) -> StreamingResponse:
     try:
-        print(f"Received request for topics: {request.topics}, source_type: {request.source_type}")
-        results = {}
-        
-        if request.source_type in ["news", "both"]:
-            print("Initializing NewsEngine...")
-            # 2. CHANGED: Create an instance of NewsEngine
-            news_scraper = NewsEngine()
-            print(f"NewsEngine type: {type(news_scraper)}")
-            
-            print("Calling scrape_news...")
-            news_results = await news_scraper.scrape_news(request.topics)
-            print(f"News results: {news_results}")
-            results["news"] = news_results
-        
-        if request.source_type in ["reddit", "both"]:
-            print("Scraping Reddit...")
-            reddit_results = await scrape_reddit_topics(request.topics)
-            print(f"Reddit results: {reddit_results}")
-            results["reddit"] = reddit_results
-
-        # Safely extract nested data with defaults
-        news_data = results.get("news", {})
-        reddit_data = results.get("reddit", {})
-        
+        # Pull the first chunk here so failures before any audio still turn into a 500
+        first_chunk = await within_deadline(anext(audio_stream))
+    except StopAsyncIteration:
+        raise HTTPException(status_code=500, detail="Audio file generation failed")
+    except BaseException:
+        await audio_stream.aclose()
+        raise
+
+    return StreamingResponse(
+        prepend_chunk(first_chunk, audio_stream),
+        media_type="audio/mpeg",
+        headers=audio_headers(request_deadline.skipped)
+    )
+
+TTS_OPTIONS = dict(
+    voice_id="JBFqnCBsd6RMkjVDRZzb",
+    model_id="eleven_multilingual_v2",
+    output_format="mp3_44100_128",
+    output_dir="audio"
+)
+
+async def gather_request_sources(request: NewsRequest):
+    """Scrape the requested sources, returns (news_data, reddit_data)"""
+    print(f"Received request for topics: {request.topics}, source_type: {request.source_type}")
+    record_popularity(request.topics, request.source_type)
+    with sources_phase():
+        results = await gather_sources(request.topics, request.source_type, headlines_only=request.mode == "fused")
+
+    # Safely extract nested data with defaults
+    return results.get("news", {}), results.get("reddit", {})
+
+async def build_broadcast_script(request: NewsRequest) -> str:
+    """Scrape the requested sources and turn them into a broadcast script"""
+    news_data, reddit_data = await gather_request_sources(request)
+
+    if request.mode == "fused":
+        print("Generating fused broadcast news...")
+        news_summary = await generate_fused_broadcast_news_async(
+            api_key=os.getenv("OPENROUTER_API_KEY"),
+            headlines_data=news_data,
+            reddit_data=reddit_data,
+            topics=request.topics
+        )
+    else:
         print("Generating broadcast news...")
-        news_summary = generate_broadcast_news(
+        news_summary = await generate_broadcast_news_async(
             api_key=os.getenv("OPENROUTER_API_KEY"),
             news_data=news_data,
             reddit_data=reddit_data,
             topics=request.topics
         )
-        print(f"Generated summary length: {len(news_summary)} characters")
+    print(f"Generated summary length: {len(news_summary)} characters")
+    return news_summary
+
+# Audio of finished per-topic segments for mode="segmented", keyed by source type and topic
+segment_cache = TTLCache(
+    "segment",
+    ttl=float(os.getenv("SEGMENT_CACHE_TTL", "900")),
+    max_entries=int(os.getenv("SEGMENT_CACHE_MAX_ENTRIES", "256")),
+)
+
+# Topics of one segmented request that are scripted and synthesized at the same time
+SEGMENT_CONCURRENCY = int(os.getenv("SEGMENT_CONCURRENCY", "4"))
+
+@track("segment")
+async def build_segment(topic: str, source_type: str):
+    """Scrape, script and synthesize one topic, returns the MP3 path or None without content"""
+    key = f"{source_type}:{normalize_topic(topic)}"
+    cached = segment_cache.get(key)
+    if cached is not None and Path(cached).exists():
+        return cached
+
+    with sources_phase():
+        results = await gather_sources([topic], source_type)
+    news_data = results.get("news", {})
+    reddit_data = results.get("reddit", {})
+
+    script = await generate_broadcast_news_async(
+        api_key=os.getenv("OPENROUTER_API_KEY"),
+        news_data=news_data,
+        reddit_data=reddit_data,
+        topics=[topic]
+    )
+    if script == NO_BROADCAST_CONTENT:
+        return None
+
+    audio_path = await text_to_audio_elevenlabs_async(text=script, **TTS_OPTIONS)
+
+    # Segments written around a failed source, or one skipped at the deadline,
+    # are not reused by later requests
+    analyses = []
+    if source_type in ["news", "both"]:
+        analyses.append(news_data.get("news_analysis", {}))
+    if source_type in ["reddit", "both"]:
+        analyses.append(reddit_data.get("reddit_analysis", {}))
+    if all(topic in analysis and is_usable_summary(analysis[topic]) for analysis in analyses):
+        segment_cache.set(key, audio_path)
+    return audio_path
+
+async def generate_segmented_audio_file(request: NewsRequest) -> str:
+    """Build every topic's segment concurrently and join them in request order"""
+    print(f"Received segmented request for topics: {request.topics}, source_type: {request.source_type}")
+    record_popularity(request.topics, request.source_type)
+    semaphore = asyncio.Semaphore(SEGMENT_CONCURRENCY)
+
+    async def limited_segment(topic):
+        async with semaphore:
+            try:
+                return await build_segment(topic, request.source_type)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                # The other segments still make a broadcast, the failed topic
+                # is reported like one that missed the deadline
+                log_error(e)
+                request_deadline = current_deadline.get()
+                if request_deadline is not None:
+                    request_deadline.skip("segment", topic)
+                return None
+
+    # Segments still running at the deadline are left out of the broadcast
+    with keep_back(STITCH_RESERVE, 0.9):
+        segments = await gather_topics("segment", request.topics, limited_segment)
+    segments = [path for path in segments.values() if path]
+    if not segments:
+        raise RuntimeError(NO_BROADCAST_CONTENT)
+    if len(segments) == 1:
+        return segments[0]
+
+    print(f"Stitching {len(segments)} segments...")
+    return await asyncio.to_thread(stitch_audio_files, segments, TTS_OPTIONS["output_dir"])
+
+# Chunk sizes and TTS lookahead for mode="pipelined"
+PIPELINE_FIRST_CHUNK_CHARS = int(os.getenv("PIPELINE_FIRST_CHUNK_CHARS", "150"))
+PIPELINE_CHUNK_CHARS = int(os.getenv("PIPELINE_CHUNK_CHARS", "600"))
+PIPELINE_LOOKAHEAD = int(os.getenv("PIPELINE_LOOKAHEAD", "2"))
+
+async def synthesize_chunk(text: str) -> str:
+    return await text_to_audio_elevenlabs_async(text=text, **TTS_OPTIONS)
+
+async def pipelined_audio_files(request: NewsRequest):
+    """Yield the MP3 paths of the script's chunks in order while the LLM is still writing it"""
+    news_data, reddit_data = await gather_request_sources(request)
+
+    print("Streaming broadcast news into TTS...")
+    deltas = stream_broadcast_news_async(
+        api_key=os.getenv("OPENROUTER_API_KEY"),
+        news_data=news_data,
+        reddit_data=reddit_data,
+        topics=request.topics
+    )
+    chunks = chunk_script(deltas, first_chars=PIPELINE_FIRST_CHUNK_CHARS, min_chars=PIPELINE_CHUNK_CHARS)
+    async with aclosing(deltas), aclosing(pipelined(chunks, synthesize_chunk, PIPELINE_LOOKAHEAD)) as paths:
+        async for path in paths:
+            yield path
+
+async def stream_pipelined_audio(request: NewsRequest):
+    """Audio frames of every pipelined chunk, playable as one MP3 stream"""
+    async with aclosing(pipelined_audio_files(request)) as paths:
+        async for path in paths:
+            data = await asyncio.to_thread(Path(path).read_bytes)
+            # Per-chunk ID3 tags and Xing/Info frames would break the joined stream
+            yield join_mp3([data])
+
+async def generate_audio_file(request: NewsRequest) -> str:
+    """Run the whole pipeline and return the path of the MP3"""
+    set_source_type(request.source_type)
+    if request.mode == "segmented":
+        audio_path = await generate_segmented_audio_file(request)
+    elif request.mode == "pipelined":
+        chunk_paths = [path async for path in pipelined_audio_files(request)]
+        if not chunk_paths:
+            raise RuntimeError(NO_BROADCAST_CONTENT)
+        audio_path = await asyncio.to_thread(stitch_audio_files, chunk_paths, TTS_OPTIONS["output_dir"])
+    else:
+        news_summary = await build_broadcast_script(request)
 
         print("Converting to audio...")
-        audio_path = text_to_audio_elevenlabs_sdk(
-            text=news_summary,
-            voice_id="JBFqnCBsd6RMkjVDRZzb",
-            model_id="eleven_multilingual_v2",
-            output_format="mp3_44100_128",
-            output_dir="audio"
-        )
-        print(f"Audio path: {audio_path}")
-
-        if audio_path and Path(audio_path).exists():
-            with open(audio_path, "rb") as f:
-                audio_bytes = f.read()
-
-            return Response(
-                content=audio_bytes,
-                media_type="audio/mpeg",
-                headers={"Content-Disposition": "attachment; filename=news-summary.mp3"}
-            )
-        else:
-            raise HTTPException(status_code=500, detail="Audio file generation failed")
-    
+        audio_path = await text_to_audio_elevenlabs_async(text=news_summary, **TTS_OPTIONS)
+    print(f"Audio path: {audio_path}")
+
+    if not audio_path or not Path(audio_path).exists():
+        raise RuntimeError("Audio file generation failed")
+    return audio_path
+
+def log_error(e: Exception):
+    # Detailed error logging
+    error_detail = f"{str(e)}\n\nTraceback:\n{traceback.format_exc()}"
+    print("=" * 80)
+    print("ERROR OCCURRED:")
+    print(error_detail)
+    print("=" * 80)
+
+@app.post("/generate-news-audio")
+async def generate_news_audio(request: NewsRequest):
+    # Labels every stage metric recorded while serving this request
+    set_source_type(request.source_type)
+    try:
+        # Every stage below sees the deadline, topics that miss it are left out
+        with deadline(deadline_seconds(request, REQUEST_DEADLINE)) as request_deadline:
+            if request.stream and request.mode == "pipelined":
+                print("Streaming pipelined audio...")
+                return await streaming_audio_response(stream_pipelined_audio(request), request_deadline)
+
+            # Segmented broadcasts are stitched from finished segments and served as a file
+            if request.stream and request.mode in ["single", "fused"]:
+                news_summary = await within_deadline(build_broadcast_script(request))
+
+                print("Streaming audio...")
+                return await streaming_audio_response(
+                    stream_audio_elevenlabs(text=news_summary, **TTS_OPTIONS), request_deadline
+                )
+
+            audio_path = await within_deadline(generate_audio_file(request))
+        # Served from disk in chunks instead of reading the whole MP3 into memory
+        return FileResponse(audio_path, media_type="audio/mpeg", headers=audio_headers(request_deadline.skipped))
+
+    except DeadlineExceeded as e:
+        log_error(e)
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
-        # Detailed error logging
-        error_detail = f"{str(e)}\n\nTraceback:\n{traceback.format_exc()}"
-        print("=" * 80)
-        print("ERROR OCCURRED:")
-        print(error_detail)
-        print("=" * 80)
+        log_error(e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/jobs", status_code=202)
+async def submit_job(request: NewsRequest):
+    """Queue a generation job and return its id right away"""
+    try:
+        job = job_manager.submit(request)
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many queued jobs, please retry later",
+            headers={"Retry-After": "30"}
+        )
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Status of a job, with the audio URL once it is done"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    status = job.to_dict()
+    if job.status == "done":
+        status["audio_url"] = f"/jobs/{job.id}/audio"
+    return status
+
+
+@app.get("/jobs/{job_id}/audio")
+async def job_audio(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return FileResponse(job.result, media_type="audio/mpeg", headers=audio_headers(job.skipped_topics))
+
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the worker's event loop is responsive"""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once the worker has warmed up, 503 before that and while shutting down"""
+    report = {**warmup.report(), "mcp_pool": reddit_pool.stats()}
+    return JSONResponse(report, status_code=200 if warmup.ready else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage latency, in-flight, error and payload size metrics in Prometheus text format"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache-stats")
+async def cache_stats():
+    """Hit/miss counters of the upstream caches, rate limit waits and LLM model health"""
+    return {
+        "fetch": fetch_cache.stats(),
+        "llm": llm_cache.stats(),
+        "audio": audio_cache_stats,
+        "mcp_pool": reddit_pool.stats(),
+        "jobs": job_manager.stats(),
+        "news_topic": news_topic_cache.stats(),
+        "reddit_topic": reddit_topic_cache.stats(),
+        "segment": segment_cache.stats(),
+        "coalescing": {"news": news_flights.stats, "reddit": reddit_flights.stats},
+        "rate_limits": rate_limit_stats(),
+        "llm_models": openrouter_router.model_stats(),
+        "warming": {
+            **cache_warmer.stats,
+            "tracked_topics": len(topic_popularity),
+            "hot": [
+                {"source": source, "topic": topic, "score": round(score, 2)}
+                for source, topic, score in topic_popularity.top(cache_warmer.top_n)
+            ],
+        },
+    }
+
+
 if __name__ == "__main__":
+    # Development server with auto-reload, use serve.py in production
     import uvicorn
     uvicorn.run(
         "backend:app",
@@ -0,0 +1,175 @@
+"""
+Latency and token benchmark: two-tier vs fused broadcast generation.
+
+The two-tier flow summarizes every topic's headlines with its own OpenRouter
+call (NEWS_MAX_CONCURRENCY at a time) and then rewrites the summaries into
+the broadcast with one more call. The fused flow writes the broadcast from
+the raw headlines in a single call.
+
+Headlines come from the saved pages in samples/ and, for more topics, from
+synthetic pages, so BrightData is never called. Token counts are the
+`usage` OpenRouter reports, tallied through newsninja_llm_tokens_total.
+
+Usage:
+    python bench_fused.py                        # live, needs OPENROUTER_API_KEY
+    python bench_fused.py --topics 2,5 --repeat 3
+    python bench_fused.py --simulate             # offline, simulated upstream
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+import utils
+from bench_pipeline import make_news_page
+from cache import TTLCache
+from headline_parser import extract_headlines_from_html
+from llm_router import openrouter_router
+from metrics import llm_tokens, set_source_type
+from news_scraper import DEFAULT_MAX_CONCURRENCY
+
+SAMPLES = sorted((Path(__file__).parent / "samples").glob("google_news_*.html"))
+
+# Simulated upstream: fixed time to first token plus decoding at a constant rate
+SIM_FIRST_TOKEN_S = 1.5
+SIM_TOKENS_PER_S = 60
+SIM_SUMMARY_TOKENS = 300
+SIM_SEGMENT_TOKENS = 250
+
+
+def load_headlines(count: int) -> dict:
+    """Headlines for count topics, saved samples first, then synthetic pages"""
+    headlines = {}
+    for path in SAMPLES[:count]:
+        topic = path.stem.replace("google_news_", "")
+        headlines[topic] = extract_headlines_from_html(path.read_text(encoding="utf-8"))
+    for i in range(len(headlines), count):
+        headlines[f"topic{i}"] = extract_headlines_from_html(make_news_page(60_000, seed=i))
+    return headlines
+
+
+def simulated_client() -> httpx.AsyncClient:
+    """OpenRouter stand-in whose latency grows with the tokens it writes"""
+
+    async def handler(request):
+        payload = json.loads(request.content)
+        prompt_chars = sum(len(m["content"]) for m in payload["messages"])
+        user_prompt = payload["messages"][-1]["content"]
+        topics = user_prompt.count("TOPIC: ")
+        completion = SIM_SEGMENT_TOKENS * topics if topics else SIM_SUMMARY_TOKENS
+        completion = min(completion, payload.get("max_tokens", completion))
+        await asyncio.sleep(SIM_FIRST_TOKEN_S + completion / SIM_TOKENS_PER_S)
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": "word " * completion}}],
+            # Roughly 4 characters per token for English text
+            "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": completion},
+        })
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def two_tier(api_key: str, headlines: dict) -> str:
+    semaphore = asyncio.Semaphore(DEFAULT_MAX_CONCURRENCY)
+
+    async def summarize(text):
+        async with semaphore:
+            return await utils.summarize_with_openrouter_news_script_async(api_key=api_key, headlines=text)
+
+    summaries = await asyncio.gather(*(summarize(text) for text in headlines.values()))
+    news_data = {"news_analysis": dict(zip(headlines, summaries))}
+    return await utils.generate_broadcast_news_async(api_key, news_data, {}, list(headlines))
+
+
+async def fused(api_key: str, headlines: dict) -> str:
+    return await utils.generate_fused_broadcast_news_async(
+        api_key, {"news_headlines": headlines}, {}, list(headlines)
+    )
+
+
+def _tokens(source: str) -> dict:
+    return {
+        kind: sum(v for k, v in llm_tokens.values.items() if dict(k).get("source") == source and dict(k)["kind"] == kind)
+        for kind in ("prompt", "completion")
+    }
+
+
+async def measure(flow: str, run, api_key: str, headlines: dict, repeat: int) -> dict:
+    timings = []
+    source = f"bench_{flow}_{len(headlines)}"
+    set_source_type(source)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await run(api_key, headlines)
+        timings.append(time.perf_counter() - start)
+    tokens = _tokens(source)
+    return {
+        "flow": flow,
+        "topics": len(headlines),
+        "llm_calls": len(headlines) + 1 if flow == "two_tier" else 1,
+        "best_s": min(timings),
+        "median_s": statistics.median(timings),
+        "prompt_tokens": tokens["prompt"] / repeat,
+        "completion_tokens": tokens["completion"] / repeat,
+        "total_tokens": (tokens["prompt"] + tokens["completion"]) / repeat,
+    }
+
+
+async def run(topic_counts, repeat: int, api_key: str) -> list:
+    results = []
+    for count in topic_counts:
+        headlines = load_headlines(count)
+        for flow, func in (("two_tier", two_tier), ("fused", fused)):
+            results.append(await measure(flow, func, api_key, headlines, repeat))
+    return results
+
+
+def print_table(results: list):
+    print(f"{'topics':>6} {'flow':>9} {'calls':>5} {'best s':>8} {'median s':>9} {'prompt tok':>11} {'compl tok':>10} {'total tok':>10}")
+    for r in results:
+        print(
+            f"{r['topics']:6d} {r['flow']:>9} {r['llm_calls']:5d} {r['best_s']:8.2f} {r['median_s']:9.2f} "
+            f"{r['prompt_tokens']:11.0f} {r['completion_tokens']:10.0f} {r['total_tokens']:10.0f}"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topics", default="1,2,5", help="comma separated topic counts")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--simulate", action="store_true", help="use a simulated OpenRouter instead of the real one")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if args.simulate:
+        client = simulated_client()
+        utils.get_async_client = lambda name: client
+        api_key = "simulated"
+        # The simulated upstream has no request quota to protect, and every
+        # simulated model is equally slow so hedging only adds calls
+        os.environ["RATE_LIMIT_OPENROUTER"] = "0"
+        openrouter_router.hedge = False
+    elif not api_key:
+        parser.error("OPENROUTER_API_KEY is not set, use --simulate for an offline run")
+
+    # Every run has to reach the model
+    utils.llm_cache = TTLCache("bench", ttl=0)
+
+    topic_counts = [int(n) for n in args.topics.split(",") if n.strip()]
+    results = asyncio.run(run(topic_counts, args.repeat, api_key))
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"simulated": args.simulate, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Offline microbenchmarks for the CPU-bound text pipeline.
+
+Runs clean_html_to_text, extract_headlines, the headline parser backends,
+headline deduplication, generate_news_urls_to_scrape and the broadcast prompt
+assembly (with and without token budget compaction) against
+synthetic Google-News-like pages (50 KB to 5 MB) and many-topic prompt
+payloads. No network access or API keys are needed.
+
+Usage:
+    python bench_pipeline.py                          # print a table
+    python bench_pipeline.py --output bench.json      # also write JSON
+    python bench_pipeline.py --save-baseline base.json
+    python bench_pipeline.py --baseline base.json     # compare, exit 1 on regression
+"""
+import argparse
+import gc
+import html
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from headline_dedup import dedupe_headline_text
+from headline_parser import available_backends, extract_headlines_from_html
+from utils import (
+    BROADCAST_PROMPT_TOKENS,
+    build_broadcast_prompt,
+    clean_html_to_text,
+    extract_headlines,
+    generate_news_urls_to_scrape,
+)
+
+SIZES = {"50k": 50_000, "500k": 500_000, "5m": 5_000_000}
+TOPIC_COUNTS = [5, 50, 500]
+MIN_SAMPLE_S = 0.05
+
+SOURCES = ["Reuters", "CNBC", "The Economic Times", "BBC", "Bloomberg", "Mint", "The Hindu", "NDTV"]
+WORDS = (
+    "market rally investors record growth policy election court ruling climate storm "
+    "launch startup funding quarter results shares bank inflation rate cut crypto "
+    "bitcoin ether regulator probe AI model chip data centre deal merger strike"
+).split()
+
+
+def _headline(rnd: random.Random) -> str:
+    words = rnd.choices(WORDS, k=rnd.randint(6, 14))
+    return html.escape(" ".join(words).capitalize())
+
+
+def make_news_page(target_bytes: int, seed: int = 0) -> str:
+    """Build a synthetic Google News search page of roughly target_bytes"""
+    rnd = random.Random(seed)
+    head = (
+        '<!doctype html><html lang="en-IN"><head><meta charset="utf-8"><title>Bench - Google News</title>'
+        '<style>.JtKRv{font-weight:500}</style>'
+        '<script>window.WIZ_global_data={"More":"More"};</script></head><body>'
+        '<header><a href="./">Google News</a><nav><a>Home</a><a>For you</a><a>Following</a></nav></header>'
+        "<main><c-wiz>"
+    )
+    tail = "</c-wiz></main><footer><a>About Google News</a></footer></body></html>"
+    parts = [head]
+    size = len(head) + len(tail)
+    i = 0
+    while size < target_bytes:
+        article = (
+            f'<article class="IFHyqb"><div class="vr1PYe"><img alt="" src="logo{i}.png"></div>'
+            f'<a class="JtKRv" href="./read/CBM{i}">{_headline(rnd)}</a>'
+            f'<div class="wsLqz"><div class="vr1PYe">{rnd.choice(SOURCES)}</div>'
+            f'<time datetime="2026-10-01T08:00:00Z">{rnd.randint(1, 23)} hours ago</time></div>'
+            '<div class="MCAGUe"><button aria-label="More"><i>more_vert</i><span>More</span></button></div>'
+            "</article>\n"
+        )
+        parts.append(article)
+        size += len(article)
+        i += 1
+    parts.append(tail)
+    return "".join(parts)
+
+
+def make_prompt_payload(topic_count: int, seed: int = 0):
+    """News and Reddit analysis dicts for topic_count topics"""
+    rnd = random.Random(seed)
+    topics = [f"Topic {i} {rnd.choice(WORDS)}" for i in range(topic_count)]
+    paragraph = lambda n: " ".join(rnd.choices(WORDS, k=n)).capitalize() + "."
+    news = {t: "\n\n".join(paragraph(60) for _ in range(4)) for t in topics}
+    reddit = {t: "\n\n".join(paragraph(40) for _ in range(3)) for t in topics}
+    return {"news_analysis": news}, {"reddit_analysis": reddit}, topics
+
+
+def measure(name: str, func, arg_bytes: int, repeat: int) -> dict:
+    """Time func over repeat runs, then measure memory of one extra run"""
+    func()  # warm up imports and caches
+
+    # Like timeit, loop fast functions so every sample takes at least MIN_SAMPLE_S
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= MIN_SAMPLE_S or number >= 1_000_000:
+            break
+        number *= 10
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+
+    gc.collect()
+    collections_before = sum(s["collections"] for s in gc.get_stats())
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks_after = sys.getallocatedblocks()
+    collections = sum(s["collections"] for s in gc.get_stats()) - collections_before
+
+    best = min(timings)
+    result = {
+        "name": name,
+        "runs": repeat,
+        "loops": number,
+        "best_s": best,
+        "median_s": statistics.median(timings),
+        "calls_per_s": 1 / best if best else None,
+        "peak_bytes": peak,
+        "retained_blocks": blocks_after - blocks_before,
+        "gc_collections": collections,
+    }
+    if arg_bytes:
+        result["input_bytes"] = arg_bytes
+        result["mb_per_s"] = arg_bytes / best / 1e6 if best else None
+    return result
+
+
+def run(sizes, repeat: int) -> list:
+    results = []
+    for label in sizes:
+        page = make_news_page(SIZES[label], seed=len(label))
+        n = len(page.encode("utf-8"))
+        text = clean_html_to_text(page)
+        results.append(measure(f"clean_html_to_text[{label}]", lambda: clean_html_to_text(page), n, repeat))
+        results.append(measure(f"extract_headlines[{label}]", lambda: extract_headlines(text), len(text), repeat))
+        for backend in available_backends():
+            results.append(measure(
+                f"extract_headlines_from_html:{backend}[{label}]",
+                lambda b=backend: extract_headlines_from_html(page, backend=b),
+                n,
+                repeat,
+            ))
+        headlines = extract_headlines_from_html(page)
+        results.append(measure(
+            f"dedupe_headline_text[{label}]", lambda: dedupe_headline_text(headlines), len(headlines), repeat
+        ))
+
+    for count in TOPIC_COUNTS:
+        news_data, reddit_data, topics = make_prompt_payload(count)
+        results.append(measure(
+            f"generate_news_urls_to_scrape[{count}]", lambda: generate_news_urls_to_scrape(topics), 0, repeat
+        ))
+        results.append(measure(
+            f"build_broadcast_prompt[{count}]",
+            lambda: build_broadcast_prompt(news_data, reddit_data, topics),
+            0,
+            repeat,
+        ))
+        results.append(measure(
+            f"build_broadcast_prompt:budget[{count}]",
+            lambda: build_broadcast_prompt(news_data, reddit_data, topics, token_budget=BROADCAST_PROMPT_TOKENS),
+            0,
+            repeat,
+        ))
+    return results
+
+
+def compare(results: list, baseline: dict, threshold: float) -> bool:
+    """Print time ratios against a baseline, return False if anything regressed past threshold"""
+    base = {r["name"]: r for r in baseline["results"]}
+    ok = True
+    print(f"\n{'benchmark':55} {'base ms':>10} {'now ms':>10} {'ratio':>7}")
+    for r in results:
+        old = base.get(r["name"])
+        if not old:
+            print(f"{r['name']:55} {'-':>10} {r['best_s'] * 1000:10.2f} {'new':>7}")
+            continue
+        ratio = r["best_s"] / old["best_s"] if old["best_s"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            ok = False
+            flag = "  REGRESSION"
+        print(f"{r['name']:55} {old['best_s'] * 1000:10.2f} {r['best_s'] * 1000:10.2f} {ratio:7.2f}{flag}")
+    return ok
+
+
+def print_table(results: list):
+    print(f"{'benchmark':55} {'best ms':>10} {'MB/s':>8} {'calls/s':>9} {'peak KB':>10} {'blocks':>8} {'gc':>4}")
+    for r in results:
+        mbps = f"{r['mb_per_s']:8.1f}" if r.get("mb_per_s") else f"{'-':>8}"
+        print(
+            f"{r['name']:55} {r['best_s'] * 1000:10.2f} {mbps} {r['calls_per_s']:9.1f} "
+            f"{r['peak_bytes'] / 1024:10.1f} {r['retained_blocks']:8d} {r['gc_collections']:4d}"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(SIZES), help="comma separated page sizes (50k,500k,5m)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--save-baseline", help="write results as the new baseline JSON")
+    parser.add_argument("--baseline", help="compare against a stored baseline JSON")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown ratio vs baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes {unknown}, choose from {list(SIZES)}")
+
+    results = run(sizes, args.repeat)
+    print_table(results)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backends": available_backends(),
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Small in-process caches used in front of the upstream services.
+
+TTLCache is an LRU-bounded, time-expiring key/value store with hit/miss
+counters and an optional gzip-compressed on-disk tier that survives restarts.
+Values must be JSON serializable when the disk tier is enabled.
+
+Coroutines use aget/aset, which run the disk tier (gzip and JSON of pages of
+up to a few MB) in a worker thread instead of on the event loop.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    def __init__(self, name: str, ttl: float, max_entries: int = 256, disk_dir: str = None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _get_memory(self, key: str, now: float):
+        """(True, value) on an in-memory hit, (False, None) otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return True, value
+                del self._entries[key]
+                self._stats["expirations"] += 1
+        return False, None
+
+    def _disk_result(self, key: str, entry):
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._store(key, entry)
+        return entry[1]
+
+    def get(self, key: str):
+        """Return the cached value for key, or None on a miss or expired entry"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        hit, value = self._get_memory(key, now)
+        if hit:
+            return value
+        return self._disk_result(key, self._read_disk(key, now))
+
+    async def aget(self, key: str):
+        """get for coroutines, the disk tier is read in a worker thread"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        hit, value = self._get_memory(key, now)
+        if hit:
+            return value
+        entry = await asyncio.to_thread(self._read_disk, key, now) if self.disk_dir else None
+        return self._disk_result(key, entry)
+
+    def set(self, key: str, value):
+        """Store value under key for the configured TTL"""
+        if not self.enabled:
+            return
+
+        entry = (time.time() + self.ttl, value)
+        with self._lock:
+            self._store(key, entry)
+        self._write_disk(key, entry)
+
+    async def aset(self, key: str, value):
+        """set for coroutines, the disk tier is written in a worker thread"""
+        if not self.enabled:
+            return
+
+        entry = (time.time() + self.ttl, value)
+        with self._lock:
+            self._store(key, entry)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, entry)
+
+    def expires_in(self, key: str):
+        """Seconds until the in-memory entry for key expires, None if there is none"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry[0] - time.time()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "disk": bool(self.disk_dir),
+            }
+
+    def _store(self, key, entry):
+        # Caller holds the lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.json.gz")
+
+    def _read_disk(self, key: str, now: float):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("key") != key:
+            return None
+        if record.get("expires_at", 0) <= now:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return record["expires_at"], record["value"]
+
+    def _write_disk(self, key: str, entry):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        # Write to a temp file first so readers never see a half-written entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump({"key": key, "expires_at": entry[0], "value": entry[1]}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Cache {self.name}: could not write disk entry: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
@@ -0,0 +1,169 @@
+"""
+End-to-end request deadlines.
+
+A request sets its deadline once with `deadline(seconds)`, and every stage
+below it sees it through a context variable, including the tasks it spawns:
+
+    with deadline(120) as request_deadline:
+        ...
+        print(request_deadline.skipped)
+
+- gather_topics runs per-topic work until the deadline, cancels the
+  stragglers and records them as skipped, so the broadcast is built from
+  the topics that finished
+- stop_at_deadline is a tenacity stop condition: no retry is started when
+  its back-off would end past the deadline
+- clamp_timeout shortens upstream HTTP timeouts to the time that is left
+
+Nested deadlines (e.g. keep_back for the scraping phase, so the script and
+audio still fit) never extend the outer one and share its skipped topics.
+
+Work shared by several requests (singleflight) runs in without_deadline()
+and every waiter applies its own deadline with within_deadline. A topic that
+raises DeadlineExceeded is skipped like one cancelled at the deadline.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import Context, ContextVar, copy_context
+from typing import Awaitable, Callable, Dict, List
+
+from metrics import Counter, register
+
+skipped_topics = register(Counter(
+    "newsninja_skipped_topics_total", "Topics left out of a broadcast because their source missed the deadline or failed"
+))
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    def __init__(self, expires_at: float, skipped: Dict[str, List[str]] = None):
+        self.expires_at = expires_at
+        self.skipped = {} if skipped is None else skipped  # source -> topics
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def skip(self, source: str, topic: str):
+        self.skipped.setdefault(source, []).append(topic)
+        skipped_topics.inc(source=source)
+
+
+current_deadline = ContextVar("current_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Run the block under a deadline seconds from now, or the enclosing one if that is sooner"""
+    parent = current_deadline.get()
+    expires_at = time.monotonic() + seconds
+    if parent is not None:
+        child = Deadline(min(expires_at, parent.expires_at), parent.skipped)
+    else:
+        child = Deadline(expires_at)
+    token = current_deadline.set(child)
+    try:
+        yield child
+    finally:
+        current_deadline.reset(token)
+
+
+def without_deadline() -> Context:
+    """Copy of the current context without a deadline, for tasks serving several requests"""
+    context = copy_context()
+    context.run(current_deadline.set, None)
+    return context
+
+
+@contextmanager
+def keep_back(seconds: float, min_share: float = 0.0):
+    """
+    Narrow the current deadline by seconds, to leave time for the stages after the block.
+
+    The block still gets at least min_share of the time left. Without a deadline
+    this does nothing.
+    """
+    left = remaining()
+    if left is None:
+        yield current_deadline.get()
+        return
+    with deadline(max(left * min_share, left - seconds)) as narrowed:
+        yield narrowed
+
+
+def remaining():
+    """Seconds left before the current deadline, None without one"""
+    current = current_deadline.get()
+    return None if current is None else current.remaining()
+
+
+def clamp_timeout(timeout: float) -> float:
+    """timeout, shortened to the time left before the deadline"""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return min(timeout, left)
+
+
+def stop_at_deadline(retry_state) -> bool:
+    """tenacity stop condition, combine with others using |"""
+    left = remaining()
+    return left is not None and retry_state.upcoming_sleep >= left
+
+
+async def within_deadline(awaitable: Awaitable):
+    """Await under the current deadline, DeadlineExceeded when it runs out first"""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, max(0.0, left))
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+
+async def gather_topics(source: str, topics: List[str], run: Callable[[str], Awaitable]) -> dict:
+    """
+    Run run(topic) for every topic concurrently until the deadline.
+
+    Returns {topic: result} for the topics that finished, in request order.
+    Unfinished topics, and topics that raised DeadlineExceeded, are recorded
+    as skipped on the deadline. If a topic raises anything else, the others
+    are cancelled and the error is re-raised.
+    """
+    tasks = {topic: asyncio.create_task(run(topic)) for topic in dict.fromkeys(topics)}
+    if not tasks:
+        return {}
+    left = remaining()
+    try:
+        await asyncio.wait(
+            tasks.values(), timeout=None if left is None else max(0.0, left), return_when=asyncio.FIRST_EXCEPTION
+        )
+    finally:
+        pending = [task for task in tasks.values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def missed(task) -> bool:
+        return task.cancelled() or isinstance(task.exception(), DeadlineExceeded)
+
+    for task in tasks.values():
+        if not missed(task) and task.exception() is not None:
+            raise task.exception()
+
+    current = current_deadline.get()
+    results = {}
+    for topic, task in tasks.items():
+        if missed(task):
+            if current is not None:
+                current.skip(source, topic)
+            print(f"Skipped {source} topic {topic}: deadline exceeded")
+        else:
+            results[topic] = task.result()
+    return results
@@ -1,10 +1,18 @@
 import streamlit as st
 import requests
+import json
+import time
 from typing import Literal
 
 # Constants
 SOURCE_TYPES = Literal["news", "reddit", "both"]
 BACKEND_URL = "http://localhost:1234"  # Update port if needed
+REQUEST_TIMEOUT = 30  # Seconds for a single HTTP call to the backend
+JOB_TIMEOUT = 600  # Seconds to wait for a generation job to finish
+POLL_INTERVAL = 2
+
+class JobFailed(Exception):
+    pass
 
 def main(): 
     st.title("🥷 NewsNinja")
@@ -62,15 +70,10 @@ def main():
         else:
             with st.spinner("🔍 Analyzing topics and generating audio..."):
                 try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/generate-news-audio",
-                        json={
-                            "topics": st.session_state.topics,
-                            "source_type": source_type
-                        }
-                    )
+                    response = generate_audio(st.session_state.topics, source_type)
 
                     if response.status_code == 200:
+                        show_skipped_topics(response)
                         st.audio(response.content, format="audio/mpeg")
                         st.download_button(
                             "Download Audio Summary",
@@ -83,10 +86,52 @@ def main():
 
                 except requests.exceptions.ConnectionError:
                     st.error("🔌 Connection Error: Could not reach the backend server")
+                except JobFailed as e:
+                    st.error(f"❌ Generation failed: {str(e)}")
+                except requests.exceptions.Timeout:
+                    st.error("⏱️ Timeout: The backend did not finish in time, please try again")
                 except Exception as e:
                     st.error(f"⚠️ Unexpected Error: {str(e)}")
 
 
+def generate_audio(topics, source_type):
+    """
+    Submit a generation job and poll it until the audio is ready.
+
+    Returns the final HTTP response: the MP3 on success, or the error response.
+    """
+    response = requests.post(
+        f"{BACKEND_URL}/jobs",
+        json={"topics": topics, "source_type": source_type},
+        timeout=REQUEST_TIMEOUT
+    )
+    if response.status_code != 202:
+        return response
+    job_url = f"{BACKEND_URL}{response.json()['status_url']}"
+
+    deadline = time.monotonic() + JOB_TIMEOUT
+    while time.monotonic() < deadline:
+        response = requests.get(job_url, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 200:
+            return response
+        job = response.json()
+        if job["status"] == "done":
+            return requests.get(f"{BACKEND_URL}{job['audio_url']}", timeout=REQUEST_TIMEOUT)
+        if job["status"] == "failed":
+            raise JobFailed(job["error"])
+        time.sleep(POLL_INTERVAL)
+
+    raise requests.exceptions.Timeout(f"Job did not finish within {JOB_TIMEOUT}s")
+
+
+def show_skipped_topics(response):
+    """Warn about topics the backend left out of the broadcast"""
+    skipped = response.headers.get("X-Skipped-Topics")
+    if skipped:
+        left_out = ", ".join(f"{topic} ({source})" for source, topics in json.loads(skipped).items() for topic in topics)
+        st.warning(f"⏭️ Left out of this summary: {left_out}")
+
+
 def handle_api_error(response):
     """Handle API error responses"""
     try:
@@ -0,0 +1,158 @@
+"""
+Near-duplicate headline clustering.
+
+Google News search pages repeat the same story from many outlets with small
+wording changes. Before the headlines reach the LLM they are clustered with
+MinHash + LSH and every cluster is reduced to one representative, annotated
+with the number of outlets that ran it.
+
+Everything after normalization is vectorized with numpy:
+
+- shingles are the overlapping 4-byte windows of every normalized headline,
+  read straight out of one concatenated byte buffer
+- MinHash signatures apply num_perm multiply-shift hash functions to
+  batches of shingles at once and take per-headline minima with
+  np.minimum.reduceat
+- LSH splits the signatures into bands; headlines sharing a band bucket are
+  candidates, and connected components are found by min-label propagation
+
+Cost is linear in the number of shingles instead of quadratic in the number
+of headlines, a few thousand lines take tens of milliseconds.
+"""
+import re
+from typing import List, NamedTuple
+
+import numpy as np
+
+from metrics import track
+
+SHINGLE_BYTES = 4
+# Shingles hashed at once, bounds the (num_perm, shingles) uint64 matrix to 8 MB
+MAX_BATCH_SHINGLES = 1 << 14
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+class HeadlineCluster(NamedTuple):
+    headline: str  # representative, the first occurrence on the page
+    size: int  # number of near-duplicate headlines, a ranking signal
+    position: int  # line index of the representative
+
+
+def normalize_headline(headline: str) -> str:
+    return _NON_WORD.sub(" ", headline.lower()).strip()
+
+
+def _shingles(headlines: List[str]):
+    """All 4-byte shingles as uint32 plus the start offset of every headline's run"""
+    encoded = [normalize_headline(h).encode("utf-8").ljust(SHINGLE_BYTES) for h in headlines]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint32)
+
+    windows = data[:-3] << 24 | data[1:-2] << 16 | data[2:-1] << 8 | data[3:]
+    # A window is valid when it does not cross into the next headline
+    ends = np.cumsum(lengths)
+    owner = np.repeat(np.arange(len(encoded)), lengths)[: len(windows)]
+    valid = np.arange(len(windows)) + SHINGLE_BYTES <= ends[owner]
+    counts = lengths - (SHINGLE_BYTES - 1)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return windows[valid], starts
+
+
+def minhash_signatures(headlines: List[str], num_perm: int = 64, seed: int = 1) -> np.ndarray:
+    """(len(headlines), num_perm) uint32 MinHash signatures of the headlines' shingle sets"""
+    shingles, starts = _shingles(headlines)
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    bounds = np.append(starts, len(shingles))
+    signatures = np.empty((len(starts), num_perm), dtype=np.uint32)
+    first = 0
+    while first < len(starts):
+        # Whole headlines per batch, at least one
+        last = int(np.searchsorted(bounds, bounds[first] + MAX_BATCH_SHINGLES, side="right")) - 1
+        last = min(max(last, first + 1), len(starts))
+        batch = shingles[bounds[first]:bounds[last]].astype(np.uint64)
+        # Multiply-shift hashing, uint64 arithmetic wraps modulo 2**64. The
+        # (num_perm, shingles) layout lets reduceat scan contiguous runs.
+        with np.errstate(over="ignore"):
+            hashed = (a[:, None] * batch[None, :] + b[:, None]) >> np.uint64(32)
+        minima = np.minimum.reduceat(hashed, bounds[first:last] - bounds[first], axis=1)
+        signatures[first:last] = minima.T
+        first = last
+    return signatures
+
+
+def _components(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """Label of the lowest index headline in every LSH connected component"""
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    buckets = []
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+        buckets.append(np.unique(keys, return_inverse=True)[1].ravel())
+
+    labels = np.arange(n)
+    while True:
+        previous = labels
+        for inverse in buckets:
+            lowest = np.full(inverse.max() + 1, n, dtype=labels.dtype)
+            np.minimum.at(lowest, inverse, labels)
+            labels = lowest[inverse]
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def cluster_headlines(
+    headlines: List[str], threshold: float = 0.5, num_perm: int = 64, bands: int = 16
+) -> List[HeadlineCluster]:
+    """
+    Group near-duplicate headlines.
+
+    Args:
+        headlines: Headlines in page order
+        threshold: Estimated Jaccard similarity (of 4-byte shingles) with the
+            representative needed to join its cluster
+        num_perm: MinHash hash functions, more is more accurate and slower
+        bands: LSH bands, more finds less similar candidates
+
+    Returns:
+        Clusters in page order of their representatives
+    """
+    if not headlines:
+        return []
+    labels = np.arange(len(headlines))
+    # Punctuation-only lines all normalize to "", whose padded shingle would
+    # make them one cluster; they stay on their own
+    keyed = np.array([i for i, h in enumerate(headlines) if normalize_headline(h)], dtype=np.int64)
+    if len(keyed):
+        signatures = minhash_signatures([headlines[i] for i in keyed], num_perm)
+        components = _components(signatures, bands)
+        # LSH candidates below the threshold stay on their own
+        similarity = (signatures == signatures[components]).mean(axis=1)
+        components = np.where(similarity >= threshold, components, np.arange(len(keyed)))
+        labels[keyed] = keyed[components]
+
+    representatives, sizes = np.unique(labels, return_counts=True)
+    return [
+        HeadlineCluster(headlines[rep], int(size), int(rep))
+        for rep, size in zip(representatives.tolist(), sizes.tolist())
+    ]
+
+
+@track("headline_dedup")
+def dedupe_headline_text(headlines: str, threshold: float = 0.5) -> str:
+    """
+    Newline separated headlines with near-duplicates collapsed.
+
+    Stories covered by several outlets come first and are marked with the
+    number of outlets, the rest keep their page order.
+    """
+    lines = [line for line in headlines.split("\n") if line.strip()]
+    clusters = cluster_headlines(lines, threshold)
+    clusters.sort(key=lambda c: (-c.size, c.position))
+    return "\n".join(
+        f"{c.headline} ({c.size} outlets)" if c.size > 1 else c.headline for c in clusters
+    )
@@ -0,0 +1,132 @@
+"""
+Single-pass headline extraction from Google News search pages.
+
+Instead of building a BeautifulSoup tree, flattening it with get_text and
+re-splitting the text, the "lxml" backend streams parser events from libxml2
+(C) and applies the headline rule as text nodes arrive: a page is a sequence of
+blocks terminated by a "More" line, and the first line of every block is a
+headline.
+
+Backends are pluggable through register_backend. HEADLINE_PARSER selects one
+("auto", "lxml" or "bs4"). "auto" uses lxml when it is installed and falls back
+to the original clean_html_to_text + extract_headlines path otherwise.
+"""
+import os
+from typing import Callable, Dict, List
+
+from metrics import track
+from utils import clean_html_to_text, extract_headlines
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Text inside these elements is not page text (get_text skips it as well)
+SKIPPED_TAGS = {"script", "style", "template"}
+
+_backends: Dict[str, Callable[[str], str]] = {}
+
+
+def register_backend(name: str, extract: Callable[[str], str]):
+    """Register a function that turns page HTML into newline separated headlines"""
+    _backends[name] = extract
+
+
+def available_backends() -> List[str]:
+    return list(_backends)
+
+
+def default_backend() -> str:
+    configured = os.getenv("HEADLINE_PARSER", "auto")
+    if configured != "auto":
+        if configured not in _backends:
+            raise ValueError(f"Unknown headline parser '{configured}', available: {available_backends()}")
+        return configured
+    return "lxml" if "lxml" in _backends else "bs4"
+
+
+@track("html_parse")
+def extract_headlines_from_html(html_content: str, backend: str = None) -> str:
+    """
+    Extract headlines straight from a news page.
+
+    Args:
+        html_content: Raw HTML of the Google News search page
+        backend: Parser backend name, defaults to HEADLINE_PARSER
+
+    Returns:
+        str: Headlines separated by newlines
+    """
+    return _backends[backend or default_backend()](html_content)
+
+
+class _HeadlineCollector:
+    """lxml parser target that applies the headline rule while parsing"""
+
+    def __init__(self):
+        self.headlines = []
+        self._block_first = None
+        self._buffer = []
+        self._skip_depth = 0
+
+    def _flush(self):
+        # A text node ends at any tag, comment or processing instruction
+        if not self._buffer:
+            return
+        text = "".join(self._buffer)
+        self._buffer = []
+        for line in text.split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            if line == "More":
+                if self._block_first is not None:
+                    self.headlines.append(self._block_first)
+                    self._block_first = None
+            elif self._block_first is None:
+                self._block_first = line
+
+    def start(self, tag, attrib):
+        self._flush()
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def end(self, tag):
+        self._flush()
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def data(self, data):
+        if not self._skip_depth:
+            self._buffer.append(data)
+
+    def comment(self, text):
+        self._flush()
+
+    def pi(self, target, data=None):
+        self._flush()
+
+    def close(self):
+        self._flush()
+        if self._block_first is not None:
+            self.headlines.append(self._block_first)
+        return "\n".join(self.headlines)
+
+
+def _extract_with_lxml(html_content: str) -> str:
+    if not html_content.strip():
+        return ""
+    collector = _HeadlineCollector()
+    parser = etree.HTMLParser(target=collector)
+    parser.feed(html_content)
+    return parser.close()
+
+
+def _extract_with_bs4(html_content: str) -> str:
+    return extract_headlines(clean_html_to_text(html_content))
+
+
+register_backend("bs4", _extract_with_bs4)
+if etree is not None:
+    register_backend("lxml", _extract_with_lxml)
@@ -0,0 +1,116 @@
+"""
+Shared, long-lived clients for the upstream services (BrightData, OpenRouter, ElevenLabs).
+
+Every upstream gets its own pooled httpx client with keep-alive connections and
+its own timeouts. The async clients are opened by the FastAPI lifespan and closed
+on shutdown; scripts that never start the app get them lazily on first use.
+"""
+import asyncio
+import os
+
+import httpx
+
+BRIGHTDATA_URL = "https://api.brightdata.com/request"
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+# Per-upstream timeouts. BrightData unlocks can take a while, OpenRouter free models
+# are slow to start answering and TTS of a long script takes the longest.
+TIMEOUTS = {
+    "brightdata": httpx.Timeout(90.0, connect=10.0),
+    "openrouter": httpx.Timeout(120.0, connect=10.0),
+    "elevenlabs": httpx.Timeout(240.0, connect=10.0),
+}
+
+# Cheap endpoints requested at startup to open a pooled connection (DNS, TCP
+# and TLS) to every upstream, any response will do
+PRECONNECT_URLS = {
+    "brightdata": "https://api.brightdata.com/",
+    "openrouter": "https://openrouter.ai/api/v1/models",
+    "elevenlabs": "https://api.elevenlabs.io/v1/models",
+}
+
+POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "10")),
+    keepalive_expiry=60.0,
+)
+
+_async_clients = {}
+_sync_clients = {}
+_elevenlabs_clients = {}
+
+
+def get_async_client(name: str) -> httpx.AsyncClient:
+    """Return the pooled async client for an upstream, creating it if needed"""
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(name)
+    # Pooled connections belong to the loop that opened them, so a client made
+    # under a previous asyncio.run() cannot be reused.
+    if entry is None or entry[1] is not loop or entry[0].is_closed:
+        client = httpx.AsyncClient(timeout=TIMEOUTS[name], limits=POOL_LIMITS)
+        _async_clients[name] = (client, loop)
+        return client
+    return entry[0]
+
+
+def get_sync_client(name: str) -> httpx.Client:
+    """Return the pooled blocking client for an upstream, creating it if needed"""
+    client = _sync_clients.get(name)
+    if client is None or client.is_closed:
+        client = httpx.Client(timeout=TIMEOUTS[name], limits=POOL_LIMITS)
+        _sync_clients[name] = client
+    return client
+
+
+def get_elevenlabs_client(api_key: str):
+    """Return a cached ElevenLabs SDK client backed by the shared pool"""
+    key = ("sync", api_key)
+    client = _elevenlabs_clients.get(key)
+    if client is None:
+        # The SDK is slow to import, only pay for it once TTS is used
+        from elevenlabs import ElevenLabs
+
+        client = ElevenLabs(api_key=api_key, httpx_client=get_sync_client("elevenlabs"))
+        _elevenlabs_clients[key] = client
+    return client
+
+
+def get_async_elevenlabs_client(api_key: str):
+    """Return a cached async ElevenLabs SDK client backed by the shared pool"""
+    http_client = get_async_client("elevenlabs")
+    key = ("async", api_key)
+    entry = _elevenlabs_clients.get(key)
+    if entry is None or entry[1] is not http_client:
+        from elevenlabs import AsyncElevenLabs
+
+        entry = (AsyncElevenLabs(api_key=api_key, httpx_client=http_client), http_client)
+        _elevenlabs_clients[key] = entry
+    return entry[0]
+
+
+async def open_clients():
+    """Create the async clients up front (called from the app lifespan)"""
+    for name in TIMEOUTS:
+        get_async_client(name)
+
+
+async def preconnect(timeout: float = 10.0):
+    """Open a keep-alive connection in every async client's pool (called by the worker warmup)"""
+    async def connect(name):
+        try:
+            await get_async_client(name).head(PRECONNECT_URLS[name], timeout=timeout)
+        except httpx.HTTPError as e:
+            print(f"Preconnect to {name} failed: {e}")
+
+    await asyncio.gather(*(connect(name) for name in TIMEOUTS))
+
+
+async def close_clients():
+    """Close every pooled client and drop the cached SDK clients"""
+    for client, _ in list(_async_clients.values()):
+        await client.aclose()
+    for client in list(_sync_clients.values()):
+        client.close()
+    _async_clients.clear()
+    _sync_clients.clear()
+    _elevenlabs_clients.clear()
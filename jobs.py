@@ -0,0 +1,203 @@
+"""
+Background job queue for long running generation requests.
+
+POST /jobs queues a request and returns immediately. A bounded pool of worker
+tasks runs the pipeline, and GET /jobs/{id} reports the status. Finished jobs
+are kept for `result_ttl` seconds and then forgotten. A run that returns a
+JobResult also reports the topics it left out.
+
+With `state_dir` set every status change is also written to a small JSON file
+per job, so that with several uvicorn workers GET /jobs/{id} works whichever
+worker the poll lands on. Jobs still run in the worker that accepted them.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, NamedTuple
+
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobResult(NamedTuple):
+    value: Any
+    # source -> topics left out of the result, e.g. because they missed the deadline
+    skipped_topics: dict = {}
+
+
+class Job:
+    def __init__(self, payload):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.skipped_topics = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "skipped_topics": self.skipped_topics,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Job":
+        """Job as persisted by another worker, without its payload"""
+        job = cls(None)
+        job.id = data["job_id"]
+        job.status = data["status"]
+        job.result = data.get("result")
+        job.error = data["error"]
+        job.skipped_topics = data.get("skipped_topics", {})
+        job.created_at = data["created_at"]
+        job.started_at = data["started_at"]
+        job.finished_at = data["finished_at"]
+        return job
+
+
+class JobManager:
+    def __init__(self, run, workers: int = 2, queue_size: int = 100, result_ttl: float = 3600,
+                 state_dir: str = None):
+        """
+        Args:
+            run: Coroutine function called with the job payload, its return value
+                (or the value of a returned JobResult) is the job result
+            workers: Number of jobs processed at the same time
+            queue_size: Jobs that may wait for a worker before submit() rejects new ones
+            result_ttl: Seconds a finished job stays queryable
+            state_dir: Directory shared by the workers for job statuses, None keeps them in memory
+        """
+        self.run = run
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.result_ttl = result_ttl
+        self._jobs = {}
+        self._queue = None
+        self._tasks = []
+        self._state_dir = None
+        if state_dir:
+            self._state_dir = Path(state_dir)
+            self._state_dir.mkdir(parents=True, exist_ok=True)
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, payload) -> Job:
+        """Queue a job, raises JobQueueFull when the queue is at capacity"""
+        if self._queue is None:
+            raise RuntimeError("JobManager is not started")
+        self._expire()
+        job = Job(payload)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"{self.queue_size} jobs already queued")
+        self._jobs[job.id] = job
+        self._persist(job)
+        return job
+
+    def get(self, job_id: str):
+        self._expire()
+        job = self._jobs.get(job_id)
+        if job is None and self._state_dir is not None:
+            job = self._load(job_id)
+        return job
+
+    def _path(self, job_id: str) -> Path:
+        return self._state_dir / f"{job_id}.json"
+
+    def _persist(self, job: Job):
+        if self._state_dir is None:
+            return
+        path = self._path(job.id)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps({**job.to_dict(), "result": job.result}))
+            # Readers in other workers never see a half written file
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Could not save status of job {job.id}: {e}")
+
+    def _load(self, job_id: str):
+        """A job accepted by another worker, None if unknown or expired"""
+        if not _JOB_ID.fullmatch(job_id):
+            return None
+        path = self._path(job_id)
+        try:
+            job = Job.from_dict(json.loads(path.read_text()))
+        except (OSError, ValueError, KeyError):
+            return None
+        if job.finished_at is not None and job.finished_at < time.time() - self.result_ttl:
+            path.unlink(missing_ok=True)
+            return None
+        return job
+
+    def stats(self) -> dict:
+        counts = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "jobs": counts,
+        }
+
+    def _expire(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+            if self._state_dir is not None:
+                self._path(job_id).unlink(missing_ok=True)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            self._persist(job)
+            try:
+                outcome = await self.run(job.payload)
+                if isinstance(outcome, JobResult):
+                    job.result, job.skipped_topics = outcome.value, dict(outcome.skipped_topics)
+                else:
+                    job.result = outcome
+                job.status = "done"
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "Server shutting down"
+                raise
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+                self._persist(job)
+                self._queue.task_done()
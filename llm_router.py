@@ -0,0 +1,408 @@
+"""
+Model fallback, circuit breaking and hedging for OpenRouter calls.
+
+Every OpenRouter request names a primary model; the router tries it first
+and falls back to the models of OPENROUTER_MODELS in order when it fails.
+
+- Every model has a ModelBreaker. Calls that error (transport errors,
+  429 / 5xx) or take longer than slow_call seconds count as failures, and
+  once they make up error_rate of the recent window the breaker opens and
+  the model is skipped. After cooldown seconds a single probe call is let
+  through, its outcome closes or re-opens the breaker.
+- With hedging on, a request still running after its model's p95 latency
+  (hedge_after seconds until enough calls have been seen) gets a second,
+  hedged request to the next model; the first good answer wins and the other
+  request is cancelled. At most two requests are in flight per call. The
+  hedge delay counts from when the openrouter rate limiter let the request
+  through: time queued for a slot says nothing about the model, and a hedge
+  would only take another slot and queue behind it.
+
+Responses with other status codes (400, 401, ...) are returned as they are,
+the call sites turn them into errors.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import List
+
+import httpx
+
+from deadlines import DeadlineExceeded, clamp_timeout
+from http_clients import OPENROUTER_URL
+from metrics import Counter, register
+from rate_limits import get_limiter
+
+# Responses that say the model, not the request, is the problem
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+llm_attempts = register(Counter(
+    "newsninja_llm_attempts_total", "OpenRouter requests by model and outcome (success, error, cancelled)"
+))
+
+
+class ModelBreaker:
+    def __init__(self, window: int = 20, min_calls: int = 5, error_rate: float = 0.5,
+                 slow_call: float = 60.0, cooldown: float = 60.0, clock=time.monotonic):
+        """
+        Args:
+            window: Recent calls the error rate and p95 latency are computed over
+            min_calls: Calls needed before the breaker can open or p95 is known
+            error_rate: Share of failed or slow calls that opens the breaker
+            slow_call: Seconds after which a successful call still counts as failed
+            cooldown: Seconds the breaker stays open before a probe call
+        """
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.cooldown = cooldown
+        self._clock = clock
+        self._failures = deque(maxlen=window)  # True for a failed or slow call
+        self._latencies = deque(maxlen=window)  # seconds, successful calls only
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether a call may go to this model now, claims the probe of an open breaker"""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and self._clock() - self._opened_at >= self.cooldown:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def _open(self):
+        self.state = "open"
+        self._opened_at = self._clock()
+        self._probing = False
+
+    def record(self, ok: bool, latency: float = None):
+        failed = not ok or (latency is not None and latency > self.slow_call)
+        if ok and latency is not None:
+            self._latencies.append(latency)
+        if self.state == "half_open":
+            if failed:
+                self._open()
+            else:
+                self.state = "closed"
+                self._probing = False
+                self._failures.clear()
+            return
+        self._failures.append(failed)
+        if len(self._failures) >= self.min_calls and self.failure_rate() >= self.error_rate:
+            self._open()
+
+    def release(self):
+        """A call was cancelled before it had an outcome"""
+        self._probing = False
+
+    def failure_rate(self) -> float:
+        return sum(self._failures) / len(self._failures) if self._failures else 0.0
+
+    def p95(self):
+        if len(self._latencies) < self.min_calls:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def stats(self) -> dict:
+        p95 = self.p95()
+        return {
+            "state": self.state,
+            "failure_rate": round(self.failure_rate(), 3),
+            "p95_seconds": None if p95 is None else round(p95, 3),
+        }
+
+
+class _Attempt:
+    """One request to one model, timed from when the rate limiter lets it through"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.entered = False
+        self.started = None
+        self.granted = asyncio.Event()
+
+
+class OpenRouterRouter:
+    def __init__(self, models: List[str], hedge: bool = True, hedge_after: float = 20.0,
+                 min_hedge_delay: float = 1.0, **breaker_options):
+        """
+        Args:
+            models: Fallback models in order of preference
+            hedge: Send a hedged request to the next model when a call is slow
+            hedge_after: Hedge delay while a model's p95 latency is unknown
+            min_hedge_delay: Lower bound of the hedge delay
+            breaker_options: ModelBreaker arguments, shared by every model
+        """
+        self.models = list(models)
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.min_hedge_delay = min_hedge_delay
+        self.breaker_options = breaker_options
+        self._breakers = {}
+        self.stats = {"calls": 0, "fallbacks": 0, "hedged": 0, "hedge_wins": 0}
+
+    def breaker(self, model: str) -> ModelBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = ModelBreaker(**self.breaker_options)
+        return breaker
+
+    def _order(self, model: str) -> List[str]:
+        return list(dict.fromkeys([model] + self.models))
+
+    def _pick(self, order: List[str], start: int):
+        """Index of the first model from start whose breaker lets a call through"""
+        for index in range(start, len(order)):
+            if self.breaker(order[index]).allow():
+                return index
+        return None
+
+    def _hedge_delay(self, model: str) -> float:
+        p95 = self.breaker(model).p95()
+        return max(self.min_hedge_delay, self.hedge_after if p95 is None else p95)
+
+    def _record(self, model: str, ok: bool, latency: float = None):
+        self.breaker(model).record(ok, latency)
+        llm_attempts.inc(model=model, outcome="success" if ok else "error")
+
+    async def _attempt(self, client, attempt: _Attempt, headers: dict, payload: dict, timeout: float):
+        model = attempt.model
+        attempt.entered = True
+        try:
+            await get_limiter("openrouter").acquire()
+            started = attempt.started = time.perf_counter()
+            attempt.granted.set()
+            response = await client.post(
+                OPENROUTER_URL, headers=headers, json={**payload, "model": model}, timeout=clamp_timeout(timeout)
+            )
+        except (asyncio.CancelledError, DeadlineExceeded):
+            self.breaker(model).release()
+            llm_attempts.inc(model=model, outcome="cancelled")
+            raise
+        except httpx.HTTPError:
+            self._record(model, False)
+            raise
+        ok = response.status_code not in RETRYABLE_STATUS
+        self._record(model, ok, time.perf_counter() - started if ok else None)
+        return response
+
+    def _release_unstarted(self, attempt: _Attempt):
+        """Give back the probe _pick claimed for a task cancelled before it ever ran"""
+        if not attempt.entered:
+            self.breaker(attempt.model).release()
+
+    async def post(self, client: httpx.AsyncClient, headers: dict, payload: dict, timeout: float) -> httpx.Response:
+        """
+        Send a chat completion, falling back and hedging across models.
+
+        Returns the first response that is not a retryable failure, or the last
+        failed response; raises the last transport error if there is none.
+        """
+        self.stats["calls"] += 1
+        order = self._order(payload["model"])
+        tasks = {}  # task -> _Attempt
+        last = None
+        next_index = 0
+        can_hedge = self.hedge
+
+        def launch(force: bool = False) -> bool:
+            nonlocal next_index
+            index = 0 if force else self._pick(order, next_index)
+            if index is None:
+                return False
+            next_index = index + 1
+            attempt = _Attempt(order[index])
+            task = asyncio.create_task(self._attempt(client, attempt, headers, payload, timeout))
+            task.add_done_callback(lambda _, attempt=attempt: self._release_unstarted(attempt))
+            tasks[task] = attempt
+            return True
+
+        if not launch():
+            # Every breaker is open, the primary model still gets a try
+            launch(force=True)
+
+        try:
+            while tasks:
+                wait = None
+                slot = None
+                if can_hedge and len(tasks) == 1 and next_index < len(order):
+                    (attempt,) = tasks.values()
+                    if attempt.started is None:
+                        # No hedge while the request still waits for a rate limit slot
+                        slot = asyncio.create_task(attempt.granted.wait())
+                    else:
+                        wait = max(0.0, self._hedge_delay(attempt.model) - (time.perf_counter() - attempt.started))
+                try:
+                    done, _ = await asyncio.wait(
+                        [*tasks, slot] if slot else tasks, timeout=wait, return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    if slot is not None:
+                        slot.cancel()
+                if slot is not None:
+                    done.discard(slot)
+                    if not done:
+                        continue  # the slot was granted, the hedge delay starts now
+                elif not done:
+                    if launch():
+                        self.stats["hedged"] += 1
+                    else:
+                        can_hedge = False
+                    continue
+
+                for task in done:
+                    model = tasks.pop(task).model
+                    try:
+                        response = task.result()
+                    except httpx.HTTPError as e:
+                        last = e
+                        continue
+                    if response.status_code in RETRYABLE_STATUS:
+                        last = response
+                        continue
+                    if model != order[0]:
+                        self.stats["fallbacks"] += 1
+                        if tasks:
+                            self.stats["hedge_wins"] += 1
+                    return response
+
+                if not tasks:
+                    launch()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if isinstance(last, httpx.Response):
+            return last
+        raise last
+
+    def _sequence(self, order: List[str]):
+        """Models to try one after the other, the primary if every breaker is open"""
+        tried = False
+        for model in order:
+            if self.breaker(model).allow():
+                tried = True
+                yield model
+        if not tried:
+            yield order[0]
+
+    def post_sync(self, client: httpx.Client, headers: dict, payload: dict, timeout: float) -> httpx.Response:
+        """Blocking post with model fallback, without hedging"""
+        self.stats["calls"] += 1
+        order = self._order(payload["model"])
+        last = None
+        for model in self._sequence(order):
+            get_limiter("openrouter").acquire_sync()
+            try:
+                request_timeout = clamp_timeout(timeout)
+            except DeadlineExceeded:
+                self.breaker(model).release()
+                raise
+            started = time.perf_counter()
+            try:
+                response = client.post(
+                    OPENROUTER_URL, headers=headers, json={**payload, "model": model}, timeout=request_timeout
+                )
+            except httpx.HTTPError as e:
+                self._record(model, False)
+                last = e
+                continue
+            if response.status_code in RETRYABLE_STATUS:
+                self._record(model, False)
+                last = response
+                continue
+            self._record(model, True, time.perf_counter() - started)
+            if model != order[0]:
+                self.stats["fallbacks"] += 1
+            return response
+
+        if isinstance(last, httpx.Response):
+            return last
+        raise last
+
+    @asynccontextmanager
+    async def stream(self, client: httpx.AsyncClient, headers: dict, payload: dict, timeout: float):
+        """
+        Open a streamed chat completion with model fallback, without hedging.
+
+        A model is only replaced before the stream starts; once the response is
+        handed out, errors while reading it are recorded and raised.
+        """
+        self.stats["calls"] += 1
+        order = self._order(payload["model"])
+        last = None
+        for model in self._sequence(order):
+            try:
+                await get_limiter("openrouter").acquire()
+                request_timeout = clamp_timeout(timeout)
+            except (asyncio.CancelledError, DeadlineExceeded):
+                self.breaker(model).release()
+                raise
+            handed_out = False
+            try:
+                async with client.stream(
+                    "POST", OPENROUTER_URL, headers=headers, json={**payload, "model": model, "stream": True},
+                    timeout=request_timeout,
+                ) as response:
+                    if response.status_code in RETRYABLE_STATUS:
+                        await response.aread()
+                        self._record(model, False)
+                        last = response
+                        continue
+                    if model != order[0]:
+                        self.stats["fallbacks"] += 1
+                    handed_out = True
+                    try:
+                        yield response
+                    except (asyncio.CancelledError, GeneratorExit):
+                        self.breaker(model).release()
+                        raise
+                    except Exception:
+                        self._record(model, False)
+                        raise
+                    # Time to the whole answer is not comparable with other calls
+                    self._record(model, response.status_code == 200)
+                    return
+            except httpx.HTTPError as e:
+                if handed_out:
+                    raise
+                self._record(model, False)
+                last = e
+
+        if isinstance(last, httpx.Response):
+            yield last
+            return
+        raise last
+
+    def model_stats(self) -> dict:
+        return {
+            **self.stats,
+            "models": {model: breaker.stats() for model, breaker in self._breakers.items()},
+        }
+
+
+OPENROUTER_MODELS = [
+    model.strip()
+    for model in os.getenv(
+        "OPENROUTER_MODELS",
+        "tngtech/deepseek-r1t2-chimera:free,deepseek/deepseek-chat-v3-0324:free,meta-llama/llama-3.3-70b-instruct:free",
+    ).split(",")
+    if model.strip()
+]
+
+openrouter_router = OpenRouterRouter(
+    OPENROUTER_MODELS,
+    hedge=os.getenv("OPENROUTER_HEDGE", "1") == "1",
+    hedge_after=float(os.getenv("OPENROUTER_HEDGE_AFTER", "20")),
+    slow_call=float(os.getenv("OPENROUTER_SLOW_CALL", "60")),
+    error_rate=float(os.getenv("OPENROUTER_BREAKER_ERROR_RATE", "0.5")),
+    cooldown=float(os.getenv("OPENROUTER_BREAKER_COOLDOWN", "60")),
+)
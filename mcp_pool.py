@@ -0,0 +1,178 @@
+"""
+Pool of warm, long-lived MCP sessions.
+
+Each pooled session owns one MCP server subprocess (e.g. `npx @brightdata/mcp`),
+its initialized ClientSession, the loaded tools and a prebuilt agent. Callers
+check a session out with `async with pool.session() as pooled:` and it goes back
+to the pool afterwards. Dead sessions are detected on checkout and restarted.
+
+The MCP SDK and the LangChain adapters are imported when the first session
+starts, so importing this module stays cheap.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+from metrics import track
+
+
+class PooledSession:
+    """One MCP subprocess with its session, tools and agent"""
+
+    def __init__(self, index: int, server_params, build_agent):
+        self.index = index
+        self.server_params = server_params
+        self.build_agent = build_agent
+        self.session = None
+        self.tools = None
+        self.agent = None
+        self.error = None
+        self._task = None
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def start(self, timeout: float):
+        """Start the subprocess and wait until the session is usable"""
+        self.error = None
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        try:
+            with track("mcp_session_start"):
+                await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            await self.stop()
+            raise RuntimeError(f"MCP session {self.index} did not start within {timeout}s")
+        if not self.alive:
+            raise RuntimeError(f"MCP session {self.index} failed to start: {self.error}")
+
+    async def _run(self):
+        # The stdio/session context managers must be entered and exited in the
+        # same task, so the whole session lifetime lives inside this coroutine.
+        from langchain_mcp_adapters.tools import load_mcp_tools
+        from mcp import ClientSession
+        from mcp.client.stdio import stdio_client
+
+        try:
+            async with stdio_client(self.server_params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.tools = await load_mcp_tools(session)
+                    self.agent = self.build_agent(self.tools)
+                    self.session = session
+                    self._ready.set()
+                    await self._stop.wait()
+        except Exception as e:
+            self.error = e
+            print(f"MCP session {self.index} stopped: {e}")
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def is_healthy(self, timeout: float) -> bool:
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception as e:
+            print(f"MCP session {self.index} failed health check: {e}")
+            return False
+
+    async def stop(self, timeout: float = 10):
+        if self._task is None:
+            return
+        self._stop.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except (asyncio.TimeoutError, Exception):
+            pass
+        self._task = None
+        self.session = None
+
+
+class MCPSessionPool:
+    def __init__(
+        self,
+        size: int,
+        server_params,
+        build_agent,
+        start_timeout: float = 120,
+        health_timeout: float = 10,
+    ):
+        self.size = max(1, size)
+        # StdioServerParameters, or a function building them when the pool starts
+        self.server_params = server_params
+        self.build_agent = build_agent
+        self.start_timeout = start_timeout
+        self.health_timeout = health_timeout
+        self._sessions = []
+        self._idle = None
+        self._restart_lock = None
+
+    @property
+    def started(self) -> bool:
+        return self._idle is not None
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "alive": sum(1 for s in self._sessions if s.alive),
+            "idle": self._idle.qsize() if self._idle else 0,
+        }
+
+    async def start(self):
+        """Spawn every session concurrently. Failed sessions are retried on checkout."""
+        if self.started:
+            return
+        if callable(self.server_params):
+            self.server_params = self.server_params()
+        self._idle = asyncio.Queue()
+        self._restart_lock = asyncio.Lock()
+        self._sessions = [
+            PooledSession(i, self.server_params, self.build_agent) for i in range(self.size)
+        ]
+        results = await asyncio.gather(
+            *(s.start(self.start_timeout) for s in self._sessions), return_exceptions=True
+        )
+        for pooled, result in zip(self._sessions, results):
+            if isinstance(result, Exception):
+                print(f"MCP pool: {result}")
+            self._idle.put_nowait(pooled)
+        print(f"MCP pool started: {self.stats()}")
+
+    async def close(self):
+        await asyncio.gather(*(s.stop() for s in self._sessions), return_exceptions=True)
+        self._sessions = []
+        self._idle = None
+
+    async def _ensure_healthy(self, pooled: PooledSession):
+        if await pooled.is_healthy(self.health_timeout):
+            return
+        print(f"MCP pool: restarting session {pooled.index}")
+        await pooled.stop()
+        # Serialize restarts so a broken setup doesn't spawn N npx downloads at once
+        async with self._restart_lock:
+            await pooled.start(self.start_timeout)
+
+    def _release(self, pooled: PooledSession):
+        if self._idle is None:
+            return
+        self._idle.put_nowait(pooled)
+
+    @asynccontextmanager
+    async def session(self):
+        """Check out a healthy session, returning it to the pool afterwards"""
+        if not self.started:
+            raise RuntimeError("MCP pool is not started")
+        with track("mcp_checkout_wait"):
+            pooled = await self._idle.get()
+        try:
+            with track("mcp_health_check"):
+                await self._ensure_healthy(pooled)
+            yield pooled
+        finally:
+            self._release(pooled)
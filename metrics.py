@@ -0,0 +1,216 @@
+"""
+Lightweight in-process metrics for the generation pipeline.
+
+Per-stage latency histograms, in-flight gauges, error counters and payload size
+histograms, labelled by stage and request source type and rendered in the
+Prometheus text format by GET /metrics.
+
+Stages are timed with `track`, usable as a decorator on sync or async functions
+or as a (async) context manager:
+
+    @track("brightdata_fetch")
+    async def scrape_with_brightdata_async(url): ...
+
+    with track("html_parse"):
+        ...
+"""
+import functools
+import inspect
+import threading
+import time
+from contextvars import ContextVar
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+SIZE_BUCKETS = tuple(m * 10 ** e for e in range(0, 8) for m in (1, 2, 5))
+
+# Source type of the request being served ("news", "reddit", "both"), set by the backend
+current_source = ContextVar("current_source", default="none")
+
+_lock = threading.Lock()
+
+
+def set_source_type(source_type: str):
+    current_source.set(source_type or "none")
+
+
+def _label_key(labels: dict):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=None) -> str:
+    items = list(key) + (extra or [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(key)} {value}"
+
+
+class Gauge(Counter):
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(key)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.values = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with _lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self, **labels) -> dict:
+        series = self.values.get(_label_key(labels))
+        if series is None:
+            return {"count": 0, "sum": 0}
+        return {"count": series[-1], "sum": series[-2]}
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for key, series in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, series):
+                yield f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {count}"
+            yield f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(key)} {series[-2]}"
+            yield f"{self.name}_count{_format_labels(key)} {series[-1]}"
+
+
+stage_latency = Histogram(
+    "newsninja_stage_latency_seconds", "Latency of each pipeline stage", LATENCY_BUCKETS
+)
+stage_in_flight = Gauge("newsninja_stage_in_flight", "Pipeline stage calls currently running")
+stage_errors = Counter("newsninja_stage_errors_total", "Pipeline stage calls that raised")
+payload_size = Histogram(
+    "newsninja_payload_size",
+    "Payload sizes by kind (html_bytes, headline_count, headline_clusters, prompt_tokens_before, "
+    "prompt_tokens_after, script_chars, audio_bytes)",
+    SIZE_BUCKETS,
+)
+
+llm_tokens = Counter("newsninja_llm_tokens_total", "OpenRouter tokens used, by kind (prompt, completion)")
+
+REGISTRY = [stage_latency, stage_in_flight, stage_errors, payload_size, llm_tokens]
+
+
+def register(metric):
+    """Add a metric to the /metrics output"""
+    REGISTRY.append(metric)
+    return metric
+
+
+def observe_size(kind: str, value: float, stage: str):
+    payload_size.observe(value, kind=kind, stage=stage, source=current_source.get())
+
+
+def observe_llm_usage(usage: dict, stage: str):
+    """Count the prompt and completion tokens reported in an OpenRouter response"""
+    for kind in ("prompt", "completion"):
+        tokens = (usage or {}).get(f"{kind}_tokens")
+        if tokens:
+            llm_tokens.inc(tokens, kind=kind, stage=stage, source=current_source.get())
+
+
+def render_prometheus() -> str:
+    lines = []
+    with _lock:
+        for metric in REGISTRY:
+            lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class track:
+    """Time a pipeline stage, as a decorator or (async) context manager"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._starts = []
+
+    def _enter(self):
+        labels = {"stage": self.stage, "source": current_source.get()}
+        stage_in_flight.inc(**labels)
+        return labels, time.perf_counter()
+
+    def _exit(self, state, exc):
+        labels, start = state
+        stage_in_flight.dec(**labels)
+        stage_latency.observe(time.perf_counter() - start, **labels)
+        if exc is not None and not isinstance(exc, GeneratorExit):
+            stage_errors.inc(error=type(exc).__name__, **labels)
+
+    def __enter__(self):
+        self._starts.append(self._enter())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._exit(self._starts.pop(), exc)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+    def __call__(self, func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                state = self._enter()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as e:
+                    self._exit(state, e)
+                    raise
+                self._exit(state, None)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            state = self._enter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                self._exit(state, e)
+                raise
+            self._exit(state, None)
+            return result
+        return wrapper
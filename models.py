@@ -1,6 +1,15 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal, Optional
 
 class NewsRequest(BaseModel):
     topics : List[str]
-    source_type: str
\ No newline at end of file
+    source_type: str
+    # Stream the MP3 to the client while it is being synthesized
+    stream: bool = False
+    # "segmented": one script and TTS call per topic, run concurrently and joined
+    # "pipelined": the script is streamed and synthesized chunk by chunk as it arrives
+    # "fused": the broadcast is written from raw headlines in one LLM call, no per-topic summaries
+    mode: Literal["single", "segmented", "pipelined", "fused"] = "single"
+    # End-to-end time limit in seconds, capped by the server's REQUEST_DEADLINE.
+    # Topics whose sources miss it are left out and listed in X-Skipped-Topics.
+    deadline_seconds: Optional[float] = None
@@ -0,0 +1,131 @@
+"""
+Frame-level MP3 joining without re-encoding.
+
+An MP3 file is a sequence of self-contained frames, optionally wrapped in
+ID3v2 (start) / ID3v1 (end) tags. The first frame of an encoder's output is
+often a Xing/Info or VBRI header frame that carries no audio but describes
+the whole file (frame count, seek table), so it would be wrong for a joined
+file. join_mp3 keeps only the audio frames of every segment and concatenates
+them, which is byte-exact with the synthesized audio.
+"""
+from typing import Iterator, List, NamedTuple
+
+# Bitrates in kbps by (MPEG version 1 or 2, layer), index 0 is "free format"
+BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+# Sample rates by the header's version bits (0 = MPEG 2.5, 2 = MPEG 2, 3 = MPEG 1)
+SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+MONO = 3
+
+
+class FrameHeader(NamedTuple):
+    version: int  # version bits, see SAMPLE_RATES
+    layer: int
+    bitrate: int  # kbps
+    sample_rate: int
+    channel_mode: int
+    length: int  # whole frame in bytes, header included
+
+
+def parse_header(data: bytes, pos: int = 0):
+    """Decode the 4 byte frame header at pos, None if there is no valid one"""
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version = (b1 >> 3) & 3
+    layer_bits = (b1 >> 1) & 3
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 3
+    if version == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    layer = 4 - layer_bits
+    bitrate = BITRATES[(1 if version == 3 else 2, layer)][bitrate_index]
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 1
+    if layer == 1:
+        length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+    elif layer == 3 and version != 3:
+        length = 72 * bitrate * 1000 // sample_rate + padding
+    else:
+        length = 144 * bitrate * 1000 // sample_rate + padding
+    return FrameHeader(version, layer, bitrate, sample_rate, b3 >> 6, length)
+
+
+def _id3v2_size(data: bytes) -> int:
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    # Syncsafe integer, 7 bits per byte
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _is_info_frame(frame: bytes, header: FrameHeader) -> bool:
+    """Xing/Info (LAME) or VBRI (Fraunhofer) header frame without audio"""
+    if header.layer != 3:
+        return False
+    if header.version == 3:
+        side_info = 17 if header.channel_mode == MONO else 32
+    else:
+        side_info = 9 if header.channel_mode == MONO else 17
+    return frame[4 + side_info:8 + side_info] in (b"Xing", b"Info") or frame[36:40] == b"VBRI"
+
+
+def iter_frames(data: bytes) -> Iterator[tuple]:
+    """Yield (header, frame bytes) for every audio frame, skipping tags and junk"""
+    pos = _id3v2_size(data)
+    end = len(data)
+    if end - pos >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+
+    first = True
+    while pos + 4 <= end:
+        header = parse_header(data, pos)
+        if header is None or pos + header.length > end:
+            if header is not None:
+                break  # truncated last frame
+            pos += 1
+            continue
+        frame = data[pos:pos + header.length]
+        pos += header.length
+        if first:
+            first = False
+            if _is_info_frame(frame, header):
+                continue
+        yield header, frame
+
+
+def join_mp3(segments: List[bytes]) -> bytes:
+    """
+    Concatenate MP3 segments at the frame level.
+
+    Raises:
+        ValueError: If there are no segments, a segment has no audio frames or
+            its sample rate or channel layout differs from the first segment
+    """
+    if not segments:
+        raise ValueError("No MP3 segments to join")
+    frames = []
+    reference = None
+    for index, data in enumerate(segments):
+        found = False
+        for header, frame in iter_frames(data):
+            found = True
+            layout = (header.sample_rate, header.channel_mode == MONO)
+            if reference is None:
+                reference = layout
+            elif layout != reference:
+                raise ValueError(f"Segment {index} is {layout}, expected {reference}")
+            frames.append(frame)
+        if not found:
+            raise ValueError(f"Segment {index} contains no MP3 frames")
+    return b"".join(frames)
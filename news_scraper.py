@@ -2,62 +2,146 @@ import asyncio
 import os
 from typing import Dict, List
 
-from aiolimiter import AsyncLimiter
+from fastapi import HTTPException
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 from dotenv import load_dotenv
 
 from utils import (
     generate_news_urls_to_scrape,
-    scrape_with_brightdata,
-    clean_html_to_text,
-    extract_headlines,
-    summarize_with_openrouter_news_script
+    scrape_with_brightdata_async,
+    summarize_with_openrouter_news_script_async
 )
+from headline_parser import extract_headlines_from_html
+from headline_dedup import dedupe_headline_text
+from metrics import track, observe_size
+from singleflight import SingleFlight, normalize_topic
+from cache import TTLCache
+from deadlines import DeadlineExceeded, gather_topics, stop_at_deadline
 
 load_dotenv()
 
+# In-flight news topic work, shared by every request
+news_flights = SingleFlight("news_topic")
+
+# Finished topic summaries, kept fresh for popular topics by the cache warmer
+news_topic_cache = TTLCache(
+    "news_topic",
+    ttl=float(os.getenv("NEWS_TOPIC_CACHE_TTL", "600")),
+    max_entries=int(os.getenv("NEWS_TOPIC_CACHE_MAX_ENTRIES", "128")),
+)
+
+def is_usable_summary(summary: str) -> bool:
+    return bool(summary) and not summary.startswith("Error") and summary != "No headlines found."
+
+# Collapse near-duplicate headlines (the same story from several outlets) before summarizing
+HEADLINE_DEDUP = os.getenv("HEADLINE_DEDUP", "1") == "1"
+HEADLINE_DEDUP_THRESHOLD = float(os.getenv("HEADLINE_DEDUP_THRESHOLD", "0.5"))
+
+# Max number of topics processed at the same time. 1 keeps the old sequential behaviour.
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("NEWS_MAX_CONCURRENCY", "3"))
+
 class NewsEngine:
-    def __init__(self):
-        # Initialize rate limiter in __init__
-        self._rate_limiter = AsyncLimiter(5, 1)  # 5 requests per second
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        # BrightData requests are paced by the process-wide limiter in rate_limits
+        self.max_concurrency = max(1, max_concurrency)
 
     @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
+        stop=stop_after_attempt(3) | stop_at_deadline,
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception_type(HTTPException),  # BrightData errors
+        reraise=True
     )
+    async def fetch_topic_headlines(self, topic: str) -> str:
+        """Fetch a topic's news search page and extract its headlines"""
+        print(f"DEBUG: Processing topic {topic}")
+        urls = generate_news_urls_to_scrape([topic])
+
+        if not urls or topic not in urls:
+            print(f"DEBUG: No URL found for {topic}")
+            raise ValueError("No URL found.")
+
+        search_html = await scrape_with_brightdata_async(urls[topic])
+        observe_size("html_bytes", len(search_html), "news_topic")
+        # HTML parsing is CPU-bound, keep it off the event loop
+        headlines = await asyncio.to_thread(extract_headlines_from_html, search_html)
+        observe_size("headline_count", headlines.count("\n") + 1 if headlines else 0, "news_topic")
+
+        if HEADLINE_DEDUP and headlines:
+            headlines = await asyncio.to_thread(dedupe_headline_text, headlines, HEADLINE_DEDUP_THRESHOLD)
+            observe_size("headline_clusters", headlines.count("\n") + 1, "news_topic")
+        return headlines
+
+    @track("news_topic")
+    async def _scrape_topic_pipeline(self, topic: str) -> str:
+        """Fetch, clean and summarize a single topic"""
+        try:
+            headlines = await self.fetch_topic_headlines(topic)
+        except ValueError as e:
+            return f"Error: {e}"
+
+        if not headlines:
+            print(f"DEBUG: No headlines extracted for {topic}")
+            return "No headlines found."
+
+        print(f"DEBUG: Generating summary for {topic}")
+        return await summarize_with_openrouter_news_script_async(
+            api_key=os.getenv("OPENROUTER_API_KEY"),
+            headlines=headlines
+        )
+
+    async def summarize_topic(self, topic: str, refresh: bool = False) -> str:
+        """Summary of one topic, from news_topic_cache unless refresh is set"""
+        key = normalize_topic(topic)
+        if not refresh:
+            cached = news_topic_cache.get(key)
+            if cached is not None:
+                return cached
+
+        # Concurrent requests for the same topic share a single run
+        summary = await news_flights.do(key, lambda: self._scrape_topic_pipeline(topic))
+        if is_usable_summary(summary):
+            news_topic_cache.set(key, summary)
+        return summary
+
+    async def _scrape_topic(self, topic: str, semaphore: asyncio.Semaphore) -> str:
+        """Process one topic inside a concurrency slot, never raising"""
+        async with semaphore:
+            try:
+                return await self.summarize_topic(topic)
+            except DeadlineExceeded:
+                # Skipped by gather_topics rather than reported as an error
+                raise
+            except Exception as e:
+                print(f"ERROR scraping {topic}: {str(e)}")
+                return f"Error: {str(e)}"
+
+    async def _headlines_for_topic(self, topic: str, semaphore: asyncio.Semaphore) -> str:
+        """Headlines of one topic inside a concurrency slot, empty when scraping failed"""
+        async with semaphore:
+            try:
+                return await news_flights.do(
+                    f"headlines:{normalize_topic(topic)}", lambda: self.fetch_topic_headlines(topic)
+                )
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                print(f"ERROR scraping {topic}: {str(e)}")
+                return ""
+
+    @track("news_headlines")
+    async def scrape_headlines(self, topics: List[str]) -> Dict[str, str]:
+        """Raw headlines of every topic without per-topic summaries, for the fused mode"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        headlines = await gather_topics("news", topics, lambda topic: self._headlines_for_topic(topic, semaphore))
+        return {"news_headlines": headlines}
+
     async def scrape_news(self, topics: List[str]) -> Dict[str, str]:
-        """Scrape and analyze news articles"""
-        results = {}
-        
-        for topic in topics:
-            async with self._rate_limiter:
-                try:
-                    print(f"DEBUG: Processing topic {topic}")
-                    urls = generate_news_urls_to_scrape([topic])
-                    
-                    if not urls or topic not in urls:
-                         print(f"DEBUG: No URL found for {topic}")
-                         results[topic] = "Error: No URL found."
-                         continue
-                         
-                    search_html = scrape_with_brightdata(urls[topic])
-                    clean_text = clean_html_to_text(search_html)
-                    headlines = extract_headlines(clean_text)
-                    
-                    if not headlines:
-                        print(f"DEBUG: No headlines extracted for {topic}")
-                        results[topic] = "No headlines found."
-                        continue
-
-                    print(f"DEBUG: Generating summary for {topic}")
-                    summary = summarize_with_openrouter_news_script(
-                        api_key=os.getenv("OPENROUTER_API_KEY"),
-                        headlines=headlines
-                    )
-                    results[topic] = summary
-                except Exception as e:
-                    print(f"ERROR scraping {topic}: {str(e)}")
-                    results[topic] = f"Error: {str(e)}"
-                await asyncio.sleep(1)
-
-        return {"news_analysis" : results}
\ No newline at end of file
+        """
+        Scrape and analyze news articles, up to max_concurrency topics at a time.
+
+        Topics still running at the request deadline are cancelled and left out.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await gather_topics("news", topics, lambda topic: self._scrape_topic(topic, semaphore))
+
+        return {"news_analysis" : results}
@@ -0,0 +1,126 @@
+"""
+Token-budgeted prompt compaction.
+
+estimate_tokens is a fast local stand-in for the model tokenizer: BPE
+tokenizers spend about one token per English word or punctuation mark, one
+more per ~8 characters of long words, and several per character of non-Latin
+scripts, so the estimate is the larger of that piece count and UTF-8 bytes/4.
+It is meant for budgeting, not billing.
+
+The compactors trim prompt content to a token budget while keeping the most
+useful parts:
+
+- compact_headlines keeps the top ranked headline lines, stories carried by
+  the most outlets (the "(N outlets)" tag from headline_dedup) first
+- compact_text keeps whole paragraphs of an analysis, the opening overview
+  and the closing sentiment paragraph first, then the rest in order
+
+fit_to_budget splits one budget over several sections: sections smaller
+than their fair share keep everything and pass the remainder on.
+"""
+import re
+from typing import Callable, List, Tuple
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+_LONG_WORD_RUNS = re.compile(r"\w{8}(?=\w)")
+_OUTLETS = re.compile(r" \((\d+) outlets\)$")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    pieces = len(_PIECES.findall(text)) + len(_LONG_WORD_RUNS.findall(text))
+    return max(pieces, len(text.encode("utf-8")) // 4)
+
+
+def compact_headlines(headlines: str, budget: int) -> str:
+    """Newline separated headlines trimmed to budget tokens, best ranked first"""
+    if estimate_tokens(headlines) <= budget:
+        return headlines
+
+    lines = [line for line in headlines.split("\n") if line.strip()]
+
+    def rank(item):
+        position, line = item
+        outlets = _OUTLETS.search(line)
+        return -(int(outlets.group(1)) if outlets else 1), position
+
+    kept = []
+    used = 0
+    for _, line in sorted(enumerate(lines), key=rank):
+        cost = estimate_tokens(line) + 1  # newline
+        if used + cost > budget:
+            continue
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def _leading_sentences(paragraph: str, budget: int) -> str:
+    kept = []
+    used = 0
+    for sentence in _SENTENCE_BREAK.split(paragraph):
+        cost = estimate_tokens(sentence)
+        if used + cost > budget:
+            break
+        kept.append(sentence)
+        used += cost
+    return " ".join(kept)
+
+
+def compact_text(text: str, budget: int) -> str:
+    """Paragraphs of text trimmed to budget tokens, overview and conclusion first"""
+    if estimate_tokens(text) <= budget:
+        return text
+
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+    last = len(paragraphs) - 1
+    order = [0] + ([last] if last > 0 else []) + list(range(1, last))
+
+    kept = {}
+    used = 0
+    for index in order:
+        remaining = budget - used
+        cost = estimate_tokens(paragraphs[index])
+        if cost > remaining:
+            # The overview is cut to its leading sentences rather than dropped
+            if index == 0:
+                partial = _leading_sentences(paragraphs[index], remaining)
+                if partial:
+                    kept[index] = partial
+                    used += estimate_tokens(partial)
+            continue
+        kept[index] = paragraphs[index]
+        used += cost
+    return "\n\n".join(kept[index] for index in sorted(kept))
+
+
+def allocate(sizes: List[int], budget: int) -> List[int]:
+    """Water-fill budget over sections of the given token sizes"""
+    shares = [0] * len(sizes)
+    remaining = max(0, budget)
+    order = sorted(range(len(sizes)), key=sizes.__getitem__)
+    for done, index in enumerate(order):
+        share = min(sizes[index], remaining // (len(sizes) - done))
+        shares[index] = share
+        remaining -= share
+    return shares
+
+
+def fit_to_budget(sections: List[Tuple[str, Callable[[str, int], str]]], budget: int) -> List[str]:
+    """
+    Compact several prompt sections so that together they fit in budget tokens.
+
+    Args:
+        sections: (text, compactor) pairs, compactor is compact_headlines or compact_text
+        budget: Tokens available for all section texts together
+    """
+    sizes = [estimate_tokens(text) for text, _ in sections]
+    if sum(sizes) <= budget:
+        return [text for text, _ in sections]
+    shares = allocate(sizes, budget)
+    return [
+        text if share >= size else compact(text, share)
+        for (text, compact), size, share in zip(sections, sizes, shares)
+    ]
@@ -0,0 +1,197 @@
+"""
+Shared per-upstream rate limits.
+
+Every upstream (BrightData, OpenRouter, ElevenLabs, the Reddit MCP agent) has
+one token bucket for the whole process, shared by all requests, background
+jobs and the cache warmer, instead of a limiter per request:
+
+    async with get_limiter("brightdata"):
+        response = await client.post(...)
+
+The bucket is kept as a single "theoretical arrival time" (GCRA, equivalent
+to a token bucket of `burst` tokens refilled at `rate` per `per` seconds).
+Every acquire reserves the next free slot under a lock and then waits for it,
+so callers are served in arrival order and never busy-poll. A caller cancelled
+while waiting does not give its slot back.
+
+With RATE_LIMIT_DIR set, the state lives in a small file per upstream,
+updated under an exclusive flock, and all uvicorn workers on the host share
+one budget. The lock is held for a read and a write of 8 bytes.
+
+Limits come from RATE_LIMIT_<UPSTREAM>="<requests>/<seconds>", "0" disables
+a limit. Time spent waiting is exported as newsninja_rate_limit_wait_seconds.
+"""
+import asyncio
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+
+from metrics import LATENCY_BUCKETS, Gauge, Histogram, register
+
+try:
+    import fcntl
+except ImportError:  # Windows, limits stay per process
+    fcntl = None
+
+DEFAULT_LIMITS = {
+    "brightdata": "5/1",
+    # Free OpenRouter models allow 20 requests per minute
+    "openrouter": "20/60",
+    "elevenlabs": "5/1",
+    # One Reddit agent run per 15 seconds, each run makes several tool calls
+    "mcp": "1/15",
+}
+
+rate_limit_wait = register(Histogram(
+    "newsninja_rate_limit_wait_seconds",
+    "Time spent waiting for an upstream rate limit slot",
+    (0,) + LATENCY_BUCKETS,
+))
+rate_limit_waiting = register(Gauge(
+    "newsninja_rate_limit_waiting", "Callers currently waiting for an upstream rate limit slot"
+))
+
+
+def parse_limit(value: str):
+    """(requests, seconds) from "5/1", None when the limit is disabled"""
+    value = value.strip()
+    if value in ("", "0", "off"):
+        return None
+    requests, _, seconds = value.partition("/")
+    requests, seconds = float(requests), float(seconds or 1)
+    if requests <= 0 or seconds <= 0:
+        return None
+    return requests, seconds
+
+
+class RateLimiter:
+    def __init__(self, name: str, rate: float, per: float = 1.0, burst: int = None,
+                 state_dir: str = None, clock=None):
+        """
+        Args:
+            name: Upstream name, used for metrics and the state file
+            rate: Requests allowed per `per` seconds
+            per: Length of the rate window in seconds
+            burst: Requests allowed back to back, defaults to rate
+            state_dir: Directory of the shared state file, None keeps the state in memory
+            clock: Time source, wall time for shared state so every process agrees
+        """
+        self.name = name
+        self.rate = rate
+        self.per = per
+        self.interval = per / rate
+        self.burst = max(1, int(burst if burst is not None else rate))
+        self._lock = threading.Lock()
+        self._tat = 0.0
+        self._path = None
+        if state_dir and fcntl is not None:
+            Path(state_dir).mkdir(parents=True, exist_ok=True)
+            self._path = Path(state_dir) / f"{name}.bucket"
+            self._path.touch()
+        self._clock = clock or (time.time if self._path else time.monotonic)
+        self.stats = {"acquired": 0, "waited": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    def _advance(self, tat: float, now: float):
+        """New arrival time and wait for a request made at now"""
+        tat = max(tat, now)
+        wait = tat - (self.burst - 1) * self.interval - now
+        # Ignore float drift of the summed intervals
+        return tat + self.interval, wait if wait > 1e-6 else 0.0
+
+    def reserve(self) -> float:
+        """Take the next free slot, return the seconds to wait for it"""
+        with self._lock:
+            now = self._clock()
+            if self._path is None:
+                self._tat, wait = self._advance(self._tat, now)
+                return wait
+            with open(self._path, "r+b") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    data = f.read(8)
+                    tat, wait = self._advance(struct.unpack("d", data)[0] if len(data) == 8 else 0.0, now)
+                    f.seek(0)
+                    f.write(struct.pack("d", tat))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            return wait
+
+    def _record(self, wait: float):
+        self.stats["acquired"] += 1
+        if wait > 0:
+            self.stats["waited"] += 1
+            self.stats["wait_seconds"] += wait
+            self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], wait)
+        rate_limit_wait.observe(wait, upstream=self.name)
+
+    async def acquire(self):
+        wait = self.reserve()
+        self._record(wait)
+        if wait > 0:
+            rate_limit_waiting.inc(upstream=self.name)
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                rate_limit_waiting.dec(upstream=self.name)
+
+    def acquire_sync(self):
+        """Blocking acquire for the synchronous upstream helpers"""
+        wait = self.reserve()
+        self._record(wait)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class _Unlimited:
+    """Stand-in for a disabled limit"""
+    stats = {}
+
+    async def acquire(self):
+        pass
+
+    def acquire_sync(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str):
+    """The process-wide limiter of an upstream, configured from the environment"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                limit = parse_limit(os.getenv(f"RATE_LIMIT_{name.upper()}", DEFAULT_LIMITS.get(name, "0")))
+                limiter = _Unlimited() if limit is None else RateLimiter(
+                    name, *limit, state_dir=os.getenv("RATE_LIMIT_DIR") or None
+                )
+                _limiters[name] = limiter
+    return limiter
+
+
+def rate_limit_stats() -> dict:
+    """Wait statistics of every limiter used so far"""
+    return {
+        name: {**limiter.stats, "rate": f"{limiter.rate:g}/{limiter.per:g}s", "burst": limiter.burst}
+        for name, limiter in _limiters.items()
+        if isinstance(limiter, RateLimiter)
+    }
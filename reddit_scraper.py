@@ -1,13 +1,7 @@
 from typing import List
+import functools
 import os
-# UPDATED: Use ChatOpenAI for OpenRouter compatibility
-from langchain_openai import ChatOpenAI 
-from langchain_mcp_adapters.tools import load_mcp_tools
-from langgraph.prebuilt import create_react_agent
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
 from dotenv import load_dotenv
-from aiolimiter import AsyncLimiter
 from tenacity import (
     retry, 
     stop_after_attempt,
@@ -15,8 +9,17 @@ from tenacity import (
     retry_if_exception_type
 )
 import asyncio
+import re
 from datetime import datetime, timedelta
 
+from mcp_pool import MCPSessionPool
+from metrics import track
+from singleflight import SingleFlight, normalize_topic
+from cache import TTLCache
+from rate_limits import get_limiter
+from deadlines import DeadlineExceeded, gather_topics, stop_at_deadline
+from utils import summarize_reddit_posts_async
+
 load_dotenv()
 
 two_weeks_ago = datetime.today() - timedelta(days=14)
@@ -25,36 +28,50 @@ two_weeks_ago_str = two_weeks_ago.strftime('%Y-%m-%d')
 class MCPOverloadedError(Exception):
     pass
 
-mcp_limiter = AsyncLimiter(1, 15)
+# Agent runs are paced by get_limiter("mcp"), direct tool calls by get_limiter("brightdata")
 
 # UPDATED: Switched to a model that supports Tool Calling
 # "google/gemini-2.0-flash-exp:free" is a good free option with tool support.
 # Alternatives if this fails: "meta-llama/llama-3.1-70b-instruct:free" or "mistralai/mistral-7b-instruct:free"
-model = ChatOpenAI(
-    model="google/gemini-2.0-flash-exp:free", 
-    api_key=os.getenv("OPENROUTER_API_KEY"),
-    base_url="https://openrouter.ai/api/v1",
-    temperature=0
-)
+# Direct mode falls back to the OPENROUTER_MODELS of llm_router when this model fails
+REDDIT_MODEL = os.getenv("REDDIT_MODEL", "google/gemini-2.0-flash-exp:free")
 
-# UPDATED: Fixed typo in package name (@brighdata -> @brightdata)
-server_params = StdioServerParameters(
-    command="npx",
-    env={
-        "API_TOKEN": os.getenv("BRIGHTDATA_API_TOKEN"),
-        "WEB_UNLOCKER_ZONE": os.getenv("WEB_UNLOCKER_ZONE"),
-    },
-    args=["@brightdata/mcp"], 
-)
+# LangChain, LangGraph and the MCP SDK take seconds to import, so the model and
+# the server parameters are built on first use instead of at import time
+@functools.lru_cache(maxsize=1)
+def get_model():
+    # UPDATED: Use ChatOpenAI for OpenRouter compatibility
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=REDDIT_MODEL,
+        api_key=os.getenv("OPENROUTER_API_KEY"),
+        base_url="https://openrouter.ai/api/v1",
+        temperature=0
+    )
 
+def get_server_params():
+    from mcp import StdioServerParameters
+
+    # UPDATED: Fixed typo in package name (@brighdata -> @brightdata)
+    return StdioServerParameters(
+        command="npx",
+        env={
+            "API_TOKEN": os.getenv("BRIGHTDATA_API_TOKEN"),
+            "WEB_UNLOCKER_ZONE": os.getenv("WEB_UNLOCKER_ZONE"),
+        },
+        args=["@brightdata/mcp"],
+    )
+
+@track("reddit_topic")
 @retry(
-    stop=stop_after_attempt(3),
+    stop=stop_after_attempt(3) | stop_at_deadline,
     wait=wait_exponential(multiplier=1, min=15, max=60),
     retry=retry_if_exception_type(MCPOverloadedError),
     reraise=True
 )
 async def process_topic(agent, topic: str):
-    async with mcp_limiter:
+    async with get_limiter("mcp"), track("reddit_agent"):
         message = [
             {
                 "role": "system",
@@ -85,28 +102,129 @@ async def process_topic(agent, topic: str):
             else:
                 raise
 
+# "agent": a ReAct agent decides which MCP tools to call (several LLM calls per topic)
+# "direct": fixed search + scrape plan over the MCP tools and one LLM call per topic
+REDDIT_MODE = os.getenv("REDDIT_MODE", "agent")
+REDDIT_POSTS_PER_TOPIC = int(os.getenv("REDDIT_POSTS_PER_TOPIC", "2"))
+
+REDDIT_POST_URL = re.compile(r"https?://(?:www\.|old\.)?reddit\.com/r/[^/\s]+/comments/[^\s?#)\]\"'<>]+")
+
+async def call_tool(session, name: str, arguments: dict) -> str:
+    """Call an MCP tool and return its text output"""
+    await get_limiter("brightdata").acquire()
+    result = await session.call_tool(name, arguments)
+    text = "\n".join(item.text for item in result.content if getattr(item, "text", None))
+    if result.isError:
+        if "Overload" in text:
+            raise MCPOverloadedError("Service overload")
+        raise RuntimeError(f"MCP tool {name} failed: {text}")
+    return text
+
+def find_post_urls(search_results: str, limit: int) -> List[str]:
+    """Distinct Reddit post URLs in search result order"""
+    urls = []
+    for match in REDDIT_POST_URL.finditer(search_results):
+        url = match.group(0).rstrip("/.,") + "/"
+        url = url.replace("://old.", "://www.").replace("://reddit.", "://www.reddit.")
+        if url not in urls:
+            urls.append(url)
+        if len(urls) == limit:
+            break
+    return urls
+
+@track("reddit_topic")
+@retry(
+    stop=stop_after_attempt(3) | stop_at_deadline,
+    wait=wait_exponential(multiplier=1, min=15, max=60),
+    retry=retry_if_exception_type(MCPOverloadedError),
+    reraise=True
+)
+async def process_topic_direct(session, topic: str) -> str:
+    """Search Reddit, scrape the top posts and summarize them with a single LLM call"""
+    query = f"site:reddit.com {topic} after:{two_weeks_ago_str}"
+    async with track("reddit_search"):
+        results = await call_tool(session, "search_engine", {"query": query})
+
+    urls = find_post_urls(results, REDDIT_POSTS_PER_TOPIC)
+    if not urls:
+        print(f"No recent Reddit posts found for {topic}")
+        return ""
+
+    async with track("reddit_scrape"):
+        posts = await asyncio.gather(*(call_tool(session, "scrape_as_markdown", {"url": url}) for url in urls))
+
+    return await summarize_reddit_posts_async(
+        api_key=os.getenv("OPENROUTER_API_KEY"),
+        topic=topic,
+        posts=[f"URL: {url}\n\n{post}" for url, post in zip(urls, posts)],
+        since=two_weeks_ago_str,
+        model=REDDIT_MODEL,
+    )
+
+def build_agent(tools):
+    from langgraph.prebuilt import create_react_agent
+
+    return create_react_agent(get_model(), tools)
+
+# Warm MCP sessions with prebuilt agents, started and stopped by the backend lifespan
+reddit_pool = MCPSessionPool(
+    size=int(os.getenv("REDDIT_MCP_POOL_SIZE", "2")),
+    server_params=get_server_params,
+    build_agent=build_agent,
+)
+
+# In-flight Reddit topic analyses, shared by every request
+reddit_flights = SingleFlight("reddit_topic")
+
+async def analyze_with_pool(pool: MCPSessionPool, topic: str) -> str:
+    print(f"Analyzing Reddit topic: {topic}...")
+    async with pool.session() as pooled:
+        if REDDIT_MODE == "direct":
+            return await process_topic_direct(pooled.session, topic)
+        return await process_topic(pooled.agent, topic)
+
+# Finished topic analyses, kept fresh for popular topics by the cache warmer
+reddit_topic_cache = TTLCache(
+    "reddit_topic",
+    ttl=float(os.getenv("REDDIT_TOPIC_CACHE_TTL", "900")),
+    max_entries=int(os.getenv("REDDIT_TOPIC_CACHE_MAX_ENTRIES", "128")),
+)
+
+async def refresh_topic(pool: MCPSessionPool, topic: str) -> str:
+    """Run the analysis (joining one already in flight) and cache the result"""
+    key = normalize_topic(topic)
+    # Concurrent requests for the same topic share a single agent run
+    analysis = await reddit_flights.do(key, lambda: analyze_with_pool(pool, topic))
+    if analysis:
+        reddit_topic_cache.set(key, analysis)
+    return analysis
+
+async def analyze_topic(pool: MCPSessionPool, topic: str) -> str:
+    cached = reddit_topic_cache.get(normalize_topic(topic))
+    if cached is not None:
+        return cached
+    try:
+        return await refresh_topic(pool, topic)
+    except DeadlineExceeded:
+        # The topic missed the deadline, gather_topics leaves it out
+        raise
+    except Exception as e:
+        print(f"Failed to process topic {topic}: {e}")
+        return "Error retrieving Reddit data."
+
 async def scrape_reddit_topics(topics: List[str]) -> dict[str, dict]:
     """Process list of topics and return analysis results"""
-    # Initialize the MCP client (BrightData)
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
-            
-            # Load tools from MCP and create the Agent
-            tools = await load_mcp_tools(session)
-            agent = create_react_agent(model, tools)
-
-            reddit_results = {}
-
-            for topic in topics:
-                print(f"Analyzing Reddit topic: {topic}...")
-                try:
-                    summary = await process_topic(agent, topic)
-                    reddit_results[topic] = summary
-                except Exception as e:
-                    print(f"Failed to process topic {topic}: {e}")
-                    reddit_results[topic] = "Error retrieving Reddit data."
-                    
-                await asyncio.sleep(5) # Rate limiting pause
-
-            return {"reddit_analysis": reddit_results}
\ No newline at end of file
+    pool = reddit_pool
+    if not pool.started:
+        # Outside the app lifespan (scripts, diagnostics) use a one-off session
+        pool = MCPSessionPool(size=1, server_params=get_server_params, build_agent=build_agent)
+        await pool.start()
+
+    try:
+        # Topics still running at the request deadline are cancelled and left out
+        reddit_results = await gather_topics("reddit", topics, lambda topic: analyze_topic(pool, topic))
+    finally:
+        if pool is not reddit_pool:
+            await pool.close()
+
+    return {"reddit_analysis": reddit_results}
@@ -0,0 +1,30 @@
+"""
+Minimal stdio MCP server used by the offline tests in place of @brightdata/mcp
+"""
+from mcp.server.fastmcp import FastMCP
+
+server = FastMCP("fake-brightdata")
+
+
+@server.tool()
+def search_engine(query: str, engine: str = "google") -> str:
+    """Search the web"""
+    if query.startswith("site:reddit.com"):
+        return "\n".join([
+            f"results for {query}",
+            "[Thread one](https://www.reddit.com/r/news/comments/abc123/thread_one/?utm_source=x)",
+            "[Thread one again](https://old.reddit.com/r/news/comments/abc123/thread_one)",
+            "[Thread two](https://www.reddit.com/r/worldnews/comments/def456/thread_two/)",
+            "[Thread three](https://www.reddit.com/r/news/comments/ghi789/thread_three/)",
+        ])
+    return f"results for {query}"
+
+
+@server.tool()
+def scrape_as_markdown(url: str) -> str:
+    """Scrape a page as markdown"""
+    return f"# Page {url}"
+
+
+if __name__ == "__main__":
+    server.run("stdio")
@@ -0,0 +1,81 @@
+"""
+Production server.
+
+    python serve.py --workers 4 --port 1234
+
+Runs backend:app under uvicorn without the reloader, in as many worker
+processes as asked for. Every worker warms up on its own after startup and
+reports ready on /readyz once it has; /healthz is the liveness probe.
+
+Settings come from the flags or the environment (HOST, PORT, WEB_WORKERS,
+LIMIT_CONCURRENCY, ...). With more than one worker the upstream rate limit
+budgets and the background job statuses must be shared between the worker
+processes, so RATE_LIMIT_DIR and JOB_STATE_DIR default to directories under
+the system temp dir.
+
+`python backend.py` stays the development server, with auto-reload.
+"""
+import argparse
+import os
+import tempfile
+
+import uvicorn
+
+
+def _env_int(name: str, default=None):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the NewsNinja backend in production mode")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=_env_int("PORT", 1234))
+    parser.add_argument("--workers", type=int, default=_env_int("WEB_WORKERS", min(os.cpu_count() or 1, 4)),
+                        help="Worker processes, each with its own caches, job workers and MCP pool")
+    parser.add_argument("--limit-concurrency", type=int, default=_env_int("LIMIT_CONCURRENCY"),
+                        help="Connections per worker before new requests get 503")
+    parser.add_argument("--limit-max-requests", type=int, default=_env_int("LIMIT_MAX_REQUESTS"),
+                        help="Requests after which a worker is replaced")
+    parser.add_argument("--backlog", type=int, default=_env_int("BACKLOG", 2048),
+                        help="Connections waiting to be accepted")
+    parser.add_argument("--timeout-keep-alive", type=int, default=_env_int("TIMEOUT_KEEP_ALIVE", 5),
+                        help="Seconds an idle keep-alive connection is kept open")
+    parser.add_argument("--timeout-graceful-shutdown", type=int, default=_env_int("TIMEOUT_GRACEFUL_SHUTDOWN", 30),
+                        help="Seconds running requests get to finish on shutdown")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    return parser.parse_args(argv)
+
+
+def share_state(workers: int, environ=os.environ):
+    """Point every worker at the same rate limit and job state directories"""
+    if workers <= 1:
+        return
+    base = os.path.join(tempfile.gettempdir(), "newsninja")
+    environ.setdefault("RATE_LIMIT_DIR", os.path.join(base, "rate-limits"))
+    environ.setdefault("JOB_STATE_DIR", os.path.join(base, "jobs"))
+
+
+def uvicorn_options(args: argparse.Namespace) -> dict:
+    return dict(
+        host=args.host,
+        port=args.port,
+        workers=max(1, args.workers),
+        reload=False,
+        limit_concurrency=args.limit_concurrency,
+        limit_max_requests=args.limit_max_requests,
+        backlog=args.backlog,
+        timeout_keep_alive=args.timeout_keep_alive,
+        timeout_graceful_shutdown=args.timeout_graceful_shutdown,
+        log_level=args.log_level,
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    share_state(args.workers)
+    uvicorn.run("backend:app", **uvicorn_options(args))
+
+
+if __name__ == "__main__":
+    main()
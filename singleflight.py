@@ -0,0 +1,62 @@
+"""
+Single-flight coalescing of identical in-flight work.
+
+The first caller for a key starts the work, later callers for the same key
+await the same task and all of them get its result (or exception). A waiter
+being cancelled does not cancel the shared work while other callers still wait
+for it; only when the last waiter goes away is the work cancelled.
+
+The shared work runs without the first caller's request deadline, each waiter
+stops waiting at its own deadline instead.
+"""
+import asyncio
+
+from deadlines import DeadlineExceeded, within_deadline, without_deadline
+
+
+def normalize_topic(topic: str) -> str:
+    """Key used to coalesce requests for the same topic ("  AI " == "ai")"""
+    return " ".join(topic.split()).lower()
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}  # key -> [task, waiter count]
+        self.stats = {"started": 0, "coalesced": 0}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, make_coro):
+        """
+        Run make_coro() once per key at a time.
+
+        Args:
+            key: Identity of the work, callers with equal keys share one run
+            make_coro: Zero argument callable returning the coroutine to run
+        """
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.create_task(make_coro(), context=without_deadline())
+            call = self._calls[key] = [task, 0]
+            task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            self.stats["started"] += 1
+        else:
+            self.stats["coalesced"] += 1
+
+        task = call[0]
+        call[1] += 1
+        try:
+            return await within_deadline(asyncio.shield(task))
+        except (asyncio.CancelledError, DeadlineExceeded):
+            if not task.done() and call[1] == 1:
+                # Last interested caller left, the work is no longer needed
+                task.cancel()
+            raise
+        finally:
+            call[1] -= 1
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,125 @@
+"""
+Pipelined script-to-speech.
+
+Instead of waiting for the complete broadcast script before synthesizing it,
+the LLM token stream is cut into sentence / paragraph chunks as it arrives
+(chunk_script) and every chunk is handed to TTS as soon as it is complete
+(pipelined). Synthesis of the first chunks overlaps the generation of the
+rest of the script, and the results come back in script order, so the first
+audio can be sent to the client within seconds.
+"""
+import asyncio
+import re
+import time
+from typing import AsyncIterator, Awaitable, Callable
+
+from metrics import LATENCY_BUCKETS, Histogram, current_source, register
+
+# End of a sentence: terminal punctuation, optional closing quotes/brackets, whitespace
+SENTENCE_END = re.compile(r"[.!?…][\"'”’)\]]*\s+")
+
+time_to_first_audio = register(Histogram(
+    "newsninja_time_to_first_audio_seconds",
+    "Time from the start of a pipelined generation to its first synthesized chunk",
+    LATENCY_BUCKETS,
+))
+
+
+def _cut_point(text: str, min_chars: int, max_chars: int):
+    """Where to end the next chunk of text, None if more text is needed"""
+    paragraph = text.find("\n\n", min_chars)
+    if 0 <= paragraph <= max_chars:
+        return paragraph + 2
+    sentence = SENTENCE_END.search(text, min_chars)
+    if sentence and sentence.end() <= max_chars:
+        return sentence.end()
+    if len(text) >= max_chars:
+        # No boundary in sight, break between words rather than grow the chunk
+        space = text.rfind(" ", min_chars, max_chars)
+        return space + 1 if space > 0 else max_chars
+    return None
+
+
+async def chunk_script(
+    deltas: AsyncIterator[str],
+    first_chars: int = 150,
+    min_chars: int = 600,
+    max_chars: int = 1500,
+) -> AsyncIterator[str]:
+    """
+    Re-cut streamed text into chunks ending on paragraph or sentence boundaries.
+
+    Args:
+        deltas: Text fragments as the LLM produces them
+        first_chars: Minimum size of the first chunk, small to get audio out early
+        min_chars: Minimum size of later chunks, larger for fewer TTS calls
+        max_chars: Chunks are broken between words once they reach this size
+    """
+    buffer = ""
+    target = first_chars
+    async for delta in deltas:
+        buffer += delta
+        while len(buffer) >= target:
+            cut = _cut_point(buffer, target, max(max_chars, target))
+            if cut is None:
+                break
+            chunk, buffer = buffer[:cut].strip(), buffer[cut:]
+            if chunk:
+                yield chunk
+                target = min_chars
+    tail = buffer.strip()
+    if tail:
+        yield tail
+
+
+async def pipelined(
+    chunks: AsyncIterator[str],
+    synthesize: Callable[[str], Awaitable],
+    lookahead: int = 2,
+) -> AsyncIterator:
+    """
+    Synthesize chunks concurrently while they arrive, yield the results in order.
+
+    Args:
+        chunks: Script chunks, typically from chunk_script
+        synthesize: Coroutine function turning one chunk into audio
+        lookahead: Chunks synthesized ahead of the one being consumed
+
+    When the consumer stops early or a step fails, every outstanding
+    synthesis task is cancelled.
+    """
+    started = time.perf_counter()
+    queue = asyncio.Queue(maxsize=max(1, lookahead))
+    finished = object()
+    tasks = []
+
+    async def produce():
+        try:
+            async for chunk in chunks:
+                task = asyncio.create_task(synthesize(chunk))
+                tasks.append(task)
+                await queue.put(task)
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(finished)
+
+    producer = asyncio.create_task(produce())
+    first = True
+    try:
+        while True:
+            item = await queue.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                raise item
+            result = await item
+            if first:
+                first = False
+                time_to_first_audio.observe(time.perf_counter() - started, source=current_source.get())
+            yield result
+    finally:
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(producer, *tasks, return_exceptions=True)
@@ -0,0 +1,102 @@
+"""
+Offline tests for streamed ElevenLabs audio, using a fake async SDK client
+"""
+import asyncio
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+import backend
+import utils
+from warmup import Warmup
+
+CHUNKS = [b"ID3-first", b"frame-2", b"frame-3"]
+
+
+def fake_client(chunks=CHUNKS, fail_after=None):
+    """Async ElevenLabs stand-in whose convert() yields chunks, raising after fail_after of them"""
+    def convert(**kwargs):
+        async def stream():
+            for index, chunk in enumerate(chunks):
+                if index == fail_after:
+                    raise RuntimeError("ElevenLabs error")
+                await asyncio.sleep(0)
+                yield chunk
+        return stream()
+
+    return SimpleNamespace(text_to_speech=SimpleNamespace(convert=convert))
+
+
+def use_fake_client(monkeypatch, tmp_path, **kwargs):
+    monkeypatch.setenv("ELEVEN_API_KEY", "test")
+    monkeypatch.setattr(utils, "get_async_elevenlabs_client", lambda api_key: fake_client(**kwargs))
+    monkeypatch.chdir(tmp_path)
+
+
+def stored_files(tmp_path):
+    return sorted(p.name for p in (tmp_path / "audio").iterdir()) if (tmp_path / "audio").exists() else []
+
+
+def test_chunks_are_forwarded_in_order_and_stored_after_completion(monkeypatch, tmp_path):
+    use_fake_client(monkeypatch, tmp_path)
+    filepath = tmp_path / utils.audio_cache_path("audio", "Bitcoin rose.", "voice", "model", "mp3_44100_128")
+
+    async def main():
+        stream = utils.stream_audio_elevenlabs("Bitcoin rose.", voice_id="voice", model_id="model")
+        received = [await anext(stream)]
+        assert not filepath.exists()
+        received += [chunk async for chunk in stream]
+        return received
+
+    assert asyncio.run(main()) == CHUNKS
+    assert filepath.read_bytes() == b"".join(CHUNKS)
+    assert stored_files(tmp_path) == [filepath.name]
+
+    # The next stream of the same script is served from the store
+    monkeypatch.setattr(utils, "get_async_elevenlabs_client", lambda api_key: fake_client(chunks=[]))
+
+    async def again():
+        return b"".join([chunk async for chunk in utils.stream_audio_elevenlabs(
+            "Bitcoin rose.", voice_id="voice", model_id="model"
+        )])
+
+    assert asyncio.run(again()) == b"".join(CHUNKS)
+
+
+def test_client_disconnect_discards_the_temp_file(monkeypatch, tmp_path):
+    use_fake_client(monkeypatch, tmp_path)
+
+    async def main():
+        stream = utils.stream_audio_elevenlabs("Bitcoin rose.")
+        await anext(stream)
+        assert any(name.endswith(".part") for name in stored_files(tmp_path))
+        await stream.aclose()
+
+    asyncio.run(main())
+    assert stored_files(tmp_path) == []
+
+
+def request_streamed_audio(monkeypatch):
+    async def script(request):
+        return "Bitcoin rose."
+
+    monkeypatch.setattr(backend, "build_broadcast_script", script)
+    monkeypatch.setattr(backend, "warmup", Warmup({}))
+    with TestClient(backend.app) as client:
+        return client.post("/generate-news-audio", json={"topics": ["Bitcoin"], "source_type": "news", "stream": True})
+
+
+def test_streaming_endpoint_sends_chunks_in_order(monkeypatch, tmp_path):
+    use_fake_client(monkeypatch, tmp_path)
+    response = request_streamed_audio(monkeypatch)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "audio/mpeg"
+    assert response.content == b"".join(CHUNKS)
+
+
+def test_failure_before_first_chunk_is_a_500(monkeypatch, tmp_path):
+    use_fake_client(monkeypatch, tmp_path, fail_after=0)
+    response = request_streamed_audio(monkeypatch)
+    assert response.status_code == 500
+    assert "ElevenLabs error" in response.json()["detail"]
+    assert not any(name.endswith(".mp3") for name in stored_files(tmp_path))
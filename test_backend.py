@@ -0,0 +1,81 @@
+"""
+Offline tests for the backend's request pipeline
+"""
+import asyncio
+
+import pytest
+
+import backend
+from deadlines import deadline
+from models import NewsRequest
+
+
+def test_failing_branch_cancels_and_awaits_the_others():
+    events = []
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("BrightData error")
+
+    async def sleeping():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.01)  # cleanup that must finish before the error surfaces
+            events.append("cancelled")
+            raise
+
+    async def main():
+        try:
+            await backend.gather_or_cancel([failing(), sleeping()])
+        except ValueError:
+            events.append("error")
+            raise
+
+    with pytest.raises(ValueError, match="BrightData error"):
+        asyncio.run(main())
+    assert events == ["cancelled", "error"]
+
+
+def test_failed_segment_is_skipped_and_the_rest_stitched(monkeypatch):
+    async def build_segment(topic, source_type):
+        await asyncio.sleep(0.01)
+        if topic == "Bitcoin":
+            raise RuntimeError("ElevenLabs error")
+        return f"audio/{topic}.mp3"
+
+    stitched = []
+
+    def stitch(paths, output_dir):
+        stitched.append(paths)
+        return "audio/broadcast.mp3"
+
+    monkeypatch.setattr(backend, "build_segment", build_segment)
+    monkeypatch.setattr(backend, "stitch_audio_files", stitch)
+    request = NewsRequest(topics=["AI", "Bitcoin", "Climate"], source_type="news", mode="segmented")
+
+    async def main():
+        with deadline(10) as request_deadline:
+            path = await backend.generate_segmented_audio_file(request)
+        return path, request_deadline.skipped
+
+    path, skipped = asyncio.run(main())
+    assert path == "audio/broadcast.mp3"
+    assert stitched == [["audio/AI.mp3", "audio/Climate.mp3"]]
+    assert skipped == {"segment": ["Bitcoin"]}
+
+
+def test_pipelined_broadcast_without_content_fails(monkeypatch, tmp_path):
+    async def no_chunks(request):
+        return
+        yield
+
+    monkeypatch.setattr(backend, "pipelined_audio_files", no_chunks)
+    monkeypatch.chdir(tmp_path)
+    request = NewsRequest(topics=["AI"], source_type="news", mode="pipelined")
+
+    with pytest.raises(RuntimeError, match=backend.NO_BROADCAST_CONTENT):
+        asyncio.run(backend.generate_audio_file(request))
+    assert not (tmp_path / "audio").exists()
+    with pytest.raises(ValueError):
+        backend.stitch_audio_files([], str(tmp_path / "audio"))
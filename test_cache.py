@@ -0,0 +1,128 @@
+"""
+Offline tests for the upstream caches
+"""
+import asyncio
+import os
+import threading
+import time
+
+from cache import TTLCache
+
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache("test", ttl=60, max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"  # a is now most recently used
+    cache.set("c", "3")           # evicts b
+
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+    assert stats["size"] == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache("test", ttl=0.05)
+    cache.set("a", "1")
+    assert cache.get("a") == "1"
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_zero_ttl_disables_cache():
+    cache = TTLCache("test", ttl=0)
+    cache.set("a", "1")
+    assert cache.get("a") is None
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    first = TTLCache("test", ttl=60, disk_dir=str(tmp_path))
+    first.set("https://news.google.com/search?q=bitcoin", "<html>page</html>")
+
+    second = TTLCache("test", ttl=60, disk_dir=str(tmp_path))
+    assert second.get("https://news.google.com/search?q=bitcoin") == "<html>page</html>"
+    assert second.stats()["disk_hits"] == 1
+    assert list(tmp_path.glob("*.json.gz"))
+
+
+def test_async_disk_tier_runs_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    read_disk, write_disk = TTLCache._read_disk, TTLCache._write_disk
+
+    def record_read(self, *args):
+        threads.append(threading.current_thread())
+        return read_disk(self, *args)
+
+    def record_write(self, *args):
+        threads.append(threading.current_thread())
+        return write_disk(self, *args)
+
+    monkeypatch.setattr(TTLCache, "_read_disk", record_read)
+    monkeypatch.setattr(TTLCache, "_write_disk", record_write)
+
+    async def main():
+        await TTLCache("test", ttl=60, disk_dir=str(tmp_path)).aset("page", "<html>page</html>")
+        second = TTLCache("test", ttl=60, disk_dir=str(tmp_path))
+        assert await second.aget("page") == "<html>page</html>"
+        assert await second.aget("page") == "<html>page</html>"  # memory hit
+        assert await second.aget("missing") is None
+        return second.stats()
+
+    stats = asyncio.run(main())
+    assert (stats["disk_hits"], stats["hits"], stats["misses"]) == (1, 1, 1)
+    assert len(threads) == 3
+    assert threading.main_thread() not in threads
+
+
+def test_summary_served_from_llm_cache(monkeypatch):
+    import httpx
+    import http_clients
+    import utils
+
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "Bitcoin rose today."}}]})
+
+    monkeypatch.setattr(utils, "llm_cache", TTLCache("test", ttl=60))
+    monkeypatch.setitem(http_clients._sync_clients, "openrouter", httpx.Client(transport=httpx.MockTransport(handler)))
+
+    first = utils.summarize_with_openrouter_news_script("key", "Bitcoin hits new high")
+    second = utils.summarize_with_openrouter_news_script("key", "Bitcoin hits new high")
+    third = utils.summarize_with_openrouter_news_script("key", "Bitcoin falls")
+
+    assert first == second == third == "Bitcoin rose today."
+    assert len(calls) == 2
+    assert utils.llm_cache.stats()["hits"] == 1
+
+
+def test_tts_audio_is_content_addressed(monkeypatch, tmp_path):
+    import utils
+
+    calls = []
+
+    class FakeTTS:
+        def convert(self, text, **kwargs):
+            calls.append(text)
+            return iter([text.encode("utf-8"), b"-audio"])
+
+    class FakeClient:
+        text_to_speech = FakeTTS()
+
+    monkeypatch.setattr(utils, "get_elevenlabs_client", lambda api_key: FakeClient())
+
+    first = utils.text_to_audio_elevenlabs_sdk("Hello world", output_dir=str(tmp_path), api_key="key")
+    again = utils.text_to_audio_elevenlabs_sdk("Hello world", output_dir=str(tmp_path), api_key="key")
+    other = utils.text_to_audio_elevenlabs_sdk("Goodbye", output_dir=str(tmp_path), api_key="key")
+
+    assert first == again != other
+    assert calls == ["Hello world", "Goodbye"]
+    assert open(first, "rb").read() == b"Hello world-audio"
+    # No temp files are left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([os.path.basename(first), os.path.basename(other)])
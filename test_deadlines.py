@@ -0,0 +1,184 @@
+"""
+Tests for end-to-end request deadlines
+"""
+import asyncio
+import time
+
+import pytest
+from tenacity import retry, stop_after_attempt, wait_fixed
+
+from deadlines import (
+    DeadlineExceeded,
+    clamp_timeout,
+    deadline,
+    gather_topics,
+    keep_back,
+    remaining,
+    stop_at_deadline,
+    within_deadline,
+)
+from singleflight import SingleFlight
+
+
+def test_stragglers_are_cancelled_and_reported():
+    cancelled = []
+
+    async def run(topic):
+        try:
+            await asyncio.sleep(0.01 if topic == "fast" else 5)
+        except asyncio.CancelledError:
+            cancelled.append(topic)
+            raise
+        return f"summary of {topic}"
+
+    async def main():
+        with deadline(0.2) as request_deadline:
+            results = await gather_topics("news", ["fast", "slow"], run)
+        return results, request_deadline.skipped
+
+    start = time.perf_counter()
+    results, skipped = asyncio.run(main())
+    assert time.perf_counter() - start < 1
+    assert results == {"fast": "summary of fast"}
+    assert skipped == {"news": ["slow"]}
+    assert cancelled == ["slow"]
+
+
+def test_without_deadline_every_topic_finishes():
+    async def run(topic):
+        await asyncio.sleep(0.01)
+        return topic.upper()
+
+    assert asyncio.run(gather_topics("news", ["a", "b", "a"], run)) == {"a": "A", "b": "B"}
+
+
+def test_topic_error_cancels_the_rest():
+    async def run(topic):
+        if topic == "bad":
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+        await asyncio.sleep(5)
+
+    async def main():
+        with deadline(10):
+            await gather_topics("segment", ["slow", "bad"], run)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+
+
+def test_nested_deadlines_only_narrow():
+    with deadline(10) as outer:
+        with deadline(100) as inner:
+            assert inner.expires_at == outer.expires_at
+            assert inner.skipped is outer.skipped
+        with keep_back(4):
+            assert 5.5 < remaining() <= 6
+        with keep_back(9, min_share=0.5):
+            assert 4.5 < remaining() <= 5
+    assert remaining() is None
+    with keep_back(4):
+        assert remaining() is None
+
+
+def test_timeouts_are_clamped():
+    assert clamp_timeout(60) == 60
+    with deadline(5):
+        assert clamp_timeout(60) <= 5
+        assert clamp_timeout(1) == 1
+    with deadline(-1):
+        with pytest.raises(DeadlineExceeded):
+            clamp_timeout(60)
+
+
+def test_retries_stop_within_the_budget():
+    attempts = []
+
+    @retry(stop=stop_after_attempt(10) | stop_at_deadline, wait=wait_fixed(0.1), reraise=True)
+    async def flaky():
+        attempts.append(time.perf_counter())
+        raise ConnectionError("upstream down")
+
+    async def main():
+        with deadline(0.25):
+            await flaky()
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(main())
+    # Attempts at 0, 0.1 and 0.2 s, the next back-off would end past the deadline
+    assert len(attempts) == 3
+
+
+def test_within_deadline_raises_when_time_runs_out():
+    async def main():
+        with deadline(0.05):
+            await within_deadline(asyncio.sleep(5))
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+
+
+def test_shared_work_runs_under_no_callers_deadline():
+    async def work():
+        assert remaining() is None
+        await asyncio.sleep(0.2)
+        return clamp_timeout(60)
+
+    async def main():
+        flight = SingleFlight("test")
+
+        async def request(seconds):
+            with deadline(seconds):
+                return await flight.do("bitcoin", work)
+
+        return await asyncio.gather(request(0.05), request(100), return_exceptions=True)
+
+    short, long = asyncio.run(main())
+    assert isinstance(short, DeadlineExceeded)
+    assert long == 60
+
+
+def test_topic_missing_its_deadline_is_skipped():
+    async def run(topic):
+        if topic == "late":
+            raise DeadlineExceeded("Request deadline exceeded")
+        return topic
+
+    async def main():
+        with deadline(10) as request_deadline:
+            results = await gather_topics("news", ["late", "ai"], run)
+        return results, request_deadline.skipped
+
+    results, skipped = asyncio.run(main())
+    assert skipped == {"news": ["late"]}
+    assert "late" not in results
+
+
+def test_segment_missing_a_source_is_not_cached(monkeypatch, tmp_path):
+    import backend
+
+    audio = tmp_path / "segment.mp3"
+    audio.write_bytes(b"mp3")
+    reddit = {"reddit_analysis": {"Bitcoin": "Redditors are optimistic."}}
+
+    async def gather_sources(topics, source_type, headlines_only=False):
+        # News was skipped at the deadline, Reddit finished
+        return {"news": {"news_analysis": {}}, "reddit": reddit}
+
+    async def script(**kwargs):
+        return "Bitcoin segment"
+
+    async def tts(**kwargs):
+        return str(audio)
+
+    monkeypatch.setattr(backend, "gather_sources", gather_sources)
+    monkeypatch.setattr(backend, "generate_broadcast_news_async", script)
+    monkeypatch.setattr(backend, "text_to_audio_elevenlabs_async", tts)
+    backend.segment_cache.clear()
+
+    assert asyncio.run(backend.build_segment("Bitcoin", "both")) == str(audio)
+    assert backend.segment_cache.get("both:bitcoin") is None
+
+    assert asyncio.run(backend.build_segment("Bitcoin", "reddit")) == str(audio)
+    assert backend.segment_cache.get("reddit:bitcoin") == str(audio)
+    backend.segment_cache.clear()
@@ -0,0 +1,53 @@
+"""
+Offline tests for near-duplicate headline clustering
+"""
+from bench_pipeline import make_news_page
+from headline_dedup import cluster_headlines, dedupe_headline_text, minhash_signatures
+from headline_parser import extract_headlines_from_html
+
+HEADLINES = [
+    "Bitcoin hits record high as ETF inflows surge",
+    "Fed signals rate pause",
+    "Bitcoin hits a record high as ETF inflows surge",
+    "El Salvador adds more Bitcoin to reserves",
+    "BITCOIN hits record high as ETF inflows surge!",
+    "Fed signals a rate pause, markets rally",
+]
+
+
+def test_near_duplicates_share_a_cluster():
+    clusters = cluster_headlines(HEADLINES)
+    assert [(c.headline, c.size) for c in clusters] == [
+        ("Bitcoin hits record high as ETF inflows surge", 3),
+        ("Fed signals rate pause", 2),
+        ("El Salvador adds more Bitcoin to reserves", 1),
+    ]
+
+
+def test_dedupe_ranks_by_cluster_size():
+    assert dedupe_headline_text("\n".join(HEADLINES)).split("\n") == [
+        "Bitcoin hits record high as ETF inflows surge (3 outlets)",
+        "Fed signals rate pause (2 outlets)",
+        "El Salvador adds more Bitcoin to reserves",
+    ]
+    assert dedupe_headline_text("") == ""
+
+
+def test_signatures_match_across_batches(monkeypatch):
+    import headline_dedup
+
+    lines = extract_headlines_from_html(make_news_page(100_000)).split("\n")
+    whole = minhash_signatures(lines)
+    monkeypatch.setattr(headline_dedup, "MAX_BATCH_SHINGLES", 50)
+    assert (minhash_signatures(lines) == whole).all()
+
+
+def test_distinct_headlines_are_kept():
+    lines = [f"Headline number {i} about topic {i * 7919 % 1000}" for i in range(0, 3000, 97)]
+    assert len(cluster_headlines(lines, threshold=0.9)) == len(lines)
+
+
+def test_punctuation_only_lines_are_not_merged():
+    assert dedupe_headline_text("—\n!!!\n???") == "—\n!!!\n???"
+    clusters = cluster_headlines(["!!!", HEADLINES[0], "???", HEADLINES[2]])
+    assert [(c.headline, c.size) for c in clusters] == [("!!!", 1), (HEADLINES[0], 2), ("???", 1)]
@@ -0,0 +1,41 @@
+"""
+Parity tests for the headline extraction backends on saved Google News pages
+"""
+from pathlib import Path
+
+import pytest
+
+from headline_parser import available_backends, extract_headlines_from_html
+from utils import clean_html_to_text, extract_headlines
+
+SAMPLES = sorted((Path(__file__).parent / "samples").glob("google_news_*.html"))
+
+
+@pytest.mark.parametrize("sample", SAMPLES, ids=lambda p: p.stem)
+@pytest.mark.parametrize("backend", ["bs4", "lxml"])
+def test_backend_matches_original_pipeline(sample, backend):
+    if backend not in available_backends():
+        pytest.skip(f"{backend} is not installed")
+    html = sample.read_text(encoding="utf-8")
+
+    expected = extract_headlines(clean_html_to_text(html))
+    assert extract_headlines_from_html(html, backend=backend) == expected
+
+
+def test_headline_rule():
+    html = (
+        "<nav>Google News</nav>"
+        "<article><a>Bitcoin <b>hits</b> record</a><span>Reuters</span><button>More</button></article>"
+        "<script>var label = 'More';</script>"
+        "<article><a>ETF inflows rise &amp; funds grow</a><!-- c --><span>CNBC</span><button>More</button></article>"
+        "<p>trailing block"
+    )
+    for backend in available_backends():
+        headlines = extract_headlines_from_html(html, backend=backend)
+        assert headlines.split("\n") == ["Google News", "ETF inflows rise & funds grow", "trailing block"]
+
+
+def test_samples_present():
+    assert SAMPLES
+    headlines = extract_headlines_from_html(SAMPLES[0].read_text(encoding="utf-8"), backend="bs4")
+    assert len(headlines.split("\n")) > 5
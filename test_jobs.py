@@ -0,0 +1,166 @@
+"""
+Offline tests for the background job queue
+"""
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+import backend
+from deadlines import current_deadline
+from jobs import JobManager, JobQueueFull, JobResult
+from warmup import Warmup
+
+
+def test_workers_bound_concurrency_and_report_results():
+    async def main():
+        running = 0
+        peak = 0
+
+        async def run(payload):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            if payload == "broken":
+                raise RuntimeError("TTS failed")
+            return f"audio/{payload}.mp3"
+
+        manager = JobManager(run, workers=2, queue_size=10)
+        await manager.start()
+        try:
+            jobs = [manager.submit(topic) for topic in ["ai", "bitcoin", "climate", "broken"]]
+            assert all(job.status == "queued" for job in jobs)
+            await manager._queue.join()
+        finally:
+            await manager.close()
+
+        assert peak == 2
+        assert [manager.get(job.id).status for job in jobs] == ["done", "done", "done", "failed"]
+        assert manager.get(jobs[0].id).result == "audio/ai.mp3"
+        failed = manager.get(jobs[3].id).to_dict()
+        assert failed["error"] == "TTS failed"
+        assert failed["started_at"] <= failed["finished_at"]
+        assert manager.stats()["jobs"] == {"done": 3, "failed": 1}
+
+    asyncio.run(main())
+
+
+def test_full_queue_rejects_new_jobs():
+    async def main():
+        release = asyncio.Event()
+
+        async def run(payload):
+            await release.wait()
+
+        manager = JobManager(run, workers=1, queue_size=1)
+        await manager.start()
+        try:
+            manager.submit("running")
+            await asyncio.sleep(0)  # the worker takes the first job
+            manager.submit("queued")
+            try:
+                manager.submit("rejected")
+                assert False, "expected JobQueueFull"
+            except JobQueueFull:
+                pass
+            assert manager.stats()["queued"] == 1
+        finally:
+            release.set()
+            await manager.close()
+
+    asyncio.run(main())
+
+
+def test_finished_jobs_expire_after_result_ttl(monkeypatch):
+    async def main():
+        async def run(payload):
+            return payload
+
+        manager = JobManager(run, result_ttl=60)
+        await manager.start()
+        try:
+            job = manager.submit("ai")
+            await manager._queue.join()
+        finally:
+            await manager.close()
+        return manager, job
+
+    manager, job = asyncio.run(main())
+    assert manager.get(job.id) is job
+
+    finished_at = job.finished_at
+    monkeypatch.setattr("jobs.time.time", lambda: finished_at + 61)
+    assert manager.get(job.id) is None
+    assert manager.stats()["jobs"] == {}
+
+
+def test_full_queue_answers_503_with_retry_after(monkeypatch):
+    release = asyncio.Event()
+
+    async def run(payload):
+        await release.wait()
+
+    monkeypatch.setattr(backend, "job_manager", JobManager(run, workers=1, queue_size=1))
+    monkeypatch.setattr(backend, "warmup", Warmup({}))
+    body = {"topics": ["AI"], "source_type": "news"}
+    with TestClient(backend.app) as client:
+        first = client.post("/jobs", json=body)
+        assert first.status_code == 202
+        assert client.get(first.json()["status_url"]).json()["status"] in ("queued", "running")
+
+        statuses = [client.post("/jobs", json=body).status_code for _ in range(2)]
+        assert statuses[-1] == 503
+        rejected = client.post("/jobs", json=body)
+        assert rejected.status_code == 503
+        assert rejected.headers["Retry-After"] == "30"
+
+        assert client.get("/jobs/unknown").status_code == 404
+
+
+def test_skipped_topics_are_kept_with_the_result(tmp_path):
+    async def main():
+        async def run(payload):
+            return JobResult("audio/broadcast.mp3", {"reddit": ["AI"]})
+
+        manager = JobManager(run, state_dir=str(tmp_path))
+        await manager.start()
+        try:
+            job = manager.submit("ai")
+            await manager._queue.join()
+        finally:
+            await manager.close()
+        return job
+
+    job = asyncio.run(main())
+    assert job.result == "audio/broadcast.mp3"
+    assert job.to_dict()["skipped_topics"] == {"reddit": ["AI"]}
+    persisted = JobManager(None, state_dir=str(tmp_path)).get(job.id)
+    assert persisted.skipped_topics == {"reddit": ["AI"]}
+
+
+def test_job_status_and_audio_report_skipped_topics(monkeypatch, tmp_path):
+    audio = tmp_path / "broadcast.mp3"
+    audio.write_bytes(b"mp3")
+
+    async def generate_audio_file(request):
+        current_deadline.get().skip("reddit", "AI")
+        return str(audio)
+
+    monkeypatch.setattr(backend, "generate_audio_file", generate_audio_file)
+    monkeypatch.setattr(backend, "job_manager", JobManager(backend.run_job))
+    monkeypatch.setattr(backend, "warmup", Warmup({}))
+    with TestClient(backend.app) as client:
+        status_url = client.post("/jobs", json={"topics": ["AI"], "source_type": "both"}).json()["status_url"]
+        status = client.get(status_url).json()
+        for _ in range(100):
+            if status["status"] == "done":
+                break
+            time.sleep(0.01)
+            status = client.get(status_url).json()
+
+        assert status["skipped_topics"] == {"reddit": ["AI"]}
+        response = client.get(status["audio_url"])
+        assert json.loads(response.headers["X-Skipped-Topics"]) == {"reddit": ["AI"]}
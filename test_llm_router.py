@@ -0,0 +1,186 @@
+"""
+Tests for OpenRouter model fallback, circuit breaking and hedging
+"""
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+import rate_limits
+from llm_router import ModelBreaker, OpenRouterRouter
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    monkeypatch.setattr(rate_limits, "_limiters", {})
+    monkeypatch.setenv("RATE_LIMIT_OPENROUTER", "0")
+
+
+def mock_client(behaviour, calls=None):
+    """Async client answering every model as behaviour[model] = (status, delay)"""
+
+    async def handler(request):
+        model = json.loads(request.content)["model"]
+        if calls is not None:
+            calls.append(model)
+        status, delay = behaviour[model]
+        await asyncio.sleep(delay)
+        return httpx.Response(status, json={"choices": [{"message": {"content": f"from {model}"}}]})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def post(router, client, model="a"):
+    async def main():
+        async with client:
+            response = await router.post(client, {}, {"model": model, "messages": []}, timeout=10)
+            return response.status_code, response.json()["choices"][0]["message"]["content"]
+    return asyncio.run(main())
+
+
+def test_falls_back_on_retryable_errors_only():
+    router = OpenRouterRouter(["a", "b"], hedge=False)
+    calls = []
+    assert post(router, mock_client({"a": (503, 0), "b": (200, 0)}, calls)) == (200, "from b")
+    assert calls == ["a", "b"]
+    assert router.stats["fallbacks"] == 1
+
+    calls.clear()
+    assert post(router, mock_client({"a": (401, 0), "b": (200, 0)}, calls))[0] == 401
+    assert calls == ["a"]
+
+
+def test_breaker_opens_and_probes_after_cooldown():
+    clock = [0.0]
+    breaker = ModelBreaker(window=10, min_calls=4, error_rate=0.5, cooldown=30, clock=lambda: clock[0])
+    for ok in (True, False, True, False):
+        breaker.record(ok, 1.0)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock[0] = 31
+    assert breaker.allow()  # the probe
+    assert not breaker.allow()
+    breaker.record(True, 1.0)
+    assert breaker.state == "closed"
+
+
+def test_slow_calls_count_as_failures():
+    breaker = ModelBreaker(min_calls=2, error_rate=0.5, slow_call=5)
+    breaker.record(True, 9)
+    breaker.record(True, 9)
+    assert breaker.state == "open"
+
+
+def test_open_breaker_skips_model():
+    router = OpenRouterRouter(["a", "b"], hedge=False, min_calls=2, error_rate=0.5)
+    calls = []
+    client_behaviour = {"a": (500, 0), "b": (200, 0)}
+    for _ in range(2):
+        post(router, mock_client(client_behaviour, calls))
+    assert router.breaker("a").state == "open"
+
+    calls.clear()
+    assert post(router, mock_client(client_behaviour, calls)) == (200, "from b")
+    assert calls == ["b"]
+
+
+def test_hedged_request_wins_when_primary_is_slow():
+    router = OpenRouterRouter(["a", "b"], hedge=True, hedge_after=0.05, min_hedge_delay=0)
+    calls = []
+    start = time.perf_counter()
+    result = post(router, mock_client({"a": (200, 2.0), "b": (200, 0)}, calls))
+    assert time.perf_counter() - start < 1.0
+    assert result == (200, "from b")
+    assert calls == ["a", "b"]
+    assert router.stats["hedged"] == 1
+    assert router.stats["hedge_wins"] == 1
+    # The cancelled primary has no outcome
+    assert router.breaker("a").failure_rate() == 0
+
+
+def test_no_hedge_when_primary_is_fast():
+    router = OpenRouterRouter(["a", "b"], hedge=True, hedge_after=0.5, min_hedge_delay=0)
+    calls = []
+    assert post(router, mock_client({"a": (200, 0), "b": (200, 0)}, calls)) == (200, "from a")
+    assert calls == ["a"]
+
+
+def test_no_hedges_while_queued_behind_the_rate_limiter(monkeypatch):
+    limiter = rate_limits.RateLimiter("openrouter", 1, per=0.2)
+    monkeypatch.setattr(rate_limits, "_limiters", {"openrouter": limiter})
+    router = OpenRouterRouter(["a", "b"], hedge_after=0.05, min_hedge_delay=0.01)
+    client = mock_client({"a": (200, 0.01), "b": (200, 0.01)})
+
+    async def main():
+        async with client:
+            return await asyncio.gather(*(
+                router.post(client, {}, {"model": "a", "messages": []}, timeout=10) for _ in range(4)
+            ))
+
+    responses = asyncio.run(main())
+    assert [r.json()["choices"][0]["message"]["content"] for r in responses] == ["from a"] * 4
+    # The last call queued for 0.6 s, far past the hedge delay, without hedging
+    assert limiter.stats["max_wait_seconds"] > 0.5
+    assert router.stats["hedged"] == 0
+    assert limiter.stats["acquired"] == 4
+
+
+def test_probe_is_released_when_its_task_never_runs(monkeypatch):
+    clock = [0.0]
+    router = OpenRouterRouter(["a"], hedge=False, min_calls=1, cooldown=30, clock=lambda: clock[0])
+    router.breaker("a").record(False)
+    assert router.breaker("a").state == "open"
+    clock[0] = 31
+
+    create_task = asyncio.create_task
+
+    def cancelled_before_first_step(coro):
+        task = create_task(coro)
+        task.cancel()
+        return task
+
+    with monkeypatch.context() as patch:
+        patch.setattr(asyncio, "create_task", cancelled_before_first_step)
+        with pytest.raises(asyncio.CancelledError):
+            post(router, mock_client({"a": (200, 0)}))
+
+    # Still half open, but the next call may probe again
+    assert router.breaker("a").state == "half_open"
+    assert router.breaker("a").allow()
+
+
+def test_stream_falls_back_before_first_byte():
+    router = OpenRouterRouter(["a", "b"], hedge=False)
+
+    def handler(request):
+        model = json.loads(request.content)["model"]
+        if model == "a":
+            return httpx.Response(429, text="rate limited")
+        return httpx.Response(200, text='data: {"choices": [{"delta": {"content": "hi"}}]}\n\ndata: [DONE]\n\n')
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            async with router.stream(client, {}, {"model": "a", "messages": []}, timeout=10) as response:
+                return response.status_code, [line async for line in response.aiter_lines() if line]
+
+    status, lines = asyncio.run(main())
+    assert status == 200
+    assert lines[-1] == "data: [DONE]"
+    assert router.breaker("a").failure_rate() == 1
+
+
+def test_sync_post_falls_back():
+    router = OpenRouterRouter(["a", "b"])
+
+    def handler(request):
+        model = json.loads(request.content)["model"]
+        if model == "a":
+            raise httpx.ConnectError("down")
+        return httpx.Response(200, json={"model": model})
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        response = router.post_sync(client, {}, {"model": "a", "messages": []}, timeout=10)
+    assert response.json() == {"model": "b"}
@@ -0,0 +1,58 @@
+"""
+Offline tests for the MCP session pool, using a local stdio MCP server
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+from mcp import StdioServerParameters
+
+from mcp_pool import MCPSessionPool
+
+FAKE_SERVER = str(Path(__file__).parent / "samples" / "fake_mcp_server.py")
+
+
+def make_pool(size=2):
+    params = StdioServerParameters(command=sys.executable, args=[FAKE_SERVER])
+    return MCPSessionPool(size=size, server_params=params, build_agent=lambda tools: [t.name for t in tools])
+
+
+def test_sessions_are_reused_and_run_concurrently():
+    async def main():
+        pool = make_pool(size=2)
+        await pool.start()
+        try:
+            assert pool.stats()["alive"] == 2
+
+            async def use():
+                async with pool.session() as pooled:
+                    result = await pooled.session.call_tool("search_engine", {"query": "bitcoin"})
+                    return pooled.index, pooled.agent, result.content[0].text
+
+            results = await asyncio.gather(*(use() for _ in range(4)))
+            assert {index for index, _, _ in results} == {0, 1}
+            assert all("search_engine" in agent for _, agent, _ in results)
+            assert all(text == "results for bitcoin" for _, _, text in results)
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
+
+
+def test_dead_session_is_restarted_on_checkout():
+    async def main():
+        pool = make_pool(size=1)
+        await pool.start()
+        try:
+            async with pool.session() as pooled:
+                first_session = pooled.session
+            await pooled.stop()
+            assert not pooled.alive
+
+            async with pool.session() as pooled:
+                assert pooled.alive
+                assert pooled.session is not first_session
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
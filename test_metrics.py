@@ -0,0 +1,75 @@
+"""
+Offline tests for the pipeline metrics
+"""
+import asyncio
+
+import pytest
+
+from metrics import current_source, render_prometheus, stage_errors, stage_in_flight, stage_latency, track
+
+
+def test_track_records_latency_and_errors():
+    @track("test_ok")
+    async def ok():
+        assert stage_in_flight.values[(("source", "news"), ("stage", "test_ok"))] == 1
+        return "done"
+
+    @track("test_fail")
+    def fail():
+        raise ValueError("upstream down")
+
+    async def main():
+        current_source.set("news")
+        assert await ok() == "done"
+        with pytest.raises(ValueError):
+            fail()
+
+    asyncio.run(main())
+
+    assert stage_latency.snapshot(stage="test_ok", source="news")["count"] == 1
+    assert stage_in_flight.values[(("source", "news"), ("stage", "test_ok"))] == 0
+    assert stage_errors.values[(("error", "ValueError"), ("source", "news"), ("stage", "test_fail"))] == 1
+
+
+def test_prometheus_output():
+    with track("test_render"):
+        pass
+    text = render_prometheus()
+    assert "# TYPE newsninja_stage_latency_seconds histogram" in text
+    assert 'newsninja_stage_latency_seconds_count{source="none",stage="test_render"} 1' in text
+    assert 'stage="test_render",le="+Inf"} 1' in text
+
+
+def test_fused_broadcast_counts_tokens(monkeypatch):
+    import json
+
+    import httpx
+    import utils
+    from cache import TTLCache
+    from metrics import llm_tokens
+
+    prompts = []
+
+    def handler(request):
+        prompts.append(json.loads(request.content)["messages"])
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": "According to official reports, Bitcoin rose."}}],
+            "usage": {"prompt_tokens": 120, "completion_tokens": 30},
+        })
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(utils, "get_async_client", lambda name: client)
+    monkeypatch.setattr(utils, "llm_cache", TTLCache("test", ttl=60))
+
+    async def main():
+        current_source.set("fused_test")
+        headlines = {"news_headlines": {"Bitcoin": "Bitcoin hits record\nETF inflows rise"}}
+        return await utils.generate_fused_broadcast_news_async("key", headlines, {}, ["Bitcoin"])
+
+    assert asyncio.run(main()) == "According to official reports, Bitcoin rose."
+    system, user = prompts[0]
+    assert system["content"] == utils.FUSED_BROADCAST_SYSTEM_PROMPT
+    assert "OFFICIAL NEWS HEADLINES:\nBitcoin hits record\nETF inflows rise" in user["content"]
+    labels = {"stage": "fused_broadcast_script", "source": "fused_test"}
+    assert llm_tokens.values[tuple(sorted({**labels, "kind": "prompt"}.items()))] == 120
+    assert llm_tokens.values[tuple(sorted({**labels, "kind": "completion"}.items()))] == 30
@@ -0,0 +1,56 @@
+"""
+Offline tests for frame-level MP3 joining
+"""
+import pytest
+
+from mp3_frames import iter_frames, join_mp3, parse_header
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, joint stereo
+HEADER = bytes([0xFF, 0xFB, 0x90, 0x44])
+FRAME_LENGTH = 417
+
+
+def make_frame(fill: int, header: bytes = HEADER) -> bytes:
+    length = parse_header(header).length
+    return header + bytes([fill]) * (length - 4)
+
+
+def make_info_frame() -> bytes:
+    frame = bytearray(make_frame(0))
+    frame[36:40] = b"Info"
+    return bytes(frame)
+
+
+def make_file(*fills, info: bool = True) -> bytes:
+    id3v2 = b"ID3\x04\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+    id3v1 = b"TAG" + b"\x00" * 125
+    frames = b"".join(make_frame(fill) for fill in fills)
+    return id3v2 + (make_info_frame() if info else b"") + frames + id3v1
+
+
+def test_parse_header():
+    header = parse_header(HEADER)
+    assert (header.bitrate, header.sample_rate, header.length) == (128, 44100, FRAME_LENGTH)
+    assert parse_header(b"ID3\x04") is None
+
+
+def test_tags_and_info_frame_are_dropped():
+    frames = [frame for _, frame in iter_frames(make_file(1, 2, 3))]
+    assert frames == [make_frame(1), make_frame(2), make_frame(3)]
+
+
+def test_join_keeps_audio_frames_in_order():
+    joined = join_mp3([make_file(1, 2), make_file(3, info=False), make_file(4)])
+    assert joined == b"".join(make_frame(fill) for fill in (1, 2, 3, 4))
+    assert len(joined) % FRAME_LENGTH == 0
+
+
+def test_join_rejects_mismatched_or_empty_segments():
+    # Same frame at 48 kHz
+    other_rate = bytes([0xFF, 0xFB, 0x94, 0x44])
+    with pytest.raises(ValueError):
+        join_mp3([make_file(1), make_frame(2, header=other_rate)])
+    with pytest.raises(ValueError):
+        join_mp3([make_file(1), b"not audio"])
+    with pytest.raises(ValueError):
+        join_mp3([])
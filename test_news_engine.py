@@ -0,0 +1,32 @@
+"""
+Offline tests for concurrent news topic scraping
+"""
+import asyncio
+
+from news_scraper import NewsEngine
+
+
+def test_topics_run_within_max_concurrency_and_fail_alone(monkeypatch):
+    in_flight = 0
+    peak = 0
+
+    async def summarize_topic(self, topic, refresh=False):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        try:
+            await asyncio.sleep(0.02)
+            if topic == "broken":
+                raise RuntimeError("BrightData error")
+            return f"Summary of {topic}"
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(NewsEngine, "summarize_topic", summarize_topic)
+    topics = ["ai", "bitcoin", "broken", "climate", "space"]
+    results = asyncio.run(NewsEngine(max_concurrency=2).scrape_news(topics))["news_analysis"]
+
+    assert peak == 2
+    assert list(results) == topics
+    assert results["broken"] == "Error: BrightData error"
+    assert all(results[topic] == f"Summary of {topic}" for topic in topics if topic != "broken")
@@ -0,0 +1,58 @@
+"""
+Offline tests for token-budgeted prompt compaction
+"""
+from bench_pipeline import make_prompt_payload
+from prompt_budget import allocate, compact_headlines, compact_text, estimate_tokens, fit_to_budget
+from utils import build_broadcast_prompt
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert 6 <= estimate_tokens("Bitcoin rose 3 percent today.") <= 8
+    # Long words and non-Latin scripts cost more than one token each
+    assert estimate_tokens("cryptocurrencies") > estimate_tokens("bank") == 1
+    assert estimate_tokens("बिटकॉइन की कीमत") > estimate_tokens("bitcoin price")
+
+
+def test_headlines_keep_most_covered_stories():
+    headlines = "\n".join([
+        "Bitcoin hits record high (5 outlets)",
+        "Fed signals rate pause (3 outlets)",
+        "El Salvador adds more Bitcoin to reserves",
+        "Miners sell holdings",
+    ])
+    assert compact_headlines(headlines, 1000) == headlines
+    assert compact_headlines(headlines, 19).split("\n") == [
+        "Bitcoin hits record high (5 outlets)",
+        "Fed signals rate pause (3 outlets)",
+    ]
+
+
+def test_text_keeps_overview_and_conclusion():
+    text = "\n\n".join([
+        "Overview of the discussion.",
+        "Detail one. " * 20,
+        "Detail two. " * 20,
+        "Overall sentiment is positive.",
+    ])
+    assert compact_text(text, 20) == "Overview of the discussion.\n\nOverall sentiment is positive."
+    # An overview that does not fit alone is cut to its leading sentences
+    assert compact_text("First point. Second point. " * 10, 5) == "First point."
+
+
+def test_budget_is_water_filled():
+    assert allocate([10, 100, 1000], 300) == [10, 100, 190]
+    small, large = fit_to_budget([("a b c", compact_text), ("word. " * 500, compact_text)], 100)
+    assert small == "a b c"
+    assert estimate_tokens(large) <= 97
+
+
+def test_broadcast_prompt_fits_budget():
+    news, reddit, topics = make_prompt_payload(50)
+    full = build_broadcast_prompt(news, reddit, topics)
+    compacted = build_broadcast_prompt(news, reddit, topics, token_budget=5000)
+
+    assert estimate_tokens(full) > 5000 >= estimate_tokens(compacted)
+    # Every topic keeps its block, labels included
+    assert compacted.count("TOPIC: ") == 50
+    assert build_broadcast_prompt(news, reddit, topics, token_budget=10 ** 6) == full
@@ -0,0 +1,98 @@
+"""
+Tests for the shared per-upstream rate limiters
+"""
+import asyncio
+import multiprocessing
+import time
+
+import rate_limits
+from rate_limits import RateLimiter, get_limiter, parse_limit
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_limit():
+    assert parse_limit("5/1") == (5, 1)
+    assert parse_limit("20/60") == (20, 60)
+    assert parse_limit("3") == (3, 1)
+    assert parse_limit("0") is None
+    assert parse_limit("off") is None
+
+
+def test_burst_then_paced_slots():
+    clock = FakeClock()
+    limiter = RateLimiter("test", rate=5, per=1, clock=clock)
+    # The first 5 go through, later ones are spaced 0.2 s apart
+    waits = [limiter.reserve() for _ in range(7)]
+    assert waits[:5] == [0, 0, 0, 0, 0]
+    assert abs(waits[5] - 0.2) < 1e-9
+    assert abs(waits[6] - 0.4) < 1e-9
+
+    # An idle second refills the bucket
+    clock.now += 10
+    assert [limiter.reserve() for _ in range(5)] == [0, 0, 0, 0, 0]
+
+
+def test_shared_state_file_is_one_budget(tmp_path):
+    clock = FakeClock()
+    # Two limiters on the same directory stand in for two worker processes
+    first = RateLimiter("shared", rate=1, per=2, state_dir=str(tmp_path), clock=clock)
+    second = RateLimiter("shared", rate=1, per=2, state_dir=str(tmp_path), clock=clock)
+    assert first.reserve() == 0
+    assert second.reserve() == 2
+    assert first.reserve() == 4
+
+
+def _reserve_in_process(state_dir, results):
+    limiter = RateLimiter("multi", rate=1, per=10, state_dir=state_dir)
+    results.append(round(limiter.reserve()))
+
+
+def test_shared_state_across_processes(tmp_path):
+    with multiprocessing.Manager() as manager:
+        results = manager.list()
+        processes = [
+            multiprocessing.Process(target=_reserve_in_process, args=(str(tmp_path), results))
+            for _ in range(3)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        # Slots are handed out 10 s apart whatever the process
+        assert sorted(results) == [0, 10, 20]
+
+
+def test_acquire_waits_and_records_stats():
+    limiter = RateLimiter("acquire", rate=1, per=0.05)
+
+    async def main():
+        start = time.perf_counter()
+        for _ in range(3):
+            async with limiter:
+                pass
+        return time.perf_counter() - start
+
+    assert asyncio.run(main()) >= 0.09
+    assert limiter.stats["acquired"] == 3
+    assert limiter.stats["waited"] == 2
+    assert limiter.stats["max_wait_seconds"] > 0
+
+
+def test_get_limiter_is_shared_and_configurable(monkeypatch):
+    monkeypatch.setattr(rate_limits, "_limiters", {})
+    monkeypatch.setenv("RATE_LIMIT_BRIGHTDATA", "2/1")
+    monkeypatch.setenv("RATE_LIMIT_ELEVENLABS", "0")
+    monkeypatch.delenv("RATE_LIMIT_DIR", raising=False)
+
+    brightdata = get_limiter("brightdata")
+    assert brightdata is get_limiter("brightdata")
+    assert (brightdata.rate, brightdata.per, brightdata.burst) == (2, 1, 2)
+    assert not isinstance(get_limiter("elevenlabs"), RateLimiter)
+    assert set(rate_limits.rate_limit_stats()) == {"brightdata"}
@@ -0,0 +1,49 @@
+"""
+Offline tests for the direct-tool Reddit mode, using the local stdio MCP server
+"""
+import asyncio
+
+import reddit_scraper
+from reddit_scraper import find_post_urls, process_topic_direct
+from test_mcp_pool import make_pool
+
+
+def test_find_post_urls_dedupes_and_keeps_order():
+    text = (
+        "https://www.reddit.com/r/a/comments/1/x/?utm=1 "
+        "https://old.reddit.com/r/a/comments/1/x "
+        "https://example.com/r/a/comments/9/y "
+        "https://reddit.com/r/b/comments/2/y/."
+    )
+    assert find_post_urls(text, 5) == [
+        "https://www.reddit.com/r/a/comments/1/x/",
+        "https://www.reddit.com/r/b/comments/2/y/",
+    ]
+    assert find_post_urls(text, 1) == ["https://www.reddit.com/r/a/comments/1/x/"]
+
+
+def test_direct_mode_makes_one_llm_call_per_topic(monkeypatch):
+    calls = []
+
+    async def fake_summarize(api_key, topic, posts, since, model):
+        calls.append((topic, posts))
+        return f"summary of {len(posts)} posts"
+
+    monkeypatch.setattr(reddit_scraper, "summarize_reddit_posts_async", fake_summarize)
+    monkeypatch.setattr(reddit_scraper, "REDDIT_POSTS_PER_TOPIC", 2)
+
+    async def main():
+        pool = make_pool(size=1)
+        await pool.start()
+        try:
+            async with pool.session() as pooled:
+                return await process_topic_direct(pooled.session, "bitcoin")
+        finally:
+            await pool.close()
+
+    assert asyncio.run(main()) == "summary of 2 posts"
+    assert len(calls) == 1
+    topic, posts = calls[0]
+    assert topic == "bitcoin"
+    assert posts[0].startswith("URL: https://www.reddit.com/r/news/comments/abc123/thread_one/")
+    assert "# Page https://www.reddit.com/r/worldnews/comments/def456/thread_two/" in posts[1]
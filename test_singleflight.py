@@ -0,0 +1,81 @@
+"""
+Offline tests for single-flight coalescing
+"""
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight, normalize_topic
+
+
+def test_identical_keys_share_one_run():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "summary"
+
+    async def main():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(*(flight.do(normalize_topic(t), work) for t in ["AI", " ai ", "Ai"]))
+        assert results == ["summary"] * 3
+        assert flight.stats == {"started": 1, "coalesced": 2}
+        assert flight.in_flight() == 0
+
+    asyncio.run(main())
+    assert len(calls) == 1
+
+
+def test_errors_reach_every_waiter():
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(flight.do("k", work), flight.do("k", work), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_cancel_shared_work():
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        flight = SingleFlight("test")
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(main())
+
+
+def test_work_is_cancelled_when_last_waiter_leaves():
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        flight = SingleFlight("test")
+        waiter = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert flight.in_flight() == 0
+
+    asyncio.run(main())
+    assert cancelled == [True]
@@ -0,0 +1,113 @@
+"""
+Offline tests for pipelined script-to-speech
+"""
+import asyncio
+import json
+
+import pytest
+
+from cache import TTLCache
+from speech_pipeline import chunk_script, pipelined
+
+
+async def fragments(text: str, size: int = 7):
+    for i in range(0, len(text), size):
+        await asyncio.sleep(0)
+        yield text[i:i + size]
+
+
+async def collect(stream) -> list:
+    return [item async for item in stream]
+
+
+def test_chunks_end_on_sentence_and_paragraph_boundaries():
+    text = (
+        "Bitcoin rose 3.5 percent today. Analysts expect more volatility! Traders are watching the Fed.\n\n"
+        "Meanwhile, online discussions on Reddit reveal a cautious mood. Some users doubt the rally."
+    )
+    chunks = asyncio.run(collect(chunk_script(fragments(text), first_chars=20, min_chars=60, max_chars=500)))
+
+    assert chunks == [
+        "Bitcoin rose 3.5 percent today.",
+        "Analysts expect more volatility! Traders are watching the Fed.",
+        "Meanwhile, online discussions on Reddit reveal a cautious mood.",
+        "Some users doubt the rally.",
+    ]
+
+
+def test_long_text_without_boundaries_is_split_between_words():
+    text = " ".join(["word"] * 100)
+    chunks = asyncio.run(collect(chunk_script(fragments(text), first_chars=10, min_chars=50, max_chars=80)))
+
+    assert " ".join(chunks) == text
+    assert all(len(chunk) <= 80 for chunk in chunks)
+
+
+def test_results_come_back_in_order_while_synthesis_overlaps():
+    running = []
+    peak = []
+
+    async def synthesize(chunk):
+        running.append(chunk)
+        peak.append(len(running))
+        # Early chunks take longest, so later ones finish first
+        await asyncio.sleep(0.05 / int(chunk))
+        running.remove(chunk)
+        return f"audio-{chunk}"
+
+    async def chunks():
+        for i in range(1, 7):
+            yield str(i)
+
+    results = asyncio.run(collect(pipelined(chunks(), synthesize, lookahead=2)))
+
+    assert results == [f"audio-{i}" for i in range(1, 7)]
+    assert max(peak) > 1
+
+
+def test_failure_cancels_outstanding_synthesis():
+    cancelled = []
+
+    async def synthesize(chunk):
+        if chunk == "bad":
+            await asyncio.sleep(0.01)
+            raise RuntimeError("TTS down")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(chunk)
+            raise
+
+    async def chunks():
+        yield "bad"
+        yield "slow"
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(collect(pipelined(chunks(), synthesize, lookahead=2)))
+    assert cancelled == ["slow"]
+
+
+def test_broadcast_script_streams_from_openrouter(monkeypatch):
+    import httpx
+    import utils
+
+    events = [{"choices": [{"delta": {"content": part}}]} for part in ["Bitcoin ", "rose ", "today."]]
+    body = ": OPENROUTER PROCESSING\n\n" + "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, content=body.encode("utf-8"), headers={"content-type": "text/event-stream"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(utils, "get_async_client", lambda name: client)
+    monkeypatch.setattr(utils, "llm_cache", TTLCache("test", ttl=60))
+
+    news = {"news_analysis": {"Bitcoin": "Bitcoin rose today."}}
+    stream = lambda: utils.stream_broadcast_news_async("key", news, {}, ["Bitcoin"])
+
+    assert asyncio.run(collect(stream())) == ["Bitcoin ", "rose ", "today."]
+    # The completed script is cached under the same key as the non-streaming call
+    assert asyncio.run(collect(stream())) == ["Bitcoin rose today."]
+    assert len(requests) == 1
+    assert requests[0]["stream"] is True
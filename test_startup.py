@@ -0,0 +1,46 @@
+"""
+Import-time budget: starting a worker must not pull in the heavy SDKs
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Imported on first use (Reddit agent, MCP sessions, TTS, bs4 parser fallback)
+LAZY_MODULES = [
+    "langchain_openai", "langchain_core", "langchain_anthropic", "langgraph",
+    "langchain_mcp_adapters", "mcp", "elevenlabs", "gtts", "bs4", "anthropic", "openai",
+]
+
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "3"))
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import backend
+elapsed = time.perf_counter() - start
+loaded = sorted({name.split(".")[0] for name in sys.modules} & set(sys.argv[1:]))
+print(f"elapsed={elapsed}")
+print(f"loaded={','.join(loaded)}")
+"""
+
+
+def import_backend(tmp_path):
+    # A clean directory shows whether importing creates anything
+    env = {**os.environ, "PYTHONPATH": str(Path(__file__).parent)}
+    for name in ("OPENROUTER_API_KEY", "BRIGHTDATA_API_TOKEN", "WEB_UNLOCKER_ZONE"):
+        env.pop(name, None)
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, *LAZY_MODULES],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    values = dict(line.split("=", 1) for line in result.stdout.splitlines() if "=" in line)
+    return float(values["elapsed"]), [name for name in values["loaded"].split(",") if name]
+
+
+def test_backend_import_is_cheap(tmp_path):
+    elapsed, loaded = import_backend(tmp_path)
+    assert loaded == []
+    assert elapsed < IMPORT_BUDGET_SECONDS
+    assert not (tmp_path / "audio").exists()
@@ -0,0 +1,71 @@
+"""
+Offline tests for popularity-driven cache warming
+"""
+import asyncio
+
+from cache import TTLCache
+from warming import CacheWarmer, TopicPopularity
+
+
+def test_popularity_decays_and_ranks():
+    popularity = TopicPopularity(half_life=100)
+    for _ in range(4):
+        popularity.record("news", "Bitcoin", now=0)
+    popularity.record("news", " bitcoin ", now=0)
+    popularity.record("news", "AI", now=100)
+
+    assert popularity.score("news", "BITCOIN", now=100) == 2.5
+    assert [topic for _, topic, _ in popularity.top(2, now=100)] == ["bitcoin", "ai"]
+    assert popularity.top(5, min_score=2, now=100) == [("news", "bitcoin", 2.5)]
+
+
+def test_warmer_refreshes_only_popular_expiring_topics():
+    cache = TTLCache("test_topic", ttl=600)
+    cache.set("fresh", "cached summary")
+    refreshed = []
+
+    async def refresh(topic):
+        refreshed.append(topic)
+        cache.set(topic, f"summary of {topic}")
+
+    popularity = TopicPopularity()
+    for topic in ["fresh", "hot", "hot", "warm", "warm", "fresh", "fresh", "once"]:
+        popularity.record("news", topic)
+    popularity.record("reddit", "hot")
+    popularity.record("reddit", "hot")
+
+    warmer = CacheWarmer(
+        popularity, {"news": (cache, refresh)}, top_n=3, refresh_ahead=60, min_score=1.5
+    )
+    asyncio.run(warmer.run_once())
+
+    # "once" is below min_score, "fresh" does not expire soon, reddit has no refresher
+    assert sorted(refreshed) == ["hot", "warm"]
+    assert cache.get("hot") == "summary of hot"
+    assert warmer.stats["refreshed"] == 2
+    assert warmer.stats["skipped_fresh"] == 1
+
+
+def test_warmer_respects_concurrency_and_survives_failures():
+    cache = TTLCache("test_topic", ttl=600)
+    running = []
+    peak = []
+
+    async def refresh(topic):
+        running.append(topic)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(topic)
+        if topic == "broken":
+            raise RuntimeError("upstream down")
+
+    popularity = TopicPopularity()
+    for topic in ["a", "b", "c", "d", "broken"]:
+        popularity.record("news", topic, weight=2)
+
+    warmer = CacheWarmer(popularity, {"news": (cache, refresh)}, top_n=5, concurrency=2, rate_per_minute=100)
+    asyncio.run(warmer.run_once())
+
+    assert max(peak) == 2
+    assert warmer.stats["refreshed"] == 4
+    assert warmer.stats["failed"] == 1
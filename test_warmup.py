@@ -0,0 +1,146 @@
+"""
+Offline tests for worker warmup, the health endpoints and the production entry point
+"""
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+import backend
+import serve
+from jobs import JobManager
+from warmup import Warmup
+
+
+def test_ready_after_steps_even_when_one_fails():
+    async def main():
+        async def ok():
+            await asyncio.sleep(0.01)
+
+        async def broken():
+            raise RuntimeError("no npx")
+
+        warmup = Warmup({"ok": ok, "broken": broken})
+        await warmup.start()
+        assert not warmup.ready
+        await warmup._task
+        assert warmup.ready
+        assert warmup.status["ok"]["state"] == "done"
+        assert warmup.status["broken"]["state"] == "failed"
+        assert warmup.status["broken"]["error"] == "no npx"
+
+        await warmup.close()
+        assert not warmup.ready
+        assert warmup.report()["draining"]
+
+    asyncio.run(main())
+
+
+def test_slow_step_keeps_running_after_timeout():
+    async def main():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+
+        warmup = Warmup({"slow": slow}, timeout=0.05)
+        await warmup.start()
+        await warmup._task
+        assert warmup.ready
+        assert warmup.status["slow"]["state"] == "running"
+
+        release.set()
+        await asyncio.sleep(0.01)
+        assert warmup.status["slow"]["state"] == "done"
+        await warmup.close()
+
+    asyncio.run(main())
+
+
+def test_ungated_warmup_is_ready_while_steps_run():
+    async def main():
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def pool_start():
+            started.set()
+            await release.wait()
+
+        warmup = Warmup({"mcp_sessions": pool_start}, gate=False)
+        await warmup.start()
+        assert warmup.ready
+        await started.wait()
+        assert warmup.status["mcp_sessions"]["state"] == "running"
+
+        release.set()
+        await warmup._task
+        assert warmup.status["mcp_sessions"]["state"] == "done"
+        await warmup.close()
+        assert not warmup.ready
+
+    asyncio.run(main())
+
+
+def test_pool_starts_whether_or_not_readiness_is_gated():
+    assert backend.warmup.steps["mcp_sessions"] == backend.reddit_pool.start
+
+
+def test_readyz_waits_for_warmup_and_healthz_does_not(monkeypatch):
+    gate = {"open": False}
+
+    async def step():
+        while not gate["open"]:
+            await asyncio.sleep(0.01)
+
+    monkeypatch.setattr(backend, "warmup", Warmup({"step": step}))
+    with TestClient(backend.app) as client:
+        assert client.get("/healthz").status_code == 200
+        response = client.get("/readyz")
+        assert response.status_code == 503
+        assert response.json()["steps"]["step"]["state"] == "running"
+
+        gate["open"] = True
+        deadline = time.monotonic() + 5
+        while client.get("/readyz").status_code != 200:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert client.get("/readyz").json()["ready"]
+
+
+def test_job_status_is_visible_to_other_workers(tmp_path):
+    async def main():
+        async def run(payload):
+            return f"audio/{payload}.mp3"
+
+        accepting = JobManager(run, state_dir=str(tmp_path))
+        other = JobManager(run, state_dir=str(tmp_path))
+        await accepting.start()
+        try:
+            job = accepting.submit("bitcoin")
+            await accepting._queue.join()
+        finally:
+            await accepting.close()
+
+        seen = other.get(job.id)
+        assert seen.status == "done"
+        assert seen.result == "audio/bitcoin.mp3"
+        assert other.get("../../etc/passwd") is None
+        assert other.get("0" * 32) is None
+
+    asyncio.run(main())
+
+
+def test_serve_options_are_production_ready():
+    args = serve.parse_args(["--workers", "3", "--port", "8080", "--limit-concurrency", "50"])
+    options = serve.uvicorn_options(args)
+    assert options["reload"] is False
+    assert (options["workers"], options["port"], options["limit_concurrency"]) == (3, 8080, 50)
+
+    environ = {"RATE_LIMIT_DIR": "/srv/limits"}
+    serve.share_state(3, environ)
+    assert environ["RATE_LIMIT_DIR"] == "/srv/limits"
+    assert "JOB_STATE_DIR" in environ
+
+    single = {}
+    serve.share_state(1, single)
+    assert single == {}
@@ -1,12 +1,23 @@
-from urllib.parse import quote_plus
+from urllib.parse import quote_plus, urlsplit, urlunsplit, parse_qsl, urlencode
 import os
-import requests
+import json
+import hashlib
+import tempfile
+import httpx
 from fastapi import FastAPI, HTTPException
-from bs4 import BeautifulSoup
-from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import SystemMessage, HumanMessage
-from datetime import datetime
-from elevenlabs import ElevenLabs
+from http_clients import (
+    BRIGHTDATA_URL,
+    get_async_client,
+    get_sync_client,
+    get_elevenlabs_client,
+    get_async_elevenlabs_client,
+)
+from cache import TTLCache
+from metrics import track, observe_size, observe_llm_usage
+from mp3_frames import join_mp3
+from prompt_budget import estimate_tokens, compact_headlines, compact_text, fit_to_budget
+from rate_limits import get_limiter
+from llm_router import OPENROUTER_MODELS, openrouter_router
 # Import ollama lazily inside summarize_with_ollama to avoid import-time side-effects
 # (some versions of the ollama package create a global client at import which can block during process spawn/reload)
 
@@ -24,8 +35,54 @@ def generate_valid_news_url(keyword: str) -> str:
     q = quote_plus(keyword)
     return f"https://news.google.com/search?q={q}&hl=en-IN&gl=IN&ceid=IN:en"
 
-def scrape_with_brightdata(url: str) -> str:
-    """Scarpe a URl using BrightData"""
+# Cache of raw BrightData pages keyed on the normalized URL. FETCH_CACHE_TTL=0 disables it,
+# FETCH_CACHE_DIR adds a compressed on-disk tier that survives restarts.
+fetch_cache = TTLCache(
+    "brightdata",
+    ttl=float(os.getenv("FETCH_CACHE_TTL", "300")),
+    max_entries=int(os.getenv("FETCH_CACHE_MAX_ENTRIES", "256")),
+    disk_dir=os.getenv("FETCH_CACHE_DIR") or None,
+)
+
+# Cache of OpenRouter completions, so unchanged headlines don't re-bill the same prompt.
+llm_cache = TTLCache(
+    "openrouter",
+    ttl=float(os.getenv("LLM_CACHE_TTL", "900")),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")),
+    disk_dir=os.getenv("LLM_CACHE_DIR") or None,
+)
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def llm_cache_key(payload: dict) -> str:
+    """Cache key for a chat completion: (model, temperature, system prompt hash, user prompt hash)"""
+    system_prompt = "\n".join(m["content"] for m in payload["messages"] if m["role"] == "system")
+    user_prompt = "\n".join(m["content"] for m in payload["messages"] if m["role"] == "user")
+    return "|".join([
+        payload["model"],
+        str(payload.get("temperature")),
+        _sha256(system_prompt),
+        _sha256(user_prompt),
+    ])
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so equivalent URLs share one cache entry.
+
+    Lowercases scheme and host, drops the fragment and default ports and sorts
+    the query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme, netloc.rsplit(":", 1)[-1]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+def _brightdata_request(url: str):
+    """Build headers and payload for a BrightData Web Unlocker request"""
     header = {
         "Authorization": f"Bearer {os.getenv('BRIGHTDATA_API_TOKEN')}",
         "Content-type": "application/json"
@@ -36,21 +93,58 @@ def scrape_with_brightdata(url: str) -> str:
         "url": url,
         "format": "raw"
     }
+    return header, payload
+
+@track("brightdata_fetch")
+def scrape_with_brightdata(url: str) -> str:
+    """Scarpe a URl using BrightData"""
+    cache_key = normalize_url(url)
+    cached = fetch_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    header, payload = _brightdata_request(url)
 
     try:
-        response = requests.post("https://api.brightdata.com/request", json=payload, headers=header)
+        get_limiter("brightdata").acquire_sync()
+        response = get_sync_client("brightdata").post(BRIGHTDATA_URL, json=payload, headers=header)
         response.raise_for_status()
+        fetch_cache.set(cache_key, response.text)
         return response.text
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"BrightData error: {str(e)}")
-    
 
+@track("brightdata_fetch")
+async def scrape_with_brightdata_async(url: str) -> str:
+    """Scrape a URL using BrightData without blocking the event loop"""
+    cache_key = normalize_url(url)
+    cached = await fetch_cache.aget(cache_key)
+    if cached is not None:
+        return cached
+
+    header, payload = _brightdata_request(url)
+
+    try:
+        await get_limiter("brightdata").acquire()
+        response = await get_async_client("brightdata").post(BRIGHTDATA_URL, json=payload, headers=header)
+        response.raise_for_status()
+        await fetch_cache.aset(cache_key, response.text)
+        return response.text
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"BrightData error: {str(e)}")
+
+
+@track("html_clean")
 def clean_html_to_text(html_content: str) -> str:
     """"Clean HTML content to plain text"""
+    # Imported here, the lxml headline parser does not need BeautifulSoup
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html_content, "html.parser")
     text = soup.get_text(separator="\n")
     return text.strip()
 
+@track("headline_extract")
 def extract_headlines(cleaned_text: str) -> str:
     """ 
     Extract and concatenate headlines from cleaned news text content.
@@ -73,8 +167,8 @@ def extract_headlines(cleaned_text: str) -> str:
             if current_block:
                 headlines.append(current_block[0])
                 current_block = []
-            else:
-                current_block.append(line)
+        else:
+            current_block.append(line)
 
     # Add any remaining block at end of text
     if current_block:
@@ -116,9 +210,7 @@ def summarize_with_ollama(headlines) -> str:
         raise HTTPException(status_code=500, detail=f"Ollama error: {str(e)}")
 
 
-# def generate_broadcast_news(api_key, news_data, reddit_data, topics):
-    # Updated system message with flexible source handling
-    system_prompt = """
+BROADCAST_SYSTEM_PROMPT = """
     You are broadcast_news_writer, a professional virtual news reporter. Generate natural, TTS-ready news reports using available sources:
 
     For each topic, STRUCTURE BASED ON AVAILABLE DATA:
@@ -138,183 +230,244 @@ def summarize_with_ollama(headlines) -> str:
     Write in full paragraphs optimized for speech synthesis. Avoid markdown.
     """
 
-    try:
-        topic_blocks = []
-        for topic in topics:
-            news_content = news_data["news_analysis"].get(topic ) if news_data else ''
-            reddit_content = reddit_data["reddit_analysis"].get(topic) if reddit_data else ''
-            context = []
-            if news_content:
-                context.append(f"OFFICIAL NEWS CONTENT:\n{news_content}")
-            if reddit_content:
-                context.append(f"REDDIT DISCUSSION CONTENT:\n{reddit_content}")
-            
-            if context:  # Only include topics with actual content
-                topic_blocks.append(
-                    f"TOPIC: {topic}\n\n" +
-                    "\n\n".join(context)
-                )
-
-        user_prompt = (
+# Script returned when no source produced content for any requested topic
+NO_BROADCAST_CONTENT = "No content found for the requested topics."
+
+def _openrouter_headers(api_key: str) -> dict:
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "http://localhost:8501", 
+        "X-Title": "Personal AI Journalist"
+    }
+
+# Fused mode: the broadcast is written straight from raw headlines in one call
+FUSED_BROADCAST_SYSTEM_PROMPT = BROADCAST_SYSTEM_PROMPT + """
+    Official news is given as raw headlines, one per line. Focus on the most
+    important ones and write the news part of each segment from them yourself.
+    """
+
+# Token budgets for the user prompt of each OpenRouter call, content beyond them is compacted
+NEWS_SCRIPT_PROMPT_TOKENS = int(os.getenv("NEWS_SCRIPT_PROMPT_TOKENS", "3000"))
+BROADCAST_PROMPT_TOKENS = int(os.getenv("BROADCAST_PROMPT_TOKENS", "12000"))
+
+def build_broadcast_prompt(news_data, reddit_data, topics, fused: bool = False, token_budget: int = None):
+    """
+    Assemble the broadcast user prompt from the per-topic news and Reddit content, or None if there is none.
+
+    With token_budget the content is compacted (best ranked headlines and
+    paragraphs first) so the whole prompt stays within about that many tokens.
+    """
+    news_key, news_label = ("news_headlines", "OFFICIAL NEWS HEADLINES") if fused else ("news_analysis", "OFFICIAL NEWS CONTENT")
+    news_compactor = compact_headlines if fused else compact_text
+    sections = []  # (topic, [(label, content, compactor), ...])
+    for topic in topics:
+        news_content = news_data.get(news_key, {}).get(topic, '') if news_data else ''
+        reddit_content = reddit_data.get("reddit_analysis", {}).get(topic, '') if reddit_data else ''
+        
+        context = []
+        if news_content:
+            context.append((news_label, news_content, news_compactor))
+        if reddit_content:
+            context.append(("REDDIT DISCUSSION CONTENT", reddit_content, compact_text))
+        
+        if context:
+            sections.append((topic, context))
+
+    if not sections:
+        return None
+
+    items = [item for _, context in sections for item in context]
+
+    def assemble(contents):
+        contents = iter(contents)
+        topic_blocks = [
+            f"TOPIC: {topic}\n\n" +
+            "\n\n".join(f"{label}:\n{next(contents)}" for label, _, _ in context)
+            for topic, context in sections
+        ]
+        return (
             "Create broadcast segments for these topics using available sources:\n\n" +
             "\n\n--- NEW TOPIC ---\n\n".join(topic_blocks)
         )
 
-        llm = ChatAnthropic(
-            model="claude-3-opus-20240229",
-            api_key=api_key,
-            temperature=0.3,
-            max_tokens=4000,
-        )
-
-        response = llm.invoke([
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ])
+    prompt = assemble(content for _, content, _ in items)
+    if token_budget is None or estimate_tokens(prompt) <= token_budget:
+        return prompt
+
+    overhead = estimate_tokens(assemble("" for _ in items))
+    compacted = fit_to_budget([(content, compactor) for _, content, compactor in items], token_budget - overhead)
+    return assemble(compacted)
+
+def _broadcast_payload(news_data, reddit_data, topics, fused: bool = False):
+    """Build the OpenRouter payload for a broadcast script, or None if there is no content"""
+    user_prompt = build_broadcast_prompt(news_data, reddit_data, topics, fused)
+    if user_prompt is None:
+        return None
+
+    stage = "fused_broadcast_script" if fused else "broadcast_script"
+    tokens_before = estimate_tokens(user_prompt)
+    if tokens_before > BROADCAST_PROMPT_TOKENS:
+        user_prompt = build_broadcast_prompt(news_data, reddit_data, topics, fused, BROADCAST_PROMPT_TOKENS)
+    observe_size("prompt_tokens_before", tokens_before, stage)
+    observe_size("prompt_tokens_after", estimate_tokens(user_prompt), stage)
+
+    return {
+        "model": OPENROUTER_MODELS[0],
+        "messages": [
+            {"role": "system", "content": FUSED_BROADCAST_SYSTEM_PROMPT if fused else BROADCAST_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ],
+        # Adjust temperature/tokens as needed
+        "temperature": 0.3,
+        "max_tokens": 4000 
+    }
 
-        return response.content
+BROADCAST_EXTRACT_ERROR = "Error: Could not extract content from LLM response."
 
-    except Exception as e:
-        raise e
+def _broadcast_content(response, stage: str):
+    """Script text of an OpenRouter response, None if it has none"""
+    if response.status_code != 200:
+         raise Exception(f"OpenRouter API Error: {response.status_code} - {response.text}")
 
+    response_data = response.json()
+    observe_llm_usage(response_data.get("usage"), stage)
+    
+    # Robustly extract content
+    try:
+        content = response_data['choices'][0]['message']['content']
+    except (KeyError, IndexError):
+        return None
+    observe_size("script_chars", len(content), stage)
+    return content
+
+def _parse_broadcast_response(response, cache_key: str, stage: str = "broadcast_script") -> str:
+    content = _broadcast_content(response, stage)
+    if content is None:
+        return BROADCAST_EXTRACT_ERROR
+    llm_cache.set(cache_key, content)
+    return content
+
+@track("broadcast_script")
 def generate_broadcast_news(api_key, news_data, reddit_data, topics):
     """
     Generates a broadcast script using OpenRouter (Free Model) via direct HTTP request.
     """
-    system_prompt = """
-    You are broadcast_news_writer, a professional virtual news reporter. Generate natural, TTS-ready news reports using available sources:
-
-    For each topic, STRUCTURE BASED ON AVAILABLE DATA:
-    1. If news exists: "According to official reports..." + summary
-    2. If Reddit exists: "Online discussions on Reddit reveal..." + summary
-    3. If both exist: Present news first, then Reddit reactions
-    4. If neither exists: Skip the topic (shouldn't happen)
-
-    Formatting rules:
-    - ALWAYS start directly with the content, NO INTRODUCTIONS
-    - Keep audio length 60-120 seconds per topic
-    - Use natural speech transitions like "Meanwhile, online discussions..." 
-    - Incorporate 1-2 short quotes from Reddit when available
-    - Maintain neutral tone but highlight key sentiments
-    - End with "To wrap up this segment..." summary
+    try:
+        payload = _broadcast_payload(news_data, reddit_data, topics)
+        if payload is None:
+            return NO_BROADCAST_CONTENT
 
-    Write in full paragraphs optimized for speech synthesis. Avoid markdown.
-    """
+        cache_key = llm_cache_key(payload)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-    try:
-        topic_blocks = []
-        for topic in topics:
-            news_content = news_data.get("news_analysis", {}).get(topic, '') if news_data else ''
-            reddit_content = reddit_data.get("reddit_analysis", {}).get(topic, '') if reddit_data else ''
-            
-            context = []
-            if news_content:
-                context.append(f"OFFICIAL NEWS CONTENT:\n{news_content}")
-            if reddit_content:
-                context.append(f"REDDIT DISCUSSION CONTENT:\n{reddit_content}")
-            
-            if context:
-                topic_blocks.append(
-                    f"TOPIC: {topic}\n\n" +
-                    "\n\n".join(context)
-                )
-
-        if not topic_blocks:
-            return "No content found for the requested topics."
-
-        user_prompt = (
-            "Create broadcast segments for these topics using available sources:\n\n" +
-            "\n\n--- NEW TOPIC ---\n\n".join(topic_blocks)
+        response = openrouter_router.post_sync(
+            get_sync_client("openrouter"), _openrouter_headers(api_key), payload, timeout=120
         )
+        return _parse_broadcast_response(response, cache_key)
 
-        # Direct Request to OpenRouter
-        url = "https://openrouter.ai/api/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:8501", 
-            "X-Title": "Personal AI Journalist"
-        }
-        
-        payload = {
-            "model": "tngtech/deepseek-r1t2-chimera:free", # Your requested free model
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            # Adjust temperature/tokens as needed
-            "temperature": 0.3,
-            "max_tokens": 4000 
-        }
-
-        response = requests.post(url, headers=headers, json=payload, timeout=120)
-        
-        if response.status_code != 200:
-             raise Exception(f"OpenRouter API Error: {response.status_code} - {response.text}")
+    except Exception as e:
+        print(f"Error generating broadcast: {str(e)}")
+        raise e
 
-        response_data = response.json()
-        
-        # Robustly extract content
-        try:
-            content = response_data['choices'][0]['message']['content']
-            return content
-        except (KeyError, IndexError):
-            return "Error: Could not extract content from LLM response."
+async def _complete_broadcast_async(api_key, payload, stage: str) -> str:
+    if payload is None:
+        return NO_BROADCAST_CONTENT
+
+    cache_key = llm_cache_key(payload)
+    cached = await llm_cache.aget(cache_key)
+    if cached is not None:
+        return cached
+
+    response = await openrouter_router.post(
+        get_async_client("openrouter"), _openrouter_headers(api_key), payload, timeout=120
+    )
+    content = _broadcast_content(response, stage)
+    if content is None:
+        return BROADCAST_EXTRACT_ERROR
+    await llm_cache.aset(cache_key, content)
+    return content
+
+@track("broadcast_script")
+async def generate_broadcast_news_async(api_key, news_data, reddit_data, topics):
+    """
+    Async version of generate_broadcast_news running on the shared OpenRouter pool.
+    """
+    try:
+        payload = _broadcast_payload(news_data, reddit_data, topics)
+        return await _complete_broadcast_async(api_key, payload, "broadcast_script")
 
     except Exception as e:
         print(f"Error generating broadcast: {str(e)}")
         raise e
 
-def summarize_with_anthropic_news_script(api_key: str, headlines: str) -> str:
-    pass
-# def summarize_with_anthropic_news_script(api_key: str, headlines: str) -> str:
-#     """ 
-#     Summarize multiple news headlines into a TLS-friendly broadcast news script using Anthropic Claude model via LangChain.
-#     """
-#     system_prompt = """ 
-#     You are my personal news editor and scrptwrite for a news podcast. Your job is to turn raw headlines into a clean, professional, and TTS-friendly news script.
-
-#     The final output will be read aloud by a news anchor or text-to-speech engine. So:
-#     - Do not include any special characters, emojis, formatting symbols, or markdown.
-#     - Do not add any preamble or framing like "Here's your summary" or "Let me explain".
-#     - Write in full, clear, spoken-language paragraphs.
-#     - keep the tone formal, professional, and broadcast-style, just like a real TV news script.
-#     -Focus on the most important headlines and turn them into short, informative news segments that soundnatural when spoken.
-#     - Start right away with the actual script, using transitions between topics if needed.
-
-#     Remember: Your only output should be a clean script that is ready to be read out load.
-#     """
-
-#     try:
-#         llm = ChatAnthropic(
-#             model = "tngtech/deepseek-r1t2-chimera:free",
-#             api_key = api_key,
-#             temperature=0.4,
-#             max_tokens=1000
-#         )
-
-#         # invoke Claude with system + user prompt
-#         response = llm.invoke([
-#             SystemMessage(content=system_prompt),
-#             HumanMessage(content=headlines)
-#         ])
-
-#         return response.content
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=f"Anthropic error: {str(e)}")
-    
-def summarize_with_openrouter_news_script(api_key: str, headlines: str, model: str = "tngtech/deepseek-r1t2-chimera:free") -> str:
+@track("fused_broadcast_script")
+async def generate_fused_broadcast_news_async(api_key, headlines_data, reddit_data, topics):
     """
-    Summarize headlines using OpenRouter's Chat Completions API.
-    Returns the resulting text on success, raises HTTPException on failure.
+    Write the broadcast straight from raw headlines (and Reddit analyses) in one call.
+
+    Args:
+        headlines_data: {"news_headlines": {topic: newline separated headlines}}
+        reddit_data: {"reddit_analysis": {topic: analysis}}
     """
-    if not api_key:
-        raise HTTPException(status_code=500, detail="OpenRouter API key is required")
+    try:
+        payload = _broadcast_payload(headlines_data, reddit_data, topics, fused=True)
+        return await _complete_broadcast_async(api_key, payload, "fused_broadcast_script")
 
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    except Exception as e:
+        print(f"Error generating fused broadcast: {str(e)}")
+        raise e
 
-    system_prompt = """ 
+async def stream_broadcast_news_async(api_key, news_data, reddit_data, topics):
+    """
+    Yield the broadcast script as OpenRouter streams it (server-sent events).
+
+    The same llm_cache entry as generate_broadcast_news_async is used, a cached
+    script is yielded in one piece and a completed stream is cached.
+    """
+    payload = _broadcast_payload(news_data, reddit_data, topics)
+    if payload is None:
+        yield NO_BROADCAST_CONTENT
+        return
+
+    cache_key = llm_cache_key(payload)
+    cached = await llm_cache.aget(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    client = get_async_client("openrouter")
+    with track("broadcast_script_stream"):
+        async with openrouter_router.stream(client, _openrouter_headers(api_key), payload, timeout=120) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise Exception(f"OpenRouter API Error: {response.status_code} - {response.text}")
+
+            async for line in response.aiter_lines():
+                # Blank lines separate events, ":" lines are keep-alive comments
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                if "error" in event:
+                    raise Exception(f"OpenRouter stream error: {event['error']}")
+                choices = event.get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    yield delta
+
+    content = "".join(parts)
+    if content:
+        await llm_cache.aset(cache_key, content)
+        observe_size("script_chars", len(content), "broadcast_script_stream")
+
+NEWS_SCRIPT_SYSTEM_PROMPT = """ 
     You are my personal news editor and scrptwrite for a news podcast. Your job is to turn raw headlines into a clean, professional, and TTS-friendly news script.
 
     The final output will be read aloud by a news anchor or text-to-speech engine. So:
@@ -328,21 +481,30 @@ def summarize_with_openrouter_news_script(api_key: str, headlines: str, model: s
     Remember: Your only output should be a clean script that is ready to be read out load.
     """
 
+def _news_script_request(api_key: str, headlines: str, model: str):
+    """Build headers and payload for a headline summary request"""
+    if not api_key:
+        raise HTTPException(status_code=500, detail="OpenRouter API key is required")
+
+    tokens_before = estimate_tokens(headlines)
+    headlines = compact_headlines(headlines, NEWS_SCRIPT_PROMPT_TOKENS)
+    observe_size("prompt_tokens_before", tokens_before, "news_summary")
+    observe_size("prompt_tokens_after", estimate_tokens(headlines), "news_summary")
+
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
     payload = {
         "model": model,
         "messages": [
-            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": NEWS_SCRIPT_SYSTEM_PROMPT},
             {"role": "user", "content": headlines}
         ],
         "temperature": 0.4,
         "max_tokens": 1000
     }
+    return headers, payload
 
-    try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=60)
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"OpenRouter request error: {str(e)}")
-
+def _news_script_content(resp, stage: str) -> str:
+    """Text of an OpenRouter response, raises HTTPException if it has none"""
     if resp.status_code != 200:
         raise HTTPException(status_code=resp.status_code, detail=f"OpenRouter error: {resp.text}")
 
@@ -350,6 +512,7 @@ def summarize_with_openrouter_news_script(api_key: str, headlines: str, model: s
         data = resp.json()
     except ValueError:
         raise HTTPException(status_code=500, detail=f"Invalid JSON from OpenRouter: {resp.text}")
+    observe_llm_usage(data.get("usage"), stage)
 
     # Extract text robustly from common response shapes
     try:
@@ -372,7 +535,111 @@ def summarize_with_openrouter_news_script(api_key: str, headlines: str, model: s
         return content
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error parsing OpenRouter response: {str(e)}")
+
+def _parse_news_script_response(resp, cache_key: str, stage: str = "news_summary") -> str:
+    content = _news_script_content(resp, stage)
+    llm_cache.set(cache_key, content)
+    return content
+
+async def _parse_news_script_response_async(resp, cache_key: str, stage: str = "news_summary") -> str:
+    content = _news_script_content(resp, stage)
+    await llm_cache.aset(cache_key, content)
+    return content
+
+@track("news_summary")
+def summarize_with_openrouter_news_script(api_key: str, headlines: str, model: str = OPENROUTER_MODELS[0]) -> str:
+    """
+    Summarize headlines using OpenRouter's Chat Completions API.
+    Returns the resulting text on success, raises HTTPException on failure.
+    """
+    headers, payload = _news_script_request(api_key, headlines, model)
+    cache_key = llm_cache_key(payload)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        resp = openrouter_router.post_sync(get_sync_client("openrouter"), headers, payload, timeout=60)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"OpenRouter request error: {str(e)}")
+
+    return _parse_news_script_response(resp, cache_key)
+
+@track("news_summary")
+async def summarize_with_openrouter_news_script_async(api_key: str, headlines: str, model: str = OPENROUTER_MODELS[0]) -> str:
+    """
+    Async version of summarize_with_openrouter_news_script on the shared OpenRouter pool.
+    """
+    headers, payload = _news_script_request(api_key, headlines, model)
+    cache_key = llm_cache_key(payload)
+    cached = await llm_cache.aget(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        resp = await openrouter_router.post(get_async_client("openrouter"), headers, payload, timeout=60)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"OpenRouter request error: {str(e)}")
+
+    return await _parse_news_script_response_async(resp, cache_key)
     
+REDDIT_PROMPT_TOKENS = int(os.getenv("REDDIT_PROMPT_TOKENS", "6000"))
+
+REDDIT_ANALYSIS_SYSTEM_PROMPT = """You are a Reddit analysis expert. You are given the top Reddit posts about a topic, with their comments. Use them to:
+    1. Analyze their content and sentiment
+    2. Create a summary of discussions and overall sentiment
+    Only use the posts you are given."""
+
+REDDIT_ANALYSIS_USER_PROMPT = """Analyze these Reddit posts about '{topic}', all posted after {since}.
+    Provide a comprehensive summary including:
+    - Main discussion points
+    - Key opinions expressed
+    - Any notable trends or patterns
+    - Summarize the overall narrative, discussion points and also quote interesting comments without mentioning names
+    - Overall sentiment (positive/neutral/negative)
+
+    POSTS:
+
+    {posts}"""
+
+@track("reddit_summary")
+async def summarize_reddit_posts_async(api_key: str, topic: str, posts: list, since: str, model: str) -> str:
+    """
+    Summarize scraped Reddit posts (markdown) in a single OpenRouter call.
+    """
+    if not api_key:
+        raise HTTPException(status_code=500, detail="OpenRouter API key is required")
+
+    tokens_before = sum(estimate_tokens(post) for post in posts)
+    posts = fit_to_budget([(post, compact_text) for post in posts], REDDIT_PROMPT_TOKENS)
+    observe_size("prompt_tokens_before", tokens_before, "reddit_summary")
+    observe_size("prompt_tokens_after", sum(estimate_tokens(post) for post in posts), "reddit_summary")
+
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": REDDIT_ANALYSIS_SYSTEM_PROMPT},
+            {"role": "user", "content": REDDIT_ANALYSIS_USER_PROMPT.format(
+                topic=topic, since=since, posts="\n\n--- NEW POST ---\n\n".join(posts)
+            )}
+        ],
+        "temperature": 0,
+        "max_tokens": 1500
+    }
+    cache_key = llm_cache_key(payload)
+    cached = await llm_cache.aget(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        resp = await openrouter_router.post(
+            get_async_client("openrouter"), _openrouter_headers(api_key), payload, timeout=120
+        )
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=500, detail=f"OpenRouter request error: {str(e)}")
+
+    return await _parse_news_script_response_async(resp, cache_key, "reddit_summary")
+
 def generate_news_urls_to_scrape(list_of_keywords):
     valid_urls_dict = {}
     for keyword in list_of_keywords:
@@ -380,6 +647,40 @@ def generate_news_urls_to_scrape(list_of_keywords):
 
     return valid_urls_dict
 
+# Counters for the content-addressed audio store, reported by /cache-stats
+audio_cache_stats = {"hits": 0, "misses": 0}
+
+def audio_cache_path(output_dir: str, *parts) -> str:
+    """
+    Content-addressed path for synthesized audio.
+
+    The file name is a hash of everything that determines the audio (text, voice,
+    model, format), so identical scripts map to the same file and different
+    scripts can never overwrite each other.
+    """
+    digest = _sha256(json.dumps(parts, ensure_ascii=False))[:32]
+    return os.path.join(output_dir, f"tts_{digest}.mp3")
+
+def _open_temp_audio(filepath: str):
+    """Open a uniquely named temp file next to filepath for an atomic write"""
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath) or ".", prefix=".tts_", suffix=".part")
+    return os.fdopen(fd, "wb"), tmp_path
+
+def _discard_temp_audio(tmp_path: str):
+    try:
+        os.remove(tmp_path)
+    except OSError:
+        pass
+
+def _cached_audio(filepath: str) -> bool:
+    if os.path.exists(filepath):
+        audio_cache_stats["hits"] += 1
+        return True
+    audio_cache_stats["misses"] += 1
+    return False
+
+@track("tts")
 def text_to_audio_elevenlabs_sdk(
         text: str,
         voice_id: str = "JBFqnCBsd6RMkjVDRZzb",
@@ -390,18 +691,24 @@ def text_to_audio_elevenlabs_sdk(
     ) -> str:
     """
     Converts text to speech using ElevenLabs SDK and saves it to audio/ directory.
+    An identical (text, voice, model, format) request returns the stored file without a TTS call.
 
     Returns:
         str: Path to the saved audio file.
     """
 
     try:
+        filepath = audio_cache_path(output_dir, text, voice_id, model_id, output_format)
+        if _cached_audio(filepath):
+            return filepath
+
         api_key = api_key or os.getenv("ELEVEN_API_KEY")
         if not api_key:
             raise ValueError("ElevenLabs API key is required")
         
-        #Initialize client
-        client = ElevenLabs(api_key=api_key)
+        # Shared client, reuses pooled connections between calls
+        client = get_elevenlabs_client(api_key)
+        get_limiter("elevenlabs").acquire_sync()
 
         # Get the audio generator
         audio_stream = client.text_to_speech.convert(
@@ -411,26 +718,160 @@ def text_to_audio_elevenlabs_sdk(
             output_format=output_format
         )
 
-        # Ensure output directory exists
-        os.makedirs(output_dir, exist_ok=True)
+        # write audio chunks to a temp file, then rename it into place
+        f, tmp_path = _open_temp_audio(filepath)
+        try:
+            with f:
+                for chunk in audio_stream:
+                    f.write(chunk)
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            _discard_temp_audio(tmp_path)
+            raise
+
+        observe_size("audio_bytes", os.path.getsize(filepath), "tts")
+        return filepath
+    except Exception as e:
+        raise e
+
+@track("tts")
+async def text_to_audio_elevenlabs_async(
+        text: str,
+        voice_id: str = "JBFqnCBsd6RMkjVDRZzb",
+        model_id: str = "eleven_multilingual_v2",
+        output_format: str = "mp3_44100_128",
+        output_dir: str = "audio",
+        api_key: str = None
+    ) -> str:
+    """
+    Async version of text_to_audio_elevenlabs_sdk on the shared ElevenLabs pool.
+
+    Returns:
+        str: Path to the saved audio file.
+    """
+    filepath = audio_cache_path(output_dir, text, voice_id, model_id, output_format)
+    if _cached_audio(filepath):
+        return filepath
+
+    api_key = api_key or os.getenv("ELEVEN_API_KEY")
+    if not api_key:
+        raise ValueError("ElevenLabs API key is required")
+
+    client = get_async_elevenlabs_client(api_key)
+    await get_limiter("elevenlabs").acquire()
+    audio_stream = client.text_to_speech.convert(
+        text=text,
+        voice_id=voice_id,
+        model_id=model_id,
+        output_format=output_format
+    )
+
+    f, tmp_path = _open_temp_audio(filepath)
+    try:
+        with f:
+            async for chunk in audio_stream:
+                f.write(chunk)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        _discard_temp_audio(tmp_path)
+        raise
+
+    observe_size("audio_bytes", os.path.getsize(filepath), "tts")
+    return filepath
 
-        # Generate unique filename
-        filename = f"tts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3"
-        filepath = os.path.join(output_dir, filename)
+async def stream_audio_elevenlabs(
+        text: str,
+        voice_id: str = "JBFqnCBsd6RMkjVDRZzb",
+        model_id: str = "eleven_multilingual_v2",
+        output_format: str = "mp3_44100_128",
+        output_dir: str = "audio",
+        api_key: str = None,
+        chunk_size: int = 64 * 1024
+    ):
+    """
+    Yield audio chunks as ElevenLabs produces them.
 
-        # write audio chunks to file
-        with open(filepath, "wb") as f:
-            for chunk in audio_stream:
+    The chunks are teed into the content-addressed audio store, the file only
+    appears there once the stream completed. A cached script is streamed
+    straight from disk.
+    """
+    filepath = audio_cache_path(output_dir, text, voice_id, model_id, output_format)
+    if _cached_audio(filepath):
+        with open(filepath, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+        return
+
+    api_key = api_key or os.getenv("ELEVEN_API_KEY")
+    if not api_key:
+        raise ValueError("ElevenLabs API key is required")
+
+    client = get_async_elevenlabs_client(api_key)
+    await get_limiter("elevenlabs").acquire()
+    audio_stream = client.text_to_speech.convert(
+        text=text,
+        voice_id=voice_id,
+        model_id=model_id,
+        output_format=output_format
+    )
+
+    f, tmp_path = _open_temp_audio(filepath)
+    audio_bytes = 0
+    try:
+        with track("tts_stream"), f:
+            async for chunk in audio_stream:
                 f.write(chunk)
+                audio_bytes += len(chunk)
+                yield chunk
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        # Also covers the client disconnecting mid-stream
+        _discard_temp_audio(tmp_path)
+        raise
+
+    observe_size("audio_bytes", audio_bytes, "tts_stream")
+
+@track("mp3_stitch")
+def stitch_audio_files(paths, output_dir: str = "audio") -> str:
+    """
+    Join MP3 files into one at the frame level, without re-encoding.
+
+    The result is content-addressed by the (content-addressed) input paths, so
+    the same segments in the same order are only stitched once.
 
+    Returns:
+        str: Path to the joined audio file.
+
+    Raises:
+        ValueError: If paths is empty
+    """
+    if not paths:
+        raise ValueError("No audio files to stitch")
+    filepath = audio_cache_path(output_dir, "stitched", *paths)
+    if _cached_audio(filepath):
         return filepath
-    except Exception as e:
-        raise e
+
+    segments = []
+    for path in paths:
+        with open(path, "rb") as f:
+            segments.append(f.read())
+    joined = join_mp3(segments)
+
+    f, tmp_path = _open_temp_audio(filepath)
+    try:
+        with f:
+            f.write(joined)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        _discard_temp_audio(tmp_path)
+        raise
+
+    observe_size("audio_bytes", len(joined), "mp3_stitch")
+    return filepath
     
 from pathlib import Path
-from gtts import gTTS
+# Created on the first write (_open_temp_audio), not at import
 AUDIO_DIR = Path("audio")
-AUDIO_DIR.mkdir(exist_ok=True) #Create directory if it doesn't exist
 def tts_to_audio(text: str, language: str = 'en') -> str:
     """
     Convert text to speech using gTTS (Google Text-to-Speech) and save to file.
@@ -446,15 +887,25 @@ def tts_to_audio(text: str, language: str = 'en') -> str:
         tts_to_audio("Hello world", "en")
     """
     try:
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = AUDIO_DIR / f"tts_{timestamp}.mp3"
+        # Content-addressed filename, identical text is only synthesized once
+        filename = audio_cache_path(str(AUDIO_DIR), text, language, "gtts")
+        if _cached_audio(filename):
+            return filename
 
-        # Create TTS object and save
-        tts = gTTS(text=text, lang=language, slow=False)
-        tts.save(str(filename))
+        from gtts import gTTS
 
-        return  str(filename)
+        # Create TTS object and save through a temp file
+        tts = gTTS(text=text, lang=language, slow=False)
+        f, tmp_path = _open_temp_audio(filename)
+        try:
+            with f:
+                tts.write_to_fp(f)
+            os.replace(tmp_path, filename)
+        except BaseException:
+            _discard_temp_audio(tmp_path)
+            raise
+
+        return  filename
     except Exception as e:
         print(f"gTTS Error: {str(e)}")
         return None
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Popularity-driven background cache warming.
+
+Every request records its topics in a TopicPopularity tracker, whose scores
+decay exponentially with a configurable half-life. A CacheWarmer task
+periodically takes the top-N (source, topic) pairs and refreshes their cached
+results shortly before they expire, so hot topics like "Bitcoin" are served
+from precomputed summaries instead of paying the full scrape + summarize
+latency. Refreshes run under their own concurrency limit and rate budget so
+warming never crowds out live requests.
+"""
+import asyncio
+import math
+import time
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from aiolimiter import AsyncLimiter
+
+from cache import TTLCache
+from metrics import set_source_type, track
+from singleflight import normalize_topic
+
+# Scores below this are forgotten
+MIN_TRACKED_SCORE = 0.01
+
+
+class TopicPopularity:
+    def __init__(self, half_life: float = 3600):
+        """
+        Args:
+            half_life: Seconds after which a request counts half as much
+        """
+        self.half_life = half_life
+        self._scores = {}  # (source, topic) -> (score, updated_at)
+
+    def _decayed(self, score: float, updated_at: float, now: float) -> float:
+        if self.half_life <= 0:
+            return score
+        return score * math.pow(0.5, (now - updated_at) / self.half_life)
+
+    def record(self, source: str, topic: str, weight: float = 1.0, now: float = None):
+        now = time.time() if now is None else now
+        key = (source, normalize_topic(topic))
+        score, updated_at = self._scores.get(key, (0.0, now))
+        self._scores[key] = (self._decayed(score, updated_at, now) + weight, now)
+
+    def score(self, source: str, topic: str, now: float = None) -> float:
+        now = time.time() if now is None else now
+        entry = self._scores.get((source, normalize_topic(topic)))
+        return self._decayed(*entry, now) if entry else 0.0
+
+    def top(self, n: int, min_score: float = 0.0, now: float = None) -> List[Tuple[str, str, float]]:
+        """The n highest scoring (source, topic, score) triples at or above min_score"""
+        now = time.time() if now is None else now
+        ranked = []
+        for key, entry in list(self._scores.items()):
+            score = self._decayed(*entry, now)
+            if score < MIN_TRACKED_SCORE:
+                del self._scores[key]
+            elif score >= min_score:
+                ranked.append((key[0], key[1], score))
+        ranked.sort(key=lambda item: item[2], reverse=True)
+        return ranked[:n]
+
+    def __len__(self):
+        return len(self._scores)
+
+
+class CacheWarmer:
+    def __init__(
+        self,
+        popularity: TopicPopularity,
+        refreshers: Dict[str, Tuple[TTLCache, Callable[[str], Awaitable]]],
+        top_n: int = 5,
+        interval: float = 60,
+        refresh_ahead: float = 120,
+        concurrency: int = 2,
+        rate_per_minute: float = 10,
+        min_score: float = 1.5,
+    ):
+        """
+        Args:
+            popularity: Tracker the backend records requested topics in
+            refreshers: Source name -> (result cache keyed by normalized topic,
+                coroutine function recomputing and caching one topic)
+            top_n: Number of (source, topic) pairs kept warm, 0 disables warming
+            interval: Seconds between warming passes
+            refresh_ahead: Refresh entries expiring within this many seconds
+            concurrency: Refreshes running at the same time
+            rate_per_minute: Refreshes started per minute at most
+            min_score: Decayed request count a topic needs before it is warmed
+        """
+        self.popularity = popularity
+        self.refreshers = refreshers
+        self.top_n = top_n
+        self.interval = interval
+        self.refresh_ahead = refresh_ahead
+        self.concurrency = max(1, concurrency)
+        self.rate_per_minute = rate_per_minute
+        self.min_score = min_score
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._limiter = AsyncLimiter(max(1, rate_per_minute), 60)
+        self._task = None
+        self.stats = {"passes": 0, "refreshed": 0, "failed": 0, "skipped_fresh": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.top_n > 0 and self.rate_per_minute > 0
+
+    async def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def due(self) -> List[Tuple[str, str]]:
+        """Popular (source, topic) pairs whose cached result is missing or about to expire"""
+        due = []
+        ranked = [
+            (source, topic) for source, topic, _ in self.popularity.top(len(self.popularity), self.min_score)
+            if source in self.refreshers
+        ]
+        for source, topic in ranked[:self.top_n]:
+            cache = self.refreshers[source][0]
+            expires_in = cache.expires_in(topic)
+            if expires_in is not None and expires_in > self.refresh_ahead:
+                self.stats["skipped_fresh"] += 1
+                continue
+            due.append((source, topic))
+        return due
+
+    async def run_once(self):
+        """One warming pass over the currently popular topics"""
+        self.stats["passes"] += 1
+        await asyncio.gather(*(self._refresh(source, topic) for source, topic in self.due()))
+
+    async def _refresh(self, source: str, topic: str):
+        refresh = self.refreshers[source][1]
+        async with self._semaphore, self._limiter:
+            try:
+                async with track("cache_warm"):
+                    await refresh(topic)
+                self.stats["refreshed"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"Cache warming failed for {source} topic {topic}: {e}")
+
+    async def _loop(self):
+        # Labels the stage metrics recorded by warming refreshes
+        set_source_type("warmer")
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,96 @@
+"""
+Worker warmup and readiness.
+
+A worker accepts connections as soon as its lifespan has started, but its
+first requests would still pay for cold parsers, TLS handshakes with every
+upstream and the MCP subprocesses. Warmup runs those steps concurrently in
+the background after startup and the worker only reports ready on /readyz
+once they have finished, so the load balancer routes to warm workers only.
+/healthz (liveness) answers as soon as the event loop does.
+
+- A step that fails is logged and reported but does not keep the worker out
+  of rotation, everything it warms is also set up lazily on first use
+- Steps still running after `timeout` seconds are left to finish in the
+  background and the worker reports ready without them. They are not
+  cancelled: a half-started MCP pool would hand out no sessions at all
+- Readiness is dropped again as soon as the worker starts shutting down
+- With `gate` off the steps still run, but the worker is ready right away
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict
+
+from metrics import track
+
+
+class Warmup:
+    def __init__(self, steps: Dict[str, Callable[[], Awaitable]], timeout: float = 150, gate: bool = True):
+        """
+        Args:
+            steps: Coroutine functions to run once at startup, by name
+            timeout: Seconds after which the worker reports ready regardless
+            gate: Report ready only once the steps have finished
+        """
+        self.steps = steps
+        self.timeout = timeout
+        self.gate = gate
+        self.status = {name: {"state": "pending"} for name in steps}
+        self.warm = False
+        self.draining = False
+        self.seconds = None
+        self._tasks = []
+        self._task = None
+
+    @property
+    def ready(self) -> bool:
+        return (self.warm or not self.gate) and not self.draining
+
+    async def start(self):
+        self.draining = False
+        self._task = asyncio.create_task(self.run())
+
+    async def close(self):
+        """Stop reporting ready and cancel the steps that are still running"""
+        self.draining = True
+        for task in [self._task, *self._tasks]:
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(t for t in [self._task, *self._tasks] if t is not None), return_exceptions=True)
+        self._task = None
+        self._tasks = []
+
+    async def _step(self, name: str, run: Callable[[], Awaitable]):
+        status = self.status[name]
+        status["state"] = "running"
+        started = time.perf_counter()
+        try:
+            with track(f"warmup_{name}"):
+                await run()
+            status["state"] = "done"
+        except Exception as e:
+            status["state"] = "failed"
+            status["error"] = str(e)
+            print(f"Warmup step {name} failed: {e}")
+        finally:
+            status["seconds"] = round(time.perf_counter() - started, 3)
+
+    async def run(self):
+        started = time.perf_counter()
+        self._tasks = [asyncio.create_task(self._step(name, run)) for name, run in self.steps.items()]
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=self.timeout)
+            if pending:
+                slow = [name for name, status in self.status.items() if status["state"] == "running"]
+                print(f"Warmup still running after {self.timeout}s, ready without: {slow}")
+        self.seconds = round(time.perf_counter() - started, 3)
+        self.warm = True
+        print(f"Worker ready after {self.seconds}s warmup")
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready,
+            "draining": self.draining,
+            "gated": self.gate,
+            "warmup_seconds": self.seconds,
+            "steps": self.status,
+        }